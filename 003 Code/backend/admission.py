@@ -0,0 +1,148 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "32"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "128"))
+CHAT_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("CHAT_MAX_QUEUE_WAIT_SECONDS", "10"))
+CHAT_MAX_PER_CLIENT = int(os.getenv("CHAT_MAX_PER_CLIENT", "4"))
+
+
+def client_id(request):
+    """X-Client-Id > X-Forwarded-For 첫 주소 > 접속 IP"""
+    explicit = request.headers.get("x-client-id")
+    if explicit:
+        return explicit
+    forwarded = request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+    if forwarded:
+        return forwarded
+    return request.client.host if request.client else "unknown"
+
+
+class ChatAdmission:
+    """
+    /chat 동시 처리 수 제한과 클라이언트별 공정 대기열 (이벤트 루프 안에서만 사용).
+    한 클라이언트의 처리+대기 수가 max_per_client 를 넘으면 429,
+    대기열이 가득 찼거나 max_queue_wait 안에 차례가 오지 않으면 503 을 Retry-After 와 함께 돌려준다.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=CHAT_MAX_CONCURRENCY,
+        max_queue=CHAT_MAX_QUEUE,
+        max_queue_wait=CHAT_MAX_QUEUE_WAIT_SECONDS,
+        max_per_client=CHAT_MAX_PER_CLIENT,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_queue_wait = max_queue_wait
+        self.max_per_client = max(1, max_per_client)
+        self.active = 0
+        self.queued = 0
+        self.rejected = {}
+        self._waiting = OrderedDict()
+        self._per_client = {}
+        self._avg_hold = 2.0
+
+    def _reject(self, reason, status_code):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        retry_after = int(min(60, max(1, math.ceil(
+            self._avg_hold * (self.queued + 1) / self.max_concurrency
+        ))))
+        logger.warning(f"/chat 요청 거절 ({reason}) - Retry-After {retry_after}s")
+        return HTTPException(
+            status_code=status_code,
+            detail=f"요청이 많아 처리할 수 없습니다 ({reason})",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _release_client(self, client):
+        remaining = self._per_client.get(client, 0) - 1
+        if remaining > 0:
+            self._per_client[client] = remaining
+        else:
+            self._per_client.pop(client, None)
+
+    async def acquire(self, client):
+        if self._per_client.get(client, 0) >= self.max_per_client:
+            raise self._reject("client_limit", 429)
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        if self.active < self.max_concurrency and self.queued == 0:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue:
+            self._release_client(client)
+            raise self._reject("queue_full", 503)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client, deque()).append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_queue_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # 슬롯을 받은 직후 취소/타임아웃된 경우: 받은 슬롯을 돌려준다
+                self.release(client)
+            else:
+                waiter.cancel()
+                queue = self._waiting.get(client)
+                if queue is not None:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._waiting[client]
+                self.queued -= 1
+                self._release_client(client)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("queue_timeout", 503)
+
+    def release(self, client, held_seconds=None):
+        self._release_client(client)
+        if held_seconds is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_seconds
+        if self._waiting:
+            # 가장 오래 기다린 클라이언트에게 슬롯을 넘기고 그 클라이언트를 맨 뒤로 보낸다
+            next_client, queue = next(iter(self._waiting.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(next_client)
+            else:
+                del self._waiting[next_client]
+            self.queued -= 1
+            waiter.set_result(True)
+        else:
+            self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, client):
+        await self.acquire(client)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(client, time.perf_counter() - started)
+
+    def render_metrics(self):
+        lines = [
+            "# HELP chat_admission_active /chat requests being processed",
+            "# TYPE chat_admission_active gauge",
+            f"chat_admission_active {self.active}",
+            "# HELP chat_admission_queue_depth /chat requests waiting for a slot",
+            "# TYPE chat_admission_queue_depth gauge",
+            f"chat_admission_queue_depth {self.queued}",
+            "# HELP chat_admission_rejected_total /chat requests rejected by admission control",
+            "# TYPE chat_admission_rejected_total counter",
+        ]
+        for reason in ("client_limit", "queue_full", "queue_timeout"):
+            lines.append(
+                f'chat_admission_rejected_total{{reason="{reason}"}} {self.rejected.get(reason, 0)}'
+            )
+        return "\n".join(lines) + "\n"
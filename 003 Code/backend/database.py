@@ -1,6 +1,6 @@
 import os
 import json
-from sqlalchemy import create_engine, Column, String, Text, Boolean, DateTime, ForeignKey, Integer
+from sqlalchemy import create_engine, Column, String, Text, Boolean, DateTime, ForeignKey, Integer, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -25,7 +25,9 @@ if not DATABASE_URL:
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
+# SQLite(부하 테스트 등)는 세션이 요청 스레드 사이를 오가므로 스레드 검사를 끈다
+connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -55,13 +57,35 @@ class ChatImage(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     message_id = Column(String, ForeignKey("chat_messages.id")) # 어떤 메시지의 이미지인지
     index = Column(Integer) # 이미지 순서
-    base64 = Column(Text)   # 이미지 데이터 (Base64 문자열)
+    base64 = Column(Text)   # 이미지 데이터 (Base64 문자열, 이전 버전에서 저장된 행만 사용)
+    image_id = Column(String)  # RAG 서버 image 테이블의 id (/images/{image_id} 로 조회)
+    width = Column(Integer)
+    height = Column(Integer)
     
     message = relationship("ChatMessage", back_populates="images")
     
+def _add_missing_columns():
+    """create_all 은 기존 테이블에 컬럼을 추가하지 않으므로, 새로 생긴 nullable 컬럼만 보충한다."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(
+                    text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+                )
+            print(f"✅ {table.name}.{column.name} 컬럼 추가")
+
+
 def init_db():
     try:
         Base.metadata.create_all(bind=engine)
+        _add_missing_columns()
         print("✅ 데이터베이스 테이블 초기화 완료")
     except Exception as e:
         print(f"❌ 데이터베이스 연결 실패: {e}")
\ No newline at end of file
@@ -0,0 +1,22 @@
+import hashlib
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """
+    외부 API 없이 문장 해시로 만드는 결정적 단위 벡터.
+    의미 유사도는 없고 완전히 같은 문장끼리만 거리 0 이 된다 (부하 테스트 / 로컬 실행용).
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim)
+            embeddings.append((vector / np.linalg.norm(vector)).astype(np.float32))
+        return embeddings
@@ -1,17 +1,108 @@
+import os
+import re
 import logging
+import threading
+import unicodedata
 import requests
 from fastapi import HTTPException
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 같은 질문을 기다리는 요청이 먼저 시작된 RAG 호출을 기다리는 최대 시간 (RAG 타임아웃보다 약간 길게)
+COALESCE_TIMEOUT_SECONDS = float(os.getenv("LLM_COALESCE_TIMEOUT_SECONDS", "130"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """NFKC, 소문자, 앞뒤 공백 제거, 연속 공백 축약"""
+    query = unicodedata.normalize("NFKC", query or "")
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    같은 key 로 동시에 들어온 호출 중 첫 번째만 fn 을 실행하고,
+    나머지는 그 결과(또는 예외)를 함께 받는다.
+    """
+
+    def __init__(self, timeout=COALESCE_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            timeout = self.timeout if timeout is None else timeout
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.timeouts += 1
+                logger.warning(f"동일 질문 처리 대기 시간 초과 ({timeout:.0f}s): {key}")
+                raise HTTPException(status_code=504, detail="동일 질문 처리 대기 시간 초과")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info(f"동일 질문 {call.waiters}건을 한 번의 RAG 호출로 처리: {key}")
+
+    def stats(self):
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+                "coalescing_ratio": self.coalesced / total if total else 0.0,
+            }
+
 
 class LLMCache:
-    def __init__(self, semantic_cache):
+    def __init__(
+        self,
+        semantic_cache,
+        coalesce_timeout=COALESCE_TIMEOUT_SECONDS,
+        rag_url="http://rag:8001",
+    ):
         self.cache = {}
+        self.rag_url = rag_url.rstrip("/")
         self.semantic_cache = semantic_cache
+        self.in_flight = SingleFlight(coalesce_timeout)
 
-    def generate(self, query, is_consultant_mode):
+    def generate(self, query, is_consultant_mode, client_id=None):
         """
         항상 (answer: str, images: List[dict]) 형태로 리턴
         """
@@ -19,7 +110,13 @@ class LLMCache:
             cached_answer = self.cache[query]
             return cached_answer, []
 
+        # 같은 (정규화 쿼리, 모드) 로 동시에 캐시를 놓친 요청은 하나의 조회/RAG 호출을 공유한다
+        key = (normalize_query(query), bool(is_consultant_mode))
+        return self.in_flight.do(
+            key, lambda: self._generate_miss(query, is_consultant_mode, client_id)
+        )
 
+    def _generate_miss(self, query, is_consultant_mode, client_id=None):
         similar_docs = self.semantic_cache.query(
             query_texts=[query],
             n_results=1,
@@ -33,7 +130,7 @@ class LLMCache:
             self.cache[query] = cached_answer
             return cached_answer, []
 
-        answer, images = self.response_to_rag(query, is_consultant_mode)
+        answer, images = self.response_to_rag(query, is_consultant_mode, client_id)
 
         self.cache[query] = answer
         self.semantic_cache.add(
@@ -44,14 +141,44 @@ class LLMCache:
 
         return answer, images
 
-    def response_to_rag(self, query, is_consultant_mode):
+    def render_metrics(self):
+        stats = self.in_flight.stats()
+        lines = [
+            "# HELP llm_cache_rag_calls_total RAG pipelines actually executed on a cache miss",
+            "# TYPE llm_cache_rag_calls_total counter",
+            f"llm_cache_rag_calls_total {stats['executed']}",
+            "# HELP llm_cache_coalesced_total Cache misses served by an identical in-flight RAG call",
+            "# TYPE llm_cache_coalesced_total counter",
+            f"llm_cache_coalesced_total {stats['coalesced']}",
+            "# HELP llm_cache_coalesce_timeouts_total Coalesced requests that gave up waiting",
+            "# TYPE llm_cache_coalesce_timeouts_total counter",
+            f"llm_cache_coalesce_timeouts_total {stats['timeouts']}",
+            "# HELP llm_cache_coalescing_ratio Share of cache misses that were coalesced",
+            "# TYPE llm_cache_coalescing_ratio gauge",
+            f"llm_cache_coalescing_ratio {stats['coalescing_ratio']}",
+            "# HELP llm_cache_in_flight Distinct questions with a RAG call in flight",
+            "# TYPE llm_cache_in_flight gauge",
+            f"llm_cache_in_flight {stats['in_flight']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def response_to_rag(self, query, is_consultant_mode, client_id=None):
         try:
             response = requests.post(
-                "http://rag:8001/rag",
+                f"{self.rag_url}/rag",
                 json={"query": query, "isConsultantMode": is_consultant_mode},
+                # RAG 서버가 클라이언트별로 공정하게 대기열을 돌릴 수 있도록 원래 클라이언트를 알린다
+                headers={"X-Client-Id": client_id} if client_id else None,
                 timeout=120,
             )
 
+            if response.status_code in (429, 503):
+                # RAG 서버가 부하를 덜어내는 중: 120초를 기다리지 않고 Retry-After 와 함께 바로 돌려준다
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail="RAG 서버가 혼잡합니다. 잠시 후 다시 시도해 주세요.",
+                    headers={"Retry-After": response.headers.get("Retry-After", "1")},
+                )
             if response.status_code != 200:
                 raise Exception(
                     f"RAG API 요청 실패: {response.status_code} {response.text}"
@@ -60,6 +187,8 @@ class LLMCache:
             data = response.json()
             return data["answer"], data.get("images", [])
 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"오류 발생: {e}")
             raise HTTPException(status_code=500, detail=str(e))
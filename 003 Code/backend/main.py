@@ -5,19 +5,25 @@ import time
 from typing import Optional, List
 
 from sqlalchemy.orm import Session, joinedload # joinedload 추가
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from database import SessionLocal, init_db, ChatSession, ChatMessage, ChatImage 
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 import openai
 import chromadb
 from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+from embedding import HashEmbeddingFunction
 from config import load_api_key
 from llm_cache import LLMCache
+from admission import ChatAdmission, client_id
 from pathlib import Path
+from urllib.parse import quote
 from dotenv import load_dotenv
+import requests
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(dotenv_path=BASE_DIR / ".env")
@@ -25,6 +31,8 @@ load_dotenv(dotenv_path=BASE_DIR / ".env")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RAG_URL = os.getenv("RAG_URL", "http://rag:8001")
+
 try:
     init_db()
 except Exception as e:
@@ -50,19 +58,25 @@ except Exception as e:
 
 chroma_client = chromadb.Client()
 EMBEDDING_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
-
-openai_ef = OpenAIEmbeddingFunction(
-    api_key=load_api_key(),
-    model_name=EMBEDDING_MODEL,
-)
+# "openai" (기본) 또는 "hash" - hash 는 API 키 없이 쓰는 결정적 임베딩 (부하 테스트용, 동일 문장만 적중)
+SEMANTIC_CACHE_EMBEDDING = os.getenv("SEMANTIC_CACHE_EMBEDDING", "openai").lower()
+
+if SEMANTIC_CACHE_EMBEDDING == "hash":
+    semantic_cache_ef = HashEmbeddingFunction()
+else:
+    semantic_cache_ef = OpenAIEmbeddingFunction(
+        api_key=load_api_key(),
+        model_name=EMBEDDING_MODEL,
+    )
 
 semantic_cache = chroma_client.get_or_create_collection(
     name="semantic_cache",
-    embedding_function=openai_ef,
+    embedding_function=semantic_cache_ef,
     metadata={"hnsw:space": "cosine"},
 )
 
-app.llm_cache = LLMCache(semantic_cache)
+app.llm_cache = LLMCache(semantic_cache, rag_url=RAG_URL)
+app.chat_admission = ChatAdmission()
 
 def get_db():
     db = SessionLocal()
@@ -85,8 +99,11 @@ class ChatRequest(BaseModel):
 
 class ImageItem(BaseModel):
     id: str
-    index: int
-    base64: str
+    index: Optional[int] = None
+    url: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    base64: Optional[str] = None
 
 class ChatResponse(BaseModel):
     role: str
@@ -94,6 +111,54 @@ class ChatResponse(BaseModel):
     session_id: str
     images: List[ImageItem] = []
 
+def image_url(image_id: str) -> str:
+    return f"/images/{quote(image_id)}"
+
+
+# 이미지 바이너리는 RAG 서버가 갖고 있으므로 Range/ETag 헤더를 그대로 전달해 프록시한다
+IMAGE_PROXY_REQUEST_HEADERS = ("range", "if-none-match", "if-range")
+IMAGE_PROXY_RESPONSE_HEADERS = (
+    "content-type", "content-length", "content-range",
+    "etag", "cache-control", "accept-ranges",
+)
+
+@app.get("/images/{image_id}")
+def get_image(image_id: str, request: Request, w: Optional[int] = None):
+    headers = {
+        name: request.headers[name]
+        for name in IMAGE_PROXY_REQUEST_HEADERS
+        if name in request.headers
+    }
+    try:
+        upstream = requests.get(
+            f"{RAG_URL}/images/{quote(image_id)}",
+            params={"w": w} if w else None,
+            headers=headers,
+            stream=True,
+            timeout=30,
+        )
+    except Exception as e:
+        logger.error(f"이미지 프록시 오류: {e}")
+        raise HTTPException(status_code=502, detail="이미지 서버 연결 실패")
+
+    response_headers = {
+        name: upstream.headers[name]
+        for name in IMAGE_PROXY_RESPONSE_HEADERS
+        if name in upstream.headers
+    }
+    return StreamingResponse(
+        upstream.iter_content(chunk_size=64 * 1024),
+        status_code=upstream.status_code,
+        headers=response_headers,
+        background=BackgroundTask(upstream.close),
+    )
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(
+        app.llm_cache.render_metrics() + app.chat_admission.render_metrics()
+    )
+
 @app.get("/")
 async def root():
     return JSONResponse({"message": "KILAB Chatbot API가 실행 중입니다."})
@@ -133,11 +198,20 @@ async def get_session_messages(session_id: str, db: Session = Depends(get_db)):
     for m in msgs:
         images_data = []
         for img in m.images:
-            images_data.append({
-                "id": img.id,
-                "index": img.index,
-                "base64": img.base64
-            })
+            if img.image_id:
+                images_data.append({
+                    "id": img.image_id,
+                    "index": img.index,
+                    "url": image_url(img.image_id),
+                    "width": img.width,
+                    "height": img.height,
+                })
+            else:
+                images_data.append({
+                    "id": img.id,
+                    "index": img.index,
+                    "base64": img.base64
+                })
             
         result.append({
             "id": m.id,
@@ -158,9 +232,16 @@ async def delete_session(session_id: str, db: Session = Depends(get_db)):
     return {"status": "ok"}
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat(request: ChatRequest, http_request: Request, db: Session = Depends(get_db)):
     logger.info(f"API 호출: {request}")
 
+    # 과부하면 세션/메시지를 만들기 전에 429/503 으로 빨리 거절한다
+    client = client_id(http_request)
+    async with app.chat_admission.slot(client):
+        return await _chat(request, client, db)
+
+
+async def _chat(request: ChatRequest, client: str, db: Session):
     try:
         user_messages = [msg for msg in request.messages if msg.role == "user" and msg.content.strip()]
         if not user_messages:
@@ -186,7 +267,10 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         db.commit()
 
         start_time = time.time()
-        answer, images = app.llm_cache.generate(query, is_consultant_mode)
+        # 스레드풀에서 실행해야 같은 질문의 동시 요청이 서로를 기다리며 하나의 RAG 호출을 공유할 수 있다
+        answer, images = await run_in_threadpool(
+            app.llm_cache.generate, query, is_consultant_mode, client
+        )
         elapsed_time = time.time() - start_time
         logger.info(f"소요 시간: {elapsed_time:.2f}s")
 
@@ -197,16 +281,18 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
 
         if images:
             for img in images:
-                img_base64 = img.base64 if hasattr(img, 'base64') else img.get('base64')
-                img_index = img.index if hasattr(img, 'index') else img.get('index', 0)
-                
                 db_image = ChatImage(
-                    message_id=db_ai_msg.id, 
-                    base64=img_base64,
-                    index=img_index
+                    message_id=db_ai_msg.id,
+                    image_id=img.get("id"),
+                    index=img.get("index", 0),
+                    width=img.get("width"),
+                    height=img.get("height"),
                 )
                 db.add(db_image)
-            db.commit() 
+            db.commit()
+
+            for img in images:
+                img["url"] = image_url(img["id"])
 
         response = ChatResponse(
             role="assistant",
@@ -217,6 +303,12 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
 
         return response
 
+    except HTTPException as e:
+        db.rollback()
+        if e.status_code in (429, 503, 504):
+            # 과부하 응답은 상태 코드와 Retry-After 를 그대로 전달한다
+            raise
+        raise HTTPException(status_code=500, detail=str(e.detail))
     except Exception as e:
         logger.error(f"오류 발생: {e}")
         db.rollback()
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from llm_cache import SingleFlight
+
+
+def start_waiter(flight, key, results):
+    """같은 key 의 리더가 실행 중일 때 합류하는 호출을 스레드로 띄운다"""
+
+    def run():
+        try:
+            results.append(("ok", flight.do(key, lambda: "waiter ran fn")))
+        except Exception as e:
+            results.append(("error", e))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_for_waiters(flight, count):
+    for _ in range(200):
+        if flight.stats()["coalesced"] >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError("waiters did not join")
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+    leader_started = threading.Event()
+    results = []
+
+    def slow():
+        leader_started.set()
+        release.wait(5)
+        return "answer"
+
+    leader = threading.Thread(target=lambda: results.append(("ok", flight.do("q", slow))))
+    leader.start()
+    assert leader_started.wait(2)
+    waiters = [start_waiter(flight, "q", results) for _ in range(3)]
+    wait_for_waiters(flight, 3)
+
+    release.set()
+    for thread in [leader, *waiters]:
+        thread.join(timeout=5)
+
+    assert results == [("ok", "answer")] * 4
+    stats = flight.stats()
+    assert stats["executed"] == 1
+    assert stats["coalesced"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["coalescing_ratio"] == 0.75
+
+
+def test_leader_error_propagates_to_waiters():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+    leader_started = threading.Event()
+    results = []
+
+    def failing():
+        leader_started.set()
+        release.wait(5)
+        raise ValueError("rag down")
+
+    def lead():
+        try:
+            flight.do("q", failing)
+        except ValueError as e:
+            results.append(("leader", e))
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert leader_started.wait(2)
+    waiter = start_waiter(flight, "q", results)
+    wait_for_waiters(flight, 1)
+
+    release.set()
+    leader.join(timeout=5)
+    waiter.join(timeout=5)
+
+    errors = {kind: e for kind, e in results}
+    assert isinstance(errors["leader"], ValueError)
+    assert errors["error"] is errors["leader"]
+    # 실패한 호출은 남지 않으므로 다음 호출은 새로 실행된다
+    assert flight.do("q", lambda: "retry") == "retry"
+
+
+def test_waiter_times_out_with_504():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+    leader_started = threading.Event()
+
+    def slow():
+        leader_started.set()
+        release.wait(5)
+        return "late"
+
+    leader = threading.Thread(target=lambda: flight.do("q", slow))
+    leader.start()
+    assert leader_started.wait(2)
+    try:
+        with pytest.raises(HTTPException) as excinfo:
+            flight.do("q", lambda: "waiter ran fn", timeout=0.05)
+        assert excinfo.value.status_code == 504
+        assert flight.stats()["timeouts"] == 1
+    finally:
+        release.set()
+        leader.join(timeout=5)
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight(timeout=5)
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["executed"] == 2
+    assert flight.stats()["coalesced"] == 0
@@ -0,0 +1,245 @@
+"""
+컴포넌트별 벤치마크 케이스.
+
+각 케이스는 setup(size) -> (fn, params) 를 제공하고, fn() 한 번이 측정 단위다.
+입력 생성과 모델 준비는 setup 에서 끝내므로 측정 시간에 포함되지 않는다.
+"""
+import sys
+import random
+import tempfile
+import importlib
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+import corpus
+
+CODE_DIR = Path(__file__).resolve().parent.parent
+RAG_SERVER_DIR = CODE_DIR / "rag_server"
+DOC_RETRIEVAL_DIR = RAG_SERVER_DIR / "doc_retrieval"
+PDF_PROCESSOR_DIR = CODE_DIR / "client" / "parser" / "pdf_processor"
+
+SIZES = ("small", "medium", "large")
+
+Setup = Callable[[str], Tuple[Callable[[], object], Dict]]
+
+
+def _import_from(root: Path, module: str):
+    """
+    root 를 sys.path 맨 앞에 두고 module 을 import 한다.
+    doc_retrieval/utils 와 pdf_processor/utils 처럼 같은 최상위 이름이 겹치므로
+    이전에 올라온 같은 이름의 모듈을 비우고 가져온다.
+    """
+    top = module.split(".")[0]
+    for name in [n for n in sys.modules if n == top or n.startswith(top + ".")]:
+        del sys.modules[name]
+    sys.path.insert(0, str(root))
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(str(root))
+
+
+# ----------------------------------------------------------------------
+# hybrid_search_ids 의 RRF fusion
+# ----------------------------------------------------------------------
+
+def setup_fusion(size: str):
+    sys.path.insert(0, str(RAG_SERVER_DIR))
+    from retrieval.dpr_retrieval import rrf_fusion
+
+    n = {"small": 30, "medium": 300, "large": 3000}[size]
+    rng = random.Random(0)
+    ids = [f"doc-{i}" for i in range(n * 3 // 2)]
+    dpr = [(doc_id, 1.0 - i / n) for i, doc_id in enumerate(rng.sample(ids, n))]
+    bm25 = [(doc_id, float(n - i)) for i, doc_id in enumerate(rng.sample(ids, n))]
+
+    def run():
+        final_scores = rrf_fusion(dpr, bm25, alpha=0.5)
+        return [doc_id for doc_id, _ in final_scores[:10]]
+
+    return run, {"list_len": n}
+
+
+# ----------------------------------------------------------------------
+# cross-encoder rerank
+# ----------------------------------------------------------------------
+
+_TINY_RERANKER = {}
+
+
+def tiny_reranker(docs: List[str]):
+    """
+    오프라인용 작은 cross-encoder (랜덤 초기화 BERT + 코퍼스 글자 어휘).
+    실제 점수 품질이 아니라 토크나이즈/패딩/forward 경로의 비용 변화를 보기 위한 것.
+    """
+    if "model" in _TINY_RERANKER:
+        return _TINY_RERANKER["tokenizer"], _TINY_RERANKER["model"]
+
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + corpus.vocab_tokens(
+        docs + corpus.queries(100)
+    )
+    vocab_file = Path(tempfile.mkdtemp(prefix="bench-vocab-")) / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab) + "\n", encoding="utf-8")
+    tokenizer = BertTokenizer(str(vocab_file), tokenize_chinese_chars=True)
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=512,
+        max_position_embeddings=512,
+        num_labels=1,
+    )
+    model = BertForSequenceClassification(config).eval()
+    _TINY_RERANKER.update(tokenizer=tokenizer, model=model)
+    return tokenizer, model
+
+
+def make_setup_rerank(model_path: str = None) -> Setup:
+    def setup_rerank(size: str):
+        sys.path.insert(0, str(RAG_SERVER_DIR))
+        from retrieval.rerank import rerank
+
+        num_docs = {"small": 10, "medium": 30, "large": 100}[size]
+        docs = corpus.documents(num_docs, seed=1)
+        query = corpus.queries(1)[0]
+
+        if model_path:
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+        else:
+            tokenizer, model = tiny_reranker(corpus.documents(200, seed=1))
+
+        def run():
+            return rerank(query, docs, model, tokenizer, top_k=3, device="cpu")
+
+        return run, {"num_docs": num_docs, "model": model_path or "tiny-random-bert"}
+
+    return setup_rerank
+
+
+# ----------------------------------------------------------------------
+# Pooler
+# ----------------------------------------------------------------------
+
+def make_setup_pooler(pooler_type: str) -> Setup:
+    def setup_pooler(size: str):
+        import torch
+
+        model = _import_from(DOC_RETRIEVAL_DIR, "dpr.model")
+        batch, seq = {"small": (1, 128), "medium": (16, 256), "large": (64, 512)}[size]
+        hidden = 768
+
+        generator = torch.Generator().manual_seed(0)
+        outputs = SimpleNamespace(
+            last_hidden_state=torch.randn(batch, seq, hidden, generator=generator),
+            pooler_output=torch.randn(batch, hidden, generator=generator),
+        )
+        lengths = torch.randint(seq // 4, seq + 1, (batch,), generator=generator)
+        attention_mask = (torch.arange(seq)[None, :] < lengths[:, None]).long()
+        pooler = model.Pooler(pooler_type)
+
+        def run():
+            with torch.no_grad():
+                return pooler(attention_mask, outputs)
+
+        return run, {"batch": batch, "seq_len": seq, "hidden": hidden}
+
+    return setup_pooler
+
+
+# ----------------------------------------------------------------------
+# PDF 파서: TextChunker.chunk_text / JSONLFormatter.format_for_jsonl
+# ----------------------------------------------------------------------
+
+def setup_chunk_text(size: str):
+    chunker_module = _import_from(PDF_PROCESSOR_DIR, "core.chunker")
+    num_chars = {"small": 5_000, "medium": 50_000, "large": 500_000}[size]
+    text = corpus.long_text(num_chars)
+    chunker = chunker_module.TextChunker()
+
+    def run():
+        return chunker.chunk_text(text)
+
+    return run, {"num_chars": num_chars}
+
+
+def setup_format_for_jsonl(size: str):
+    formatter_module = _import_from(PDF_PROCESSOR_DIR, "formatters.jsonl_formatter")
+    num_items = {"small": 50, "medium": 500, "large": 5000}[size]
+    items = corpus.parsed_pdf_items(num_items)
+    formatter = formatter_module.JSONLFormatter()
+
+    def run():
+        return formatter.format_for_jsonl(items, "bench")
+
+    return run, {"num_items": num_items}
+
+
+# ----------------------------------------------------------------------
+# 평가 지표: get_topk_accuracy
+# ----------------------------------------------------------------------
+
+def setup_topk_accuracy(size: str):
+    utils = _import_from(DOC_RETRIEVAL_DIR, "utils.utils")
+    num_queries = {"small": 100, "medium": 1000, "large": 10000}[size]
+    num_passages = 10000
+    rng = np.random.default_rng(0)
+
+    retrieved = rng.integers(0, num_passages, size=(num_queries, 100))
+    positive_idx = list(range(num_passages))
+    answer_idx = [int(a) for a in rng.integers(0, num_passages, size=num_queries)]
+
+    def run():
+        return utils.get_topk_accuracy(retrieved, answer_idx, positive_idx)
+
+    return run, {"num_queries": num_queries, "retrieved_per_query": 100}
+
+
+# ----------------------------------------------------------------------
+# BM25Reranker.get_bm25_rerank_scores
+# ----------------------------------------------------------------------
+
+def setup_bm25_rerank(size: str):
+    from rank_bm25 import BM25Okapi
+
+    bm25 = _import_from(DOC_RETRIEVAL_DIR, "utils.bm25")
+    num_docs = {"small": 1000, "medium": 10000, "large": 50000}[size]
+    docs = corpus.documents(num_docs, max_chars=512, seed=2)
+
+    reranker = bm25.BM25Reranker()
+    reranker.model = BM25Okapi(reranker._tokenize(docs))
+
+    rng = np.random.default_rng(0)
+    questions = corpus.queries(32, seed=3)
+    doc_ids = [rng.choice(num_docs, size=30, replace=False).tolist() for _ in questions]
+
+    def run():
+        return reranker.get_bm25_rerank_scores(questions, doc_ids)
+
+    return run, {"corpus_docs": num_docs, "questions": len(questions), "docs_per_question": 30}
+
+
+def all_cases(reranker_path: str = None) -> Dict[str, Setup]:
+    return {
+        "fusion": setup_fusion,
+        "rerank": make_setup_rerank(reranker_path),
+        "pooler_cls": make_setup_pooler("cls"),
+        "pooler_mean": make_setup_pooler("mean"),
+        "pooler_max": make_setup_pooler("max"),
+        "pooler_pooler_output": make_setup_pooler("pooler_output"),
+        "chunk_text": setup_chunk_text,
+        "format_for_jsonl": setup_format_for_jsonl,
+        "topk_accuracy": setup_topk_accuracy,
+        "bm25_rerank": setup_bm25_rerank,
+    }
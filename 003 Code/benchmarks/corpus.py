@@ -0,0 +1,83 @@
+"""
+벤치마크용 합성 한국어 데이터. 시드가 고정되어 있어 같은 크기면 매번 같은 입력이 만들어진다.
+"""
+import random
+from typing import Dict, List
+
+SUBJECTS = [
+    "연차 휴가", "출장비", "보안 점검", "재택 근무", "복리후생", "장비 대여", "회의실",
+    "급여", "신규 입사자", "성과 평가", "법인 카드", "야간 수당", "건강 검진", "퇴직금",
+    "교육 과정", "인사 발령", "근태 기록", "경비 처리", "계약 갱신", "사내 규정",
+]
+PREDICATES = [
+    "신청은 사내 포털의 전자결재 메뉴에서 진행합니다",
+    "관련 문의는 담당 부서로 메일을 보내 주시기 바랍니다",
+    "처리 기한은 매월 말일까지이며 기한이 지나면 다음 달로 이월됩니다",
+    "규정은 올해 개정되어 적용 대상이 확대되었습니다",
+    "팀장 승인 후 인사팀 검토를 거쳐 절차가 완료됩니다",
+    "증빙 서류는 스캔본으로 첨부하고 원본은 별도로 제출합니다",
+    "계약직 직원도 대상에 포함되며 세부 기준은 별도 공지를 따릅니다",
+    "시스템 점검 시간에는 신청이 제한될 수 있습니다",
+]
+
+
+def sentence(rng: random.Random) -> str:
+    return f"{rng.choice(SUBJECTS)} {rng.choice(PREDICATES)}."
+
+
+def documents(num_docs: int, max_chars: int = 1024, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(num_docs):
+        target = rng.randint(max_chars // 4, max_chars)
+        parts = []
+        while sum(len(p) + 1 for p in parts) < target:
+            parts.append(sentence(rng))
+        docs.append(" ".join(parts)[:max_chars])
+    return docs
+
+
+def long_text(num_chars: int, seed: int = 0) -> str:
+    """문단 구분이 섞인 긴 본문 (TextChunker 입력)"""
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < num_chars:
+        paragraph = " ".join(sentence(rng) for _ in range(rng.randint(3, 8)))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:num_chars]
+
+
+def queries(num_queries: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} 어떻게 처리하나요?" for _ in range(num_queries)]
+
+
+def parsed_pdf_items(num_items: int, seed: int = 0) -> List[Dict]:
+    """PDF 파서가 만드는 content_list 모양 (text 와 table 이 섞이고, text 가 table 토큰을 참조)"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(num_items):
+        if i % 5 == 4:
+            items.append({
+                "type": "table",
+                "token": f"[TABLE_bench_{i}]",
+                "content": "\n".join(
+                    " | ".join(rng.choice(SUBJECTS) for _ in range(4)) for _ in range(6)
+                ),
+            })
+        else:
+            text = "  ".join(sentence(rng) for _ in range(rng.randint(4, 12)))
+            if i % 5 == 3:
+                text += f"\n\n\n[TABLE_bench_{i + 1}]"
+            items.append({"type": "text", "content": text})
+    return items
+
+
+def vocab_tokens(docs: List[str]) -> List[str]:
+    """문서에 나오는 글자 집합 (오프라인 WordPiece 어휘용)"""
+    chars = set()
+    for doc in docs:
+        chars.update(ch for ch in doc if not ch.isspace())
+    return sorted(chars)
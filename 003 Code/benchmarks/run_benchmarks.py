@@ -0,0 +1,190 @@
+"""
+컴포넌트 마이크로 벤치마크.
+
+  run     : 케이스별/크기별로 측정해 JSON 베이스라인으로 저장
+  compare : 두 결과 파일의 중앙값을 비교해 threshold 이상 느려진 케이스를 표시 (있으면 exit 1)
+
+예)
+  python benchmarks/run_benchmarks.py run --output benchmarks/baselines/main.json
+  python benchmarks/run_benchmarks.py run --only fusion,rerank --sizes small,medium --output current.json
+  python benchmarks/run_benchmarks.py compare benchmarks/baselines/main.json current.json --threshold 0.15
+"""
+import gc
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from cases import SIZES, all_cases
+
+
+def measure(fn: Callable[[], object], repeat: int = 7, min_sample_s: float = 0.05) -> Dict:
+    """
+    한 번 호출로 루프 수를 정해 sample 하나가 min_sample_s 이상이 되게 한 뒤,
+    repeat 번 측정해 호출 1회당 시간(ms)의 중앙값/최솟값/표준편차를 돌려준다.
+    """
+    fn()  # warm-up
+    started = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - started, 1e-7)
+    loops = max(1, math.ceil(min_sample_s / single))
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter() - started) / loops * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "stdev_ms": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def environment() -> Dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    try:
+        import torch
+
+        env["torch"] = torch.__version__
+        env["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    try:
+        env["git_rev"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return env
+
+
+def run(args) -> int:
+    cases = all_cases(args.reranker_path)
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(cases)
+    sizes = [s.strip() for s in args.sizes.split(",")]
+    unknown = [n for n in names if n not in cases] + [s for s in sizes if s not in SIZES]
+    if unknown:
+        print(f"알 수 없는 케이스/크기: {unknown}")
+        return 2
+
+    if args.threads:
+        import torch
+
+        torch.set_num_threads(args.threads)
+
+    results, skipped = {}, {}
+    for name in names:
+        for size in sizes:
+            key = f"{name}/{size}"
+            try:
+                fn, params = cases[name](size)
+            except ImportError as e:
+                # 해당 컴포넌트 의존성이 없는 환경: 건너뛰고 기록만 남긴다
+                skipped[key] = f"{type(e).__name__}: {e}"
+                print(f"{key:<32} 건너뜀 ({skipped[key]})")
+                continue
+            stats = measure(fn, repeat=args.repeat, min_sample_s=args.min_sample_ms / 1000)
+            results[key] = {**stats, "params": params}
+            print(
+                f"{key:<32} median={stats['median_ms']:>10.3f}ms  "
+                f"min={stats['min_ms']:>10.3f}ms  stdev={stats['stdev_ms']:.3f}  loops={stats['loops']}"
+            )
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {"environment": environment(), "results": results, "skipped": skipped},
+            f, ensure_ascii=False, indent=2,
+        )
+    print(f">>> 저장: {output}")
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    regressions: List[str] = []
+    print(f"{'case':<32} {'baseline':>12} {'current':>12} {'change':>9}")
+    for key in sorted(set(baseline["results"]) | set(current["results"])):
+        base = baseline["results"].get(key)
+        cur = current["results"].get(key)
+        if base is None or cur is None:
+            print(f"{key:<32} {'-' if base is None else base['median_ms']:>12} "
+                  f"{'-' if cur is None else cur['median_ms']:>12} {'n/a':>9}")
+            continue
+        if base.get("params") != cur.get("params"):
+            print(f"{key:<32} 입력 파라미터가 달라 비교하지 않음")
+            continue
+
+        change = cur["median_ms"] / base["median_ms"] - 1.0 if base["median_ms"] else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif change < -args.threshold:
+            flag = "  improved"
+        print(f"{key:<32} {base['median_ms']:>10.3f}ms {cur['median_ms']:>10.3f}ms "
+              f"{change * 100:>+8.1f}%{flag}")
+
+    if baseline.get("environment", {}).get("machine") != current.get("environment", {}).get("machine"):
+        print(">>> 주의: 두 결과의 측정 환경이 다릅니다")
+    if regressions:
+        print(f">>> {len(regressions)}개 케이스가 {args.threshold * 100:.0f}% 이상 느려졌습니다: {regressions}")
+        return 1
+    print(">>> 회귀 없음")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG component micro-benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="벤치마크를 실행해 JSON 으로 저장")
+    p_run.add_argument("--output", type=str, required=True)
+    p_run.add_argument("--only", type=str, default=None, help="쉼표로 구분한 케이스 이름")
+    p_run.add_argument("--sizes", type=str, default=",".join(SIZES))
+    p_run.add_argument("--repeat", type=int, default=7)
+    p_run.add_argument("--min-sample-ms", type=float, default=50.0)
+    p_run.add_argument("--threads", type=int, default=None, help="torch 스레드 수 고정")
+    p_run.add_argument("--reranker-path", type=str, default=None,
+                       help="실제 cross-encoder 경로 (기본: 작은 랜덤 BERT)")
+
+    p_cmp = sub.add_parser("compare", help="베이스라인 대비 회귀 검사")
+    p_cmp.add_argument("baseline", type=str)
+    p_cmp.add_argument("current", type=str)
+    p_cmp.add_argument("--threshold", type=float, default=0.15, help="허용 지연 증가율 (0.15 = 15%%)")
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
+
+
+if __name__ == "__main__":
+    main()
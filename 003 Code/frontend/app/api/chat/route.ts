@@ -18,8 +18,11 @@ export async function POST(req: Request) {
     session_id?: string
     images?: {
       id: string
-      index: number
-      base64: string
+      index?: number
+      url?: string
+      width?: number
+      height?: number
+      base64?: string
     }[]
   }
 
@@ -31,8 +34,11 @@ export async function POST(req: Request) {
     consultantMode?: boolean
     images?: {
       id: string
-      index: number
-      base64: string
+      index?: number
+      url?: string
+      width?: number
+      height?: number
+      base64?: string
     }[]
   }
 
@@ -30,8 +30,21 @@ import {
 // --- 타입 정의 ---
 type ImageItem = {
   id: string
-  index: number
-  base64: string
+  index?: number
+  url?: string
+  width?: number
+  height?: number
+  base64?: string
+}
+
+const API_BASE_URL = "http://localhost:8000"
+
+// 새 응답은 /images/{id} 참조(url), 이전 대화 기록은 base64 로 내려온다
+const imageSrc = (img: ImageItem, width?: number) => {
+  if (img.url) {
+    return `${API_BASE_URL}${img.url}${width ? `?w=${width}` : ""}`
+  }
+  return `data:image/png;base64,${img.base64}`
 }
 
 export type Message = {
@@ -215,7 +228,7 @@ export default function ChatbotInterface() {
             onClick={(e) => e.stopPropagation()} 
           >
             <img 
-              src={`data:image/png;base64,${selectedImage}`} 
+              src={selectedImage} 
               alt="Full view" 
               className="max-w-full max-h-[90vh] object-contain rounded-md shadow-2xl"
             />
@@ -448,12 +461,15 @@ export default function ChatbotInterface() {
                                 e.preventDefault()
                                 e.stopPropagation()
                                 console.log("이미지 클릭됨:", img.id)
-                                setSelectedImage(img.base64)
+                                setSelectedImage(imageSrc(img))
                               }}
                             >
                               <img
-                                src={`data:image/png;base64,${img.base64}`}
+                                src={imageSrc(img, 480)}
                                 alt={img.id}
+                                width={img.width}
+                                height={img.height}
+                                loading="lazy"
                                 className="w-full h-40 object-cover bg-white group-hover:scale-105 transition-transform duration-300"
                               />
                               
@@ -0,0 +1,210 @@
+"""
+열린 루프(open-loop) 부하 생성기와 지연 시간 통계.
+
+요청은 응답을 기다리지 않고 목표 RPS 간격으로 보낸다 (서버가 느려져도 도착률이 줄지 않음).
+동시에 진행 중인 요청이 max_in_flight 를 넘으면 보내지 않고 client_dropped 로 센다.
+"""
+import re
+import math
+import time
+import asyncio
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+_BUCKET_LINE = re.compile(r'^(\w+)_bucket\{(.*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class Endpoint:
+    def __init__(self, name: str, url: str, payload_fn: Callable[[str], Dict]) -> None:
+        self.name = name
+        self.url = url
+        self.payload_fn = payload_fn
+
+
+def chat_endpoint(base_url: str) -> Endpoint:
+    return Endpoint(
+        "chat",
+        f"{base_url.rstrip('/')}/chat",
+        lambda q: {"messages": [{"role": "user", "content": q}], "isConsultantMode": False},
+    )
+
+
+def rag_endpoint(base_url: str) -> Endpoint:
+    return Endpoint("rag", f"{base_url.rstrip('/')}/rag", lambda q: {"query": q})
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """nearest-rank 백분위수"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict:
+    values = sorted(latencies_ms)
+    return {
+        "p50_ms": _round(percentile(values, 50)),
+        "p95_ms": _round(percentile(values, 95)),
+        "p99_ms": _round(percentile(values, 99)),
+        "max_ms": _round(values[-1] if values else None),
+        "mean_ms": _round(sum(values) / len(values) if values else None),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+async def _open_loop(
+    client: httpx.AsyncClient,
+    endpoint: Endpoint,
+    queries: List[str],
+    rps: float,
+    duration: float,
+    max_in_flight: int,
+    cache_bust: bool,
+    results: List[Tuple],
+) -> int:
+    interval = 1.0 / rps
+    total = int(rps * duration)
+    in_flight = 0
+    dropped = 0
+    tasks = []
+
+    async def one(i: int) -> None:
+        nonlocal in_flight
+        query = queries[i % len(queries)]
+        if cache_bust:
+            query = f"{query} ({i})"
+        started = time.perf_counter()
+        try:
+            response = await client.post(endpoint.url, json=endpoint.payload_fn(query))
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            in_flight -= 1
+        results.append((endpoint.name, status, (time.perf_counter() - started) * 1000))
+
+    started = time.perf_counter()
+    for i in range(total):
+        delay = started + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight >= max_in_flight:
+            dropped += 1
+            continue
+        in_flight += 1
+        tasks.append(asyncio.create_task(one(i)))
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return dropped
+
+
+async def replay(
+    endpoints: List[Endpoint],
+    queries: List[str],
+    rps: float,
+    duration: float,
+    max_in_flight: int = 256,
+    timeout: float = 180.0,
+    cache_bust: bool = False,
+) -> Dict:
+    """엔드포인트마다 rps 로 duration 초 동안 질의를 보내고 엔드포인트별 결과를 요약한다."""
+    results: List[Tuple] = []
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        dropped = await asyncio.gather(*[
+            _open_loop(client, ep, queries, rps, duration, max_in_flight, cache_bust, results)
+            for ep in endpoints
+        ])
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for ep, ep_dropped in zip(endpoints, dropped):
+        rows = [r for r in results if r[0] == ep.name]
+        ok = [latency for _, status, latency in rows if status == "200"]
+        report[ep.name] = {
+            "sent": len(rows),
+            "ok": len(ok),
+            "client_dropped": ep_dropped,
+            "status": dict(Counter(status for _, status, _ in rows)),
+            "achieved_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+            "latency": latency_summary(ok),
+            "latency_all": latency_summary([latency for _, _, latency in rows]),
+        }
+    return report
+
+
+# ----------------------------------------------------------------------
+# 서버 /metrics 히스토그램에서 단계별 백분위수 계산
+# ----------------------------------------------------------------------
+
+def parse_histogram(text: str, name: str, label: str) -> Dict[str, List[Tuple[float, float]]]:
+    """Prometheus 텍스트에서 {label 값: [(le, 누적 count), ...]}"""
+    series = defaultdict(list)
+    for line in text.splitlines():
+        match = _BUCKET_LINE.match(line)
+        if not match or match.group(1) != name:
+            continue
+        labels = dict(_LABEL.findall(match.group(2)))
+        if label not in labels or "le" not in labels:
+            continue
+        le = math.inf if labels["le"] == "+Inf" else float(labels["le"])
+        series[labels[label]].append((le, float(match.group(3))))
+    return {key: sorted(buckets) for key, buckets in series.items()}
+
+
+def histogram_quantile(q: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    """누적 버킷에서 버킷 안을 선형 보간한 분위수 (Prometheus histogram_quantile 과 같은 방식)"""
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = q * buckets[-1][1]
+    prev_le, prev_count = 0.0, 0.0
+    for le, count in buckets:
+        if count >= rank:
+            if le == math.inf:
+                return prev_le
+            if count == prev_count:
+                return le
+            return prev_le + (le - prev_le) * (rank - prev_count) / (count - prev_count)
+        prev_le, prev_count = le, count
+    return prev_le
+
+
+def stage_summary(before: str, after: str, name: str = "rag_stage_duration_seconds",
+                  label: str = "stage") -> Dict:
+    """부하 구간 동안(after - before) 관측된 단계별 지연 시간 분포"""
+    start = parse_histogram(before, name, label)
+    end = parse_histogram(after, name, label)
+    summary = {}
+    for key, buckets in sorted(end.items()):
+        base = dict(start.get(key, []))
+        delta = [(le, count - base.get(le, 0.0)) for le, count in buckets]
+        if delta[-1][1] <= 0:
+            continue
+        summary[key] = {
+            "count": int(delta[-1][1]),
+            **{
+                f"p{int(q * 100)}_ms": _round(histogram_quantile(q, delta) * 1000)
+                for q in (0.5, 0.95, 0.99)
+            },
+        }
+    return summary
+
+
+async def scrape(url: str) -> str:
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(url)
+            return response.text if response.status_code == 200 else ""
+    except httpx.HTTPError:
+        return ""
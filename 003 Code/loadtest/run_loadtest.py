@@ -0,0 +1,203 @@
+"""
+백엔드 + RAG 서버 부하 테스트.
+
+로컬 대체 구성(standins.py)으로 두 서버를 띄우거나(--attach-* 를 주면 이미 떠 있는 서버 사용),
+합성 질의 또는 과거 chat_messages 질의를 목표 RPS 로 재생하고
+엔드포인트별 / RAG 단계별 p50/p95/p99 를 JSON 으로 기록한다.
+
+예)
+  python loadtest/run_loadtest.py --rps 5 --duration 60 --endpoints chat,rag
+  python loadtest/run_loadtest.py --queries history --history-db postgresql://... --rps 10
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from load import chat_endpoint, rag_endpoint, replay, scrape, stage_summary
+from standins import BACKEND_DIR, RAG_SERVER_DIR, history_queries, prepare, synthetic_queries
+
+
+def start_server(name: str, cwd: Path, port: int, env: Dict[str, str], log_dir: Path):
+    log = open(log_dir / f"{name}.log", "w", encoding="utf-8")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=str(cwd),
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    print(f">>> {name} 시작 (pid={process.pid}, port={port}, log={log.name})")
+    return process, log
+
+
+def wait_until(url: str, timeout: float, process: Optional[subprocess.Popen] = None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{url} 서버가 종료되었습니다 (exit={process.returncode})")
+        try:
+            if httpx.get(url, timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(1.0)
+    raise TimeoutError(f"{url} 가 {timeout:.0f}s 안에 준비되지 않았습니다")
+
+
+def parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend + RAG load test with local stand-ins")
+    parser.add_argument("--workdir", type=str, default="loadtest_run", help="대체 데이터/로그/리포트 위치")
+    parser.add_argument("--attach-rag", type=str, default=None, help="이미 떠 있는 RAG 서버 URL")
+    parser.add_argument("--attach-backend", type=str, default=None, help="이미 떠 있는 백엔드 URL")
+    parser.add_argument("--rag-port", type=int, default=18001)
+    parser.add_argument("--backend-port", type=int, default=18000)
+    parser.add_argument("--num-docs", type=int, default=500, help="합성 코퍼스 문서 수")
+    parser.add_argument("--embedding-dim", type=int, default=768, help="질문 인코더 출력 차원")
+    parser.add_argument("--endpoints", type=str, default="chat", help="chat,rag 중 쉼표로 구분")
+    parser.add_argument("--queries", type=str, default="synthetic", choices=["synthetic", "history"])
+    parser.add_argument("--history-db", type=str, default=None, help="chat_messages 를 읽을 DB URL")
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--cache-bust", action="store_true", help="질의마다 번호를 붙여 캐시 적중을 막음")
+    parser.add_argument("--rps", type=float, default=5.0, help="엔드포인트별 목표 초당 요청 수")
+    parser.add_argument("--duration", type=float, default=60.0, help="부하 구간 길이(초)")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--request-timeout", type=float, default=180.0)
+    parser.add_argument("--ready-timeout", type=float, default=900.0)
+    parser.add_argument("--rag-env", action="append", default=[], help="RAG 서버 추가 환경변수 KEY=VALUE")
+    parser.add_argument("--backend-env", action="append", default=[], help="백엔드 추가 환경변수 KEY=VALUE")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="리포트 JSON 경로 (기본: workdir/report.json)")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    endpoint_names = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+
+    if args.queries == "history":
+        if not args.history_db:
+            parser.error("--queries history 에는 --history-db 가 필요합니다")
+        queries = history_queries(args.history_db, args.num_queries)
+    else:
+        queries = synthetic_queries(args.num_queries, args.seed)
+    if not queries:
+        parser.error("재생할 질의가 없습니다")
+    print(f">>> 질의 {len(queries)}개 ({args.queries})")
+
+    processes = []
+    rag_url = args.attach_rag
+    backend_url = args.attach_backend
+    try:
+        if rag_url is None:
+            paths = prepare(workdir, args.num_docs, args.embedding_dim, args.seed)
+            rag_url = f"http://127.0.0.1:{args.rag_port}"
+            rag_env = {
+                "LLM_BACKEND": "mock",
+                "CHROMA_URL": f"file://{paths['chroma_dir']}",
+                "PYSERINI_INDEX_DIR": paths["index_root"],
+                "SERVING_MANIFEST_PATH": str(workdir / "serving.json"),
+                "PREFORK_STATUS_PATH": str(workdir / "rag_workers.json"),
+                "WARMUP_MODES": "default",
+                **parse_env(args.rag_env),
+            }
+            processes.append(start_server("rag", RAG_SERVER_DIR, args.rag_port, rag_env, workdir))
+            wait_until(f"{rag_url}/ready", args.ready_timeout, processes[-1][0])
+
+        if backend_url is None and "chat" in endpoint_names:
+            backend_url = f"http://127.0.0.1:{args.backend_port}"
+            backend_env = {
+                "DATABASE_URL": f"sqlite:///{workdir / 'backend.sqlite3'}",
+                "RAG_URL": rag_url,
+                "SEMANTIC_CACHE_EMBEDDING": "hash",
+                **parse_env(args.backend_env),
+            }
+            processes.append(
+                start_server("backend", BACKEND_DIR, args.backend_port, backend_env, workdir)
+            )
+            wait_until(f"{backend_url}/", args.ready_timeout, processes[-1][0])
+
+        endpoints = []
+        for name in endpoint_names:
+            if name == "chat":
+                endpoints.append(chat_endpoint(backend_url))
+            elif name == "rag":
+                endpoints.append(rag_endpoint(rag_url))
+            else:
+                parser.error(f"알 수 없는 엔드포인트: {name}")
+
+        metrics_before = asyncio.run(scrape(f"{rag_url}/metrics"))
+        print(f">>> 부하 시작: {endpoint_names} x {args.rps} rps, {args.duration:.0f}s")
+        endpoint_report = asyncio.run(
+            replay(
+                endpoints,
+                queries,
+                rps=args.rps,
+                duration=args.duration,
+                max_in_flight=args.max_in_flight,
+                timeout=args.request_timeout,
+                cache_bust=args.cache_bust,
+            )
+        )
+        metrics_after = asyncio.run(scrape(f"{rag_url}/metrics"))
+
+        report = {
+            "config": {
+                "rps": args.rps,
+                "duration_s": args.duration,
+                "endpoints": endpoint_names,
+                "queries": args.queries,
+                "num_queries": len(queries),
+                "num_docs": args.num_docs,
+                "cache_bust": args.cache_bust,
+                "rag_env": parse_env(args.rag_env),
+            },
+            "endpoints": endpoint_report,
+            "rag_stages": stage_summary(metrics_before, metrics_after),
+        }
+    finally:
+        for process, log in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+
+    output = Path(args.output) if args.output else workdir / "report.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n=== 엔드포인트 ===")
+    for name, row in report["endpoints"].items():
+        lat = row["latency"]
+        print(
+            f"{name:>6}  sent={row['sent']} ok={row['ok']} dropped={row['client_dropped']} "
+            f"rps={row['achieved_rps']}  p50={lat['p50_ms']}ms p95={lat['p95_ms']}ms "
+            f"p99={lat['p99_ms']}ms  status={row['status']}"
+        )
+    print("\n=== RAG 단계 ===")
+    for stage, row in report["rag_stages"].items():
+        print(
+            f"{stage:>16}  n={row['count']}  p50={row['p50_ms']}ms "
+            f"p95={row['p95_ms']}ms p99={row['p99_ms']}ms"
+        )
+    print(f"\n>>> 리포트: {output}")
+
+
+if __name__ == "__main__":
+    main()
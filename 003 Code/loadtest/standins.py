@@ -0,0 +1,153 @@
+"""
+부하 테스트용 로컬 대체 구성.
+
+  - 코퍼스/질의 : 합성 한국어 청크와 질의 (시드 고정 -> 매번 같은 데이터)
+  - Chroma      : 로컬 PersistentClient 디렉토리. RAG 서버는 CHROMA_URL=file://<경로> 로 프로세스 안에서 연다
+  - Lucene      : 코퍼스로 만든 작은 Pyserini 인덱스 + chunk store (versions/<버전> + CURRENT 구조)
+  - Postgres    : 백엔드는 SQLite 파일을 쓰고, RAG 서버는 본문을 chunk store 에서 읽으며
+                  합성 청크에 이미지 토큰이 없으므로 DB 에 접근하지 않는다
+  - LLM / 임베딩 : LLM_BACKEND=mock, SEMANTIC_CACHE_EMBEDDING=hash
+"""
+import sys
+import json
+import random
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+CODE_DIR = Path(__file__).resolve().parent.parent
+RAG_SERVER_DIR = CODE_DIR / "rag_server"
+BACKEND_DIR = CODE_DIR / "backend"
+
+TOPICS = [
+    "연차 휴가", "출장비 정산", "보안 교육", "재택 근무", "복리후생 포인트",
+    "장비 대여", "회의실 예약", "급여 지급일", "신규 입사자 교육", "성과 평가",
+    "법인 카드", "야간 근무 수당", "사내 동호회", "건강 검진", "퇴직금 정산",
+]
+SENTENCES = [
+    "{topic} 신청은 사내 포털의 전자결재 메뉴에서 진행합니다.",
+    "{topic} 관련 문의는 담당 부서로 메일을 보내 주시기 바랍니다.",
+    "{topic} 처리 기한은 매월 {day}일까지이며 기한이 지나면 다음 달로 이월됩니다.",
+    "{topic} 규정은 {year}년 개정되어 적용 대상이 확대되었습니다.",
+    "팀장 승인 후 인사팀 검토를 거쳐 {topic} 절차가 완료됩니다.",
+    "{topic} 증빙 서류는 스캔본으로 첨부하고 원본은 {day}일 이내에 제출합니다.",
+    "계약직 직원도 {topic} 대상에 포함되며 세부 기준은 별도 공지를 따릅니다.",
+    "{topic} 시스템 점검 시간에는 신청이 제한될 수 있습니다.",
+]
+QUERY_TEMPLATES = [
+    "{topic} 신청은 어떻게 하나요?",
+    "{topic} 관련 규정 알려줘",
+    "{topic} 기한이 언제까지야?",
+    "{topic} 증빙 서류는 뭐가 필요해?",
+    "계약직도 {topic} 받을 수 있나요?",
+]
+
+
+def synthetic_corpus(num_docs: int, seed: int = 0, max_chars: int = 1024) -> List[Dict]:
+    """TextChunker 청크와 비슷한 길이(최대 max_chars)의 합성 문서"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(num_docs):
+        topic = TOPICS[i % len(TOPICS)]
+        sentences = []
+        while sum(len(s) + 1 for s in sentences) < rng.randint(max_chars // 4, max_chars):
+            sentences.append(
+                rng.choice(SENTENCES).format(
+                    topic=topic, day=rng.randint(1, 28), year=rng.randint(2015, 2025)
+                )
+            )
+        corpus.append({"id": f"fixture-{i:05d}", "contents": " ".join(sentences)[:max_chars]})
+    return corpus
+
+
+def synthetic_queries(num_queries: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(QUERY_TEMPLATES).format(topic=rng.choice(TOPICS)) for _ in range(num_queries)
+    ]
+
+
+def history_queries(database_url: str, limit: int) -> List[str]:
+    """과거 chat_messages 의 사용자 질문 (시간순)"""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT content FROM chat_messages "
+                "WHERE role = 'user' ORDER BY created_at LIMIT :limit"
+            ),
+            {"limit": limit},
+        ).fetchall()
+    engine.dispose()
+    return [row[0] for row in rows if row[0] and row[0].strip()]
+
+
+def hashed_embedding(text: str, dim: int) -> List[float]:
+    """문서 id 로 정해지는 단위 벡터 (검색 품질이 아니라 처리량 측정용)"""
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+
+def build_chroma(corpus: List[Dict], path: Path, dim: int, collection_name: str = "corpus") -> None:
+    from chromadb import PersistentClient
+
+    client = PersistentClient(path=str(path))
+    collection = client.get_or_create_collection(
+        name=collection_name, metadata={"hnsw:space": "cosine"}
+    )
+    batch = 256
+    for start in range(0, len(corpus), batch):
+        docs = corpus[start:start + batch]
+        collection.add(
+            ids=[d["id"] for d in docs],
+            embeddings=[hashed_embedding(d["id"], dim) for d in docs],
+            metadatas=[{"title": d["contents"][:30]} for d in docs],
+        )
+    print(f">>> Chroma fixture: {collection.count()}개 문서 ({path})")
+
+
+def build_index(corpus: List[Dict], index_root: Path) -> str:
+    """Pyserini 인덱스와 chunk store 를 새 버전으로 만들고 CURRENT 로 공개한다."""
+    sys.path.append(str(RAG_SERVER_DIR / "doc_retrieval"))
+    from database.index_versions import new_version_dir, publish_version
+    from database.pyserini_bm25 import (
+        DEFAULT_RERANK_TOKENIZER,
+        build_chunk_store,
+        build_pyserini_index,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        jsonl_path = Path(temp_dir) / "corpus.jsonl"
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for doc in corpus:
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+
+        version_dir = new_version_dir(index_root)
+        build_pyserini_index(jsonl_path, version_dir, "korean")
+        build_chunk_store(jsonl_path, version_dir, DEFAULT_RERANK_TOKENIZER)
+        publish_version(index_root, version_dir.name)
+    return version_dir.name
+
+
+def prepare(workdir: Path, num_docs: int, embedding_dim: int, seed: int = 0) -> Dict[str, str]:
+    """workdir 아래에 대체 구성 데이터를 만들고, 서버에 넘길 경로들을 돌려준다."""
+    workdir.mkdir(parents=True, exist_ok=True)
+    corpus = synthetic_corpus(num_docs, seed)
+
+    chroma_dir = workdir / "chroma"
+    index_root = workdir / "pyserini_index"
+    build_chroma(corpus, chroma_dir, embedding_dim)
+    version = build_index(corpus, index_root)
+
+    return {
+        "chroma_dir": str(chroma_dir),
+        "index_root": str(index_root),
+        "index_version": version,
+        "backend_db": str(workdir / "backend.sqlite3"),
+    }
@@ -0,0 +1,183 @@
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from metrics import counter, gauge, histogram
+
+logger = logging.getLogger("rag")
+
+ADMISSION_QUEUE_DEPTH = gauge(
+    "rag_admission_queue_depth", "Requests waiting for a stage slot", labelnames=("stage",)
+)
+ADMISSION_ACTIVE = gauge(
+    "rag_admission_active", "Requests holding a stage slot", labelnames=("stage",)
+)
+ADMISSION_REJECTED = counter(
+    "rag_admission_rejected_total",
+    "Requests rejected by admission control",
+    labelnames=("stage", "reason"),
+)
+ADMISSION_WAIT = histogram(
+    "rag_admission_wait_seconds", "Time spent queued for a stage slot", labelnames=("stage",)
+)
+
+
+class AdmissionRejected(Exception):
+    """status_code 429(클라이언트 한도) 또는 503(과부하) 와 Retry-After(초)를 담는다."""
+
+    def __init__(self, stage: str, reason: str, status_code: int, retry_after: int) -> None:
+        super().__init__(f"{stage} 단계 요청 거절 ({reason})")
+        self.stage = stage
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    단계(stage)별 동시 실행 수 제한 + 대기열 (이벤트 루프 안에서만 사용).
+
+    - 슬롯이 비어 있으면 바로 실행하고, 아니면 클라이언트별 대기열에 넣는다
+    - 슬롯이 반납되면 클라이언트를 돌아가며(round-robin) 하나씩 깨워, 한 클라이언트가 몰아 보내도
+      다른 클라이언트가 굶지 않는다
+    - 한 클라이언트의 실행+대기 수가 max_per_client 를 넘으면 429
+    - 전체 대기열이 가득 찼거나 max_queue_wait 안에 슬롯을 못 받으면 503
+    Retry-After 는 최근 슬롯 점유 시간과 대기 중인 요청 수로 추정한다.
+
+    대기는 asyncio future 로 하므로 대기 중인 요청은 스레드풀 스레드를 잡지 않는다.
+    슬롯을 받은 뒤의 blocking 작업만 run_in_threadpool 로 넘긴다.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        max_concurrency: int,
+        max_queue: int,
+        max_queue_wait: float,
+        max_per_client: int,
+    ) -> None:
+        self.stage = stage
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_queue_wait = max_queue_wait
+        self.max_per_client = max(1, max_per_client)
+
+        self._active = 0
+        self._queued = 0
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._per_client: Dict[str, int] = {}
+        self._avg_hold = 1.0
+
+        self._depth_gauge = ADMISSION_QUEUE_DEPTH.labels(stage=stage)
+        self._active_gauge = ADMISSION_ACTIVE.labels(stage=stage)
+        self._wait_hist = ADMISSION_WAIT.labels(stage=stage)
+
+    def _retry_after(self) -> int:
+        estimate = self._avg_hold * (self._queued + 1) / self.max_concurrency
+        return int(min(30, max(1, math.ceil(estimate))))
+
+    def _reject(self, reason: str, status_code: int) -> AdmissionRejected:
+        ADMISSION_REJECTED.labels(stage=self.stage, reason=reason).inc()
+        return AdmissionRejected(self.stage, reason, status_code, self._retry_after())
+
+    def _update_gauges(self) -> None:
+        self._depth_gauge.set(self._queued)
+        self._active_gauge.set(self._active)
+
+    def _release_client(self, client: str) -> None:
+        remaining = self._per_client.get(client, 0) - 1
+        if remaining > 0:
+            self._per_client[client] = remaining
+        else:
+            self._per_client.pop(client, None)
+
+    def _remove_waiter(self, client: str, waiter: asyncio.Future) -> None:
+        queue = self._waiting.get(client)
+        if queue is not None:
+            queue.remove(waiter)
+            if not queue:
+                del self._waiting[client]
+        self._queued -= 1
+        self._release_client(client)
+        self._update_gauges()
+
+    def check(self, client: str) -> None:
+        """슬롯을 잡지 않고 지금 들어오면 바로 거절될지 확인한다 (스트리밍 응답 시작 전 등)."""
+        if self._per_client.get(client, 0) >= self.max_per_client:
+            raise self._reject("client_limit", 429)
+        if self._active >= self.max_concurrency and self._queued >= self.max_queue:
+            raise self._reject("queue_full", 503)
+
+    async def acquire(self, client: str) -> None:
+        if self._per_client.get(client, 0) >= self.max_per_client:
+            raise self._reject("client_limit", 429)
+        if self._active < self.max_concurrency and self._queued == 0:
+            self._active += 1
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+            self._update_gauges()
+            self._wait_hist.observe(0.0)
+            return
+        if self._queued >= self.max_queue:
+            raise self._reject("queue_full", 503)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client, deque()).append(waiter)
+        self._queued += 1
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        self._update_gauges()
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_queue_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # 슬롯을 넘겨받은 직후 타임아웃/취소된 경우: 받은 슬롯을 돌려준다
+                self.release(client)
+            else:
+                waiter.cancel()
+                self._remove_waiter(client, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("queue_timeout", 503)
+        self._wait_hist.observe(time.perf_counter() - started)
+
+    def release(self, client: str, held_seconds: Optional[float] = None) -> None:
+        self._release_client(client)
+        if held_seconds is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_seconds
+
+        if self._waiting:
+            # 가장 오래 기다린 클라이언트에게 슬롯을 넘기고 그 클라이언트를 맨 뒤로 보낸다
+            next_client, queue = next(iter(self._waiting.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(next_client)
+            else:
+                del self._waiting[next_client]
+            self._queued -= 1
+            waiter.set_result(True)
+        else:
+            self._active -= 1
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def slot(self, client: str):
+        await self.acquire(client)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(client, time.perf_counter() - started)
+
+    def stats(self) -> Dict:
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "clients": len(self._per_client),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
@@ -0,0 +1,61 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from query_utils import normalize_query
+from ttl_cache import TTLCache
+
+logger = logging.getLogger("rag")
+
+# (인덱스 버전, 리랭크된 청크 id 순서의 해시)
+ContextId = Tuple[Optional[str], str]
+
+
+def context_id(index_version: Optional[str], chunk_ids: Sequence[str]) -> ContextId:
+    """LLM 에 들어가는 문맥의 식별자. 같은 청크가 같은 순서로 뽑히면 같은 값이 된다."""
+    digest = hashlib.sha1("\x1f".join(str(c) for c in chunk_ids).encode("utf-8")).hexdigest()
+    return index_version, digest
+
+
+class AnswerCache:
+    """
+    (인덱스 버전, 모드, 정규화 쿼리, 문맥 해시, 프롬프트 버전) -> (답변, 이미지) 캐시.
+    검색/리랭크 결과가 같고 프롬프트가 같으면 LLM 을 다시 부르지 않는다.
+    인덱스 버전이 바뀌면 retain_index() 로 이전 버전 항목을 비운다.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: Optional[float] = 600.0) -> None:
+        self._cache = TTLCache("answer", max_entries, ttl_seconds)
+
+    @staticmethod
+    def _key(mode: str, query: str, context: ContextId, prompt_version: str) -> tuple:
+        index_version, context_hash = context
+        return index_version, mode, normalize_query(query), context_hash, prompt_version
+
+    def get(
+        self, mode: str, query: str, context: ContextId, prompt_version: str
+    ) -> Optional[Tuple[str, List[Dict]]]:
+        return self._cache.get(self._key(mode, query, context, prompt_version))
+
+    def put(
+        self,
+        mode: str,
+        query: str,
+        context: ContextId,
+        prompt_version: str,
+        answer: str,
+        images: List[Dict],
+    ) -> None:
+        # 생성 실패 메시지는 저장하지 않는다
+        if not answer or answer.startswith("Error during generation"):
+            return
+        self._cache.put(self._key(mode, query, context, prompt_version), (answer, list(images)))
+
+    def retain_index(self, index_version: Optional[str]) -> int:
+        removed = self._cache.invalidate(lambda key: key[0] != index_version)
+        if removed:
+            logger.info(f"[ANSWER-CACHE] 인덱스 버전 변경({index_version}) - 항목 {removed}개 무효화")
+        return removed
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
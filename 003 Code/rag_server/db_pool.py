@@ -0,0 +1,211 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import psycopg2
+
+from metrics import counter, gauge, histogram
+
+logger = logging.getLogger("rag")
+
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# 연결 자체가 끊겼을 때 발생하는 예외 - 이 경우 연결을 버리고 새로 맺는다
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class PostgresConnectionPool:
+    """
+    스레드 안전한 PostgreSQL 커넥션 풀.
+
+    - 최대 max_size 개까지만 연결을 만들고, 모두 사용 중이면 acquire_timeout 초까지 대기
+    - health_check_interval 초 이상 놀던 연결은 꺼내기 전에 SELECT 1 로 확인
+    - 사용 중 연결 오류가 나면 그 연결은 폐기하고 다음 요청에서 새로 연결
+    """
+
+    def __init__(
+        self,
+        db_config: Dict,
+        max_size: int = 10,
+        acquire_timeout: float = 5.0,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        self.db_config = db_config
+        self.max_size = max(1, max_size)
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle: deque = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._wait_hist = histogram(
+            "rag_db_pool_wait_seconds",
+            "Seconds spent waiting to acquire a PostgreSQL connection",
+            POOL_WAIT_BUCKETS,
+        )
+        self._in_use_gauge = gauge(
+            "rag_db_pool_connections_in_use", "PostgreSQL connections checked out"
+        )
+        self._open_gauge = gauge(
+            "rag_db_pool_connections_open", "PostgreSQL connections currently open"
+        )
+        self._timeouts = counter(
+            "rag_db_pool_timeouts_total", "Connection acquisitions that timed out"
+        )
+        self._reconnects = counter(
+            "rag_db_pool_reconnects_total", "Connections discarded after a failure"
+        )
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            host=self.db_config["host"],
+            port=self.db_config.get("port", 5432),
+            dbname=self.db_config["dbname"],
+            user=self.db_config["user"],
+            password=self.db_config["password"],
+        )
+        # 조회 전용이므로 트랜잭션을 열어둔 채(idle in transaction) 반납하지 않도록 한다
+        conn.autocommit = True
+        logger.info("DB 연결 성공")
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self):
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        conn = None
+        last_used = 0.0
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("DB 커넥션 풀이 이미 종료되었습니다.")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts.inc()
+                    raise PoolTimeoutError(
+                        f"{self.acquire_timeout}s 안에 DB 연결을 얻지 못했습니다 (max_size={self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+        self._wait_hist.observe(time.monotonic() - started)
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif conn.closed or (
+                time.monotonic() - last_used > self.health_check_interval
+                and not self._is_healthy(conn)
+            ):
+                logger.warning("유휴 DB 연결이 끊어져 재연결합니다.")
+                self._reconnects.inc()
+                self._close_quietly(conn)
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            self._update_gauges()
+            raise
+
+        self._in_use_gauge.inc()
+        self._update_gauges()
+        return conn
+
+    def _release(self, conn, broken: bool = False) -> None:
+        self._in_use_gauge.dec()
+        with self._cond:
+            if broken or conn.closed or self._closed:
+                self._close_quietly(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        self._update_gauges()
+
+    def _expire_idle(self) -> None:
+        # 한 연결이 끊겼다면 (DB 재시작 등) 나머지 유휴 연결도 다음 사용 전에 점검하게 한다
+        with self._cond:
+            self._idle = deque((conn, 0.0) for conn, _ in self._idle)
+
+    def _update_gauges(self) -> None:
+        self._open_gauge.set(self._size)
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except CONNECTION_ERRORS:
+            broken = True
+            self._reconnects.inc()
+            self._expire_idle()
+            raise
+        finally:
+            self._release(conn, broken=broken)
+
+    def fetchall(self, query: str, params=None, retries: int = 1) -> List[tuple]:
+        """조회 쿼리를 실행한다. 연결 오류면 새 연결로 retries 번까지 재시도."""
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(query, params)
+                        return cursor.fetchall()
+            except CONNECTION_ERRORS as e:
+                if attempt >= retries:
+                    raise
+                logger.warning(f"DB 연결 오류로 재시도합니다 ({attempt + 1}/{retries}): {e}")
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "open": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._size -= 1
+            self._cond.notify_all()
+        self._update_gauges()
+        logger.info("DB 연결 종료")
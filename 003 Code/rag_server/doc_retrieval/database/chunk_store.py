@@ -0,0 +1,249 @@
+import os
+import json
+import mmap
+import shutil
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# 디렉토리 구성
+#   manifest.json  : 포맷 버전, 청크 수, 내용 해시 기반 버전 문자열
+#   offsets.json   : {chunk_id: [byte_offset, byte_length]}
+#   contents.bin   : 모든 청크 본문(UTF-8)을 이어 붙인 blob (mmap 으로 읽음)
+#   tokens/<tokenizer_id>/ : (선택) 리랭커 토크나이저로 미리 토크나이즈한 청크 토큰 id
+#       manifest.json : 토크나이저 이름, 최대 토큰 수, 청크/토큰 수
+#       offsets.json  : {chunk_id: [token_offset, token_count]}
+#       ids.bin       : 모든 청크의 토큰 id (int32) 를 이어 붙인 배열
+MANIFEST_FILE = "manifest.json"
+OFFSETS_FILE = "offsets.json"
+CONTENTS_FILE = "contents.bin"
+TOKENS_DIR = "tokens"
+TOKEN_IDS_FILE = "ids.bin"
+FORMAT_VERSION = 1
+
+# 토크나이저 식별자 계산용 문자열 (정규화/대소문자/한글 분리 규칙 차이를 잡아낸다)
+_TOKENIZER_PROBE = "Hello Wörld ÀBC 한국어 토크나이저 테스트 123-456 (괄호) e-mail@example.com"
+
+
+def tokenizer_identity(tokenizer) -> str:
+    """
+    토큰 id 가 같게 나오는 토크나이저끼리 같은 값이 되는 식별자.
+    경로나 slow/fast 구현이 달라도 어휘와 전처리 규칙이 같으면 같은 id 를 쓴다.
+    """
+    digest = hashlib.sha1()
+    vocab = sorted(tokenizer.get_vocab().items())
+    digest.update(json.dumps(vocab, ensure_ascii=False).encode("utf-8"))
+    probe = tokenizer(_TOKENIZER_PROBE, add_special_tokens=False)["input_ids"]
+    digest.update(json.dumps(probe).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class _TokenWriter:
+    def __init__(self, out_dir: Path, tokenize_fn: Callable[[str], List[int]], name: str) -> None:
+        out_dir.mkdir(parents=True)
+        self.out_dir = out_dir
+        self.tokenize_fn = tokenize_fn
+        self.name = name
+        self._ids = open(out_dir / TOKEN_IDS_FILE, "wb")
+        self._offsets: Dict[str, list] = {}
+        self._count = 0
+
+    def add(self, chunk_id: str, content: str) -> None:
+        ids = np.asarray(self.tokenize_fn(content), dtype="<i4")
+        self._ids.write(ids.tobytes())
+        self._offsets[chunk_id] = [self._count, len(ids)]
+        self._count += len(ids)
+
+    def close(self) -> Dict:
+        self._ids.close()
+        with open(self.out_dir / OFFSETS_FILE, "w", encoding="utf-8") as f:
+            json.dump(self._offsets, f, ensure_ascii=False)
+        manifest = {
+            "tokenizer": self.name,
+            "num_chunks": len(self._offsets),
+            "num_tokens": self._count,
+        }
+        with open(self.out_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+
+class ChunkStoreWriter:
+    """
+    인덱싱 시점에 청크 본문을 chunk store 로 기록한다.
+    close() 전까지는 output_dir + ".tmp" 에 쓰고, close() 에서 한 번에 교체한다.
+
+    tokenizers 를 주면 ({tokenizer_id: (이름, tokenize_fn)}) 각 청크의 토큰 id 도 함께 기록해
+    서버가 요청마다 청크 본문을 다시 토크나이즈하지 않게 한다.
+    """
+
+    def __init__(self, output_dir, tokenizers: Optional[Dict[str, tuple]] = None) -> None:
+        self.output_dir = Path(output_dir)
+        self.tmp_dir = self.output_dir.with_name(self.output_dir.name + ".tmp")
+        if self.tmp_dir.exists():
+            shutil.rmtree(self.tmp_dir)
+        self.tmp_dir.mkdir(parents=True)
+
+        self._contents = open(self.tmp_dir / CONTENTS_FILE, "wb")
+        self._offsets: Dict[str, list] = {}
+        self._offset = 0
+        self._hash = hashlib.sha1()
+        self._token_writers = [
+            _TokenWriter(self.tmp_dir / TOKENS_DIR / tokenizer_id, tokenize_fn, name)
+            for tokenizer_id, (name, tokenize_fn) in (tokenizers or {}).items()
+        ]
+
+    def add(self, chunk_id: str, content: str) -> None:
+        data = content.encode("utf-8")
+        self._contents.write(data)
+        self._offsets[str(chunk_id)] = [self._offset, len(data)]
+        self._offset += len(data)
+        for token_writer in self._token_writers:
+            token_writer.add(str(chunk_id), content)
+
+        self._hash.update(str(chunk_id).encode("utf-8"))
+        self._hash.update(data)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def close(self) -> Dict:
+        self._contents.close()
+        tokens = {writer.out_dir.name: writer.close() for writer in self._token_writers}
+
+        with open(self.tmp_dir / OFFSETS_FILE, "w", encoding="utf-8") as f:
+            json.dump(self._offsets, f, ensure_ascii=False)
+
+        manifest = {
+            "format": FORMAT_VERSION,
+            "version": self._hash.hexdigest()[:16],
+            "num_chunks": len(self._offsets),
+            "num_bytes": self._offset,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if tokens:
+            manifest["tokens"] = tokens
+        with open(self.tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        os.replace(self.tmp_dir, self.output_dir)
+        return manifest
+
+
+class TokenStore:
+    """chunk id -> 미리 토크나이즈된 토큰 id (mmap 위의 int32 배열 view)"""
+
+    def __init__(self, token_dir) -> None:
+        self.token_dir = Path(token_dir)
+        with open(self.token_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        with open(self.token_dir / OFFSETS_FILE, "r", encoding="utf-8") as f:
+            self._offsets: Dict[str, list] = json.load(f)
+
+        self._file = open(self.token_dir / TOKEN_IDS_FILE, "rb")
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._ids = np.frombuffer(self._blob, dtype="<i4")
+        else:
+            self._blob = None
+            self._ids = np.zeros(0, dtype="<i4")
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def get(self, chunk_id: str) -> Optional[np.ndarray]:
+        entry = self._offsets.get(chunk_id)
+        if entry is None:
+            return None
+        offset, count = entry
+        return self._ids[offset : offset + count]
+
+    def get_many(self, chunk_ids: Iterable[str]) -> List[Optional[np.ndarray]]:
+        return [self.get(chunk_id) for chunk_id in chunk_ids]
+
+    def close(self) -> None:
+        # 남아 있는 view 가 있으면 mmap 을 닫을 수 없으므로 배열 참조부터 끊는다
+        self._ids = np.zeros(0, dtype="<i4")
+        if self._blob is not None:
+            try:
+                self._blob.close()
+            except BufferError:
+                pass
+        self._file.close()
+
+
+class ChunkStore:
+    """chunk id -> 본문을 mmap 된 blob 에서 바로 읽는 읽기 전용 저장소"""
+
+    def __init__(self, store_dir) -> None:
+        self.store_dir = Path(store_dir)
+
+        with open(self.store_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported chunk store format {self.manifest.get('format')} in {store_dir}"
+            )
+
+        with open(self.store_dir / OFFSETS_FILE, "r", encoding="utf-8") as f:
+            self._offsets: Dict[str, list] = json.load(f)
+
+        self._file = open(self.store_dir / CONTENTS_FILE, "rb")
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._blob = b""
+        self._token_stores: Dict[str, Optional[TokenStore]] = {}
+
+    @classmethod
+    def open_if_exists(cls, store_dir) -> Optional["ChunkStore"]:
+        if not (Path(store_dir) / MANIFEST_FILE).is_file():
+            return None
+        return cls(store_dir)
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._offsets
+
+    def get(self, chunk_id: str) -> Optional[str]:
+        entry = self._offsets.get(chunk_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._blob[offset : offset + length].decode("utf-8")
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for chunk_id in chunk_ids:
+            content = self.get(chunk_id)
+            if content is not None:
+                found[chunk_id] = content
+        return found
+
+    def token_store(self, tokenizer_id: str) -> Optional[TokenStore]:
+        """인덱싱 때 같은 토크나이저로 만든 토큰 id 가 있으면 그 저장소, 없으면 None"""
+        if tokenizer_id not in self._token_stores:
+            token_dir = self.store_dir / TOKENS_DIR / tokenizer_id
+            self._token_stores[tokenizer_id] = (
+                TokenStore(token_dir) if (token_dir / MANIFEST_FILE).is_file() else None
+            )
+        return self._token_stores[tokenizer_id]
+
+    def close(self) -> None:
+        for token_store in self._token_stores.values():
+            if token_store is not None:
+                token_store.close()
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
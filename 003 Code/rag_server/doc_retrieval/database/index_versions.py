@@ -0,0 +1,69 @@
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+# 버전별 인덱스 디렉토리 구성
+#   <root>/versions/<version>/   : Lucene 인덱스 + chunk_store
+#   <root>/CURRENT               : 서빙할 버전 이름 (os.replace 로 원자적으로 교체)
+# CURRENT 가 없으면 <root> 자체를 인덱스로 쓰는 기존 구조로 간주한다.
+VERSIONS_DIRNAME = "versions"
+CURRENT_FILE = "CURRENT"
+
+
+def new_version_dir(root) -> Path:
+    """아직 아무도 읽지 않는 새 버전 디렉토리를 만든다."""
+    base = Path(root) / VERSIONS_DIRNAME
+    version = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = base / version
+    suffix = 1
+    while path.exists():
+        path = base / f"{version}-{suffix}"
+        suffix += 1
+    path.mkdir(parents=True)
+    return path
+
+
+def publish_version(root, version: str) -> None:
+    """CURRENT 를 version 으로 바꾼다. 반쯤 쓰인 포인터가 읽히지 않도록 임시 파일을 교체한다."""
+    root = Path(root)
+    tmp = root / f"{CURRENT_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, root / CURRENT_FILE)
+
+
+def current_version(root) -> Optional[str]:
+    path = Path(root) / CURRENT_FILE
+    if not path.is_file():
+        return None
+    version = path.read_text(encoding="utf-8").strip()
+    return version or None
+
+
+def current_index_dir(root) -> Tuple[Path, Optional[str]]:
+    """(서빙할 인덱스 디렉토리, 버전). 버전 구조가 아니면 (root, None)"""
+    version = current_version(root)
+    if version is None:
+        return Path(root), None
+    return Path(root) / VERSIONS_DIRNAME / version, version
+
+
+def prune_versions(root, keep: int = 3) -> list:
+    """CURRENT 와 최신 keep 개를 제외한 오래된 버전을 지운다."""
+    base = Path(root) / VERSIONS_DIRNAME
+    if not base.is_dir():
+        return []
+
+    current = current_version(root)
+    versions = sorted(p.name for p in base.iterdir() if p.is_dir())
+    removed = []
+    for name in versions[: max(0, len(versions) - keep)]:
+        if name == current:
+            continue
+        shutil.rmtree(base / name, ignore_errors=True)
+        removed.append(name)
+    return removed
@@ -14,6 +14,17 @@ DEFAULT_INDEX_DIR = PROJECT_ROOT / "pyserini_index"
 PARENT_DIR = CURRENT_DIR.parent
 sys.path.append(str(PARENT_DIR))
 
+from database.chunk_store import ChunkStoreWriter, tokenizer_identity
+from database.index_versions import new_version_dir, prune_versions, publish_version
+
+CHUNK_STORE_DIRNAME = "chunk_store"
+# 청크 토큰 id 를 미리 만들어 둘 리랭커 토크나이저 (서빙 번들의 리랭커와 같아야 서버가 사용한다)
+DEFAULT_RERANK_TOKENIZER = os.getenv(
+    "RERANK_TOKENIZER", str(PROJECT_ROOT / "models" / "bundle" / "reranker")
+)
+# 서버 리랭커 max_length(512) 에서 [CLS]/[SEP] 와 최소 질의 길이를 뺀 값보다 넉넉하게 저장한다
+RERANK_MAX_DOC_TOKENS = 512
+
 
 # --------------------------------------------
 # 1. CONFIG LOAD
@@ -107,28 +118,15 @@ def export_corpus_to_jsonl(conn, output_path):
 def build_pyserini_index(jsonl_path, index_dir, language="korean"):
     import subprocess
     import sys
-    import shutil
 
     print(f">>> Building Pyserini index at {index_dir}")
 
     index_path = Path(index_dir)
     temp_path = Path(jsonl_path).parent
 
-    # ✅ 인덱스 디렉토리 안의 내용만 삭제 (마운트 포인트 자체는 유지)
-    if index_path.exists():
-        print(f">>> Clearing existing index dir {index_dir}")
-        for child in index_path.iterdir():
-            try:
-                if child.is_file() or child.is_symlink():
-                    child.unlink()
-                elif child.is_dir():
-                    shutil.rmtree(child)
-            except Exception as e:
-                print(f">>> Warning: failed to remove {child}: {e}")
-    else:
-        index_path.mkdir(parents=True, exist_ok=True)
-
-    # 혹시 위에서 존재했으면 mkdir 생략되고, 없었으면 여기서 생성됨
+    # 서빙 중인 인덱스를 덮어쓰지 않도록, 비어 있는 새 디렉토리에만 빌드한다
+    if index_path.exists() and any(index_path.iterdir()):
+        raise RuntimeError(f"Index dir {index_dir} is not empty; build into a new version dir")
     index_path.mkdir(parents=True, exist_ok=True)
 
     # temp 디렉토리가 있는지 확인
@@ -171,7 +169,62 @@ def build_pyserini_index(jsonl_path, index_dir, language="korean"):
         raise
 
 # --------------------------------------------
-# 5. MAIN
+# 5. BUILD CHUNK STORE
+# --------------------------------------------
+
+def load_rerank_tokenizers(tokenizer_path):
+    """
+    ChunkStoreWriter 에 넘길 {tokenizer_id: (이름, tokenize_fn)}.
+    경로가 없거나 로드에 실패하면 토큰 id 없이 본문만 저장한다 (서버는 요청마다 토크나이즈).
+    """
+    if not tokenizer_path:
+        return {}
+    try:
+        from transformers import AutoTokenizer
+
+        local = Path(tokenizer_path).exists()
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_path, local_files_only=local)
+    except Exception as e:
+        print(f">>> Rerank tokenizer 로드 실패 ({tokenizer_path}): {e} - 토큰 id 없이 저장합니다")
+        return {}
+
+    def tokenize(content):
+        return tokenizer(
+            content,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=RERANK_MAX_DOC_TOKENS,
+        )["input_ids"]
+
+    tokenizer_id = tokenizer_identity(tokenizer)
+    print(f">>> Pre-tokenizing chunks with {tokenizer_path} (tokenizer_id={tokenizer_id})")
+    return {tokenizer_id: (str(tokenizer_path), tokenize)}
+
+
+def build_chunk_store(jsonl_path, index_dir, rerank_tokenizer=None):
+    """
+    RAG 서버가 Postgres 대신 mmap 으로 본문을 읽을 수 있도록
+    인덱스 디렉토리 안에 chunk store 를 만든다 (BM25 인덱스와 같은 버전으로 관리됨).
+    rerank_tokenizer 를 주면 리랭커용 청크 토큰 id 도 함께 저장한다.
+    """
+    store_dir = Path(index_dir) / CHUNK_STORE_DIRNAME
+    print(f">>> Building chunk store at {store_dir}")
+
+    writer = ChunkStoreWriter(store_dir, tokenizers=load_rerank_tokenizers(rerank_tokenizer))
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            doc = json.loads(line)
+            writer.add(doc["id"], doc["contents"])
+    manifest = writer.close()
+
+    print(f">>> Chunk store built: {manifest['num_chunks']} chunks, version={manifest['version']}")
+    for tokenizer_id, tokens in manifest.get("tokens", {}).items():
+        print(f">>> Chunk tokens [{tokenizer_id}]: {tokens['num_tokens']} tokens")
+    return manifest
+
+
+# --------------------------------------------
+# 6. MAIN
 # --------------------------------------------
 
 def main():
@@ -189,7 +242,13 @@ def main():
         "--index_dir",
         type=str,
         default=str(DEFAULT_INDEX_DIR),
-        help="Pyserini 인덱스를 저장할 디렉토리",
+        help="Pyserini 인덱스 루트 디렉토리 (versions/<버전> 아래에 새로 빌드됨)",
+    )
+    parser.add_argument(
+        "--keep_versions",
+        type=int,
+        default=3,
+        help="남겨 둘 인덱스 버전 수 (CURRENT 는 항상 유지)",
     )
     parser.add_argument(
         "--language",
@@ -204,6 +263,12 @@ def main():
         default=None,
         help="JSONL 파일을 저장할 임시 디렉토리 (기본: index_dir/temp)",
     )
+    parser.add_argument(
+        "--rerank_tokenizer",
+        type=str,
+        default=DEFAULT_RERANK_TOKENIZER,
+        help="청크 토큰 id 를 미리 만들 리랭커 토크나이저 경로 (빈 문자열이면 만들지 않음)",
+    )
     
     args = parser.parse_args()
     
@@ -236,11 +301,21 @@ def main():
                 print(">>> No documents found in DB. Exiting.")
                 return
             
-            # Step 2: Build Pyserini index
-            build_pyserini_index(jsonl_path, args.index_dir, args.language)
-            
+            # Step 2: Build Pyserini index into a fresh version dir
+            version_dir = new_version_dir(args.index_dir)
+            build_pyserini_index(jsonl_path, version_dir, args.language)
+
+            # Step 3: Build chunk store next to the index
+            build_chunk_store(jsonl_path, version_dir, args.rerank_tokenizer)
+
+            # Step 4: Point CURRENT at the new version (서버는 이 시점 이후에만 새 인덱스를 본다)
+            publish_version(args.index_dir, version_dir.name)
+            removed = prune_versions(args.index_dir, keep=args.keep_versions)
+            if removed:
+                print(f">>> Removed old index versions: {removed}")
+
             print(">>> Done!")
-            print(f">>> Index saved at: {args.index_dir}")
+            print(f">>> Index saved at: {version_dir} (CURRENT={version_dir.name})")
             print(f">>> Temp JSONL will be automatically deleted")
             
         finally:
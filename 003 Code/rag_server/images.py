@@ -0,0 +1,115 @@
+import io
+import struct
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # 리사이즈 기능은 Pillow 가 있을 때만 사용
+    Image = None
+
+logger = logging.getLogger("rag")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG 시그니처(8) + IHDR 길이/타입(8) + width/height(8)
+IMAGE_HEADER_BYTES = 32
+
+MIN_VARIANT_WIDTH = 16
+MAX_VARIANT_WIDTH = 4096
+
+
+def image_dimensions(header: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """이미지 앞부분 바이트만으로 (width, height) 를 구한다. 알 수 없으면 (None, None)"""
+    if header[:8] == PNG_SIGNATURE and header[12:16] == b"IHDR" and len(header) >= 24:
+        width, height = struct.unpack(">II", header[16:24])
+        return width, height
+    return None, None
+
+
+def media_type_of(data: bytes) -> str:
+    if data[:8] == PNG_SIGNATURE:
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    'bytes=start-end' 형식의 단일 Range 헤더를 (start, end) 포함 구간으로 변환한다.
+    만족할 수 없는 범위면 None.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if start_str == "":
+            # 'bytes=-N' : 마지막 N 바이트
+            length = int(end_str)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class ImageVariantCache:
+    """(image_id, etag, width) -> 리사이즈된 바이트를 담는 작은 LRU"""
+
+    def __init__(self, max_entries: int = 128) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data: bytes) -> None:
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def resize_image(data: bytes, width: int) -> bytes:
+    """
+    가로 폭을 width 로 줄인 PNG 를 반환한다 (비율 유지, 확대는 하지 않음).
+    Pillow 가 없거나 디코딩에 실패하면 원본을 그대로 돌려준다.
+    """
+    if Image is None:
+        logger.warning("Pillow 가 설치되어 있지 않아 원본 이미지를 반환합니다.")
+        return data
+
+    width = max(MIN_VARIANT_WIDTH, min(MAX_VARIANT_WIDTH, width))
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width <= width:
+                return data
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            resized.save(out, format="PNG", optimize=True)
+            return out.getvalue()
+    except Exception as e:
+        logger.error(f"이미지 리사이즈 실패: {e}")
+        return data
@@ -1,29 +1,52 @@
 import logging
 import sys
+import asyncio
 import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 import re
 from typing import List, Dict
-import base64
+from urllib.parse import quote
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_IMPORT_STARTED = time.perf_counter()
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(dotenv_path=BASE_DIR / ".env")
 
 from typing import Optional, List, Dict
+import anyio.to_thread
 import torch
 import uvicorn
-import psycopg2
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from pydantic import BaseModel, Field
 from chromadb import HttpClient
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
 from config import load_api_key
-from prompts import system_prompt
-from models.generate_answer import generate_answer
-from models.load_models_data import load_models_and_data
+from prompts import PROMPT_TEMPLATE_VERSION, system_prompt
+from models.generate_answer import (
+    MODEL_ID as LLM_MODEL_ID,
+    close_backend,
+    generate_answer,
+    generate_answer_stream,
+)
+from models.load_models_data import (
+    load_question_encoder,
+    resolve_question_encoder,
+    resolve_question_encoder_artifact,
+    resolve_reranker_artifact,
+)
+from models.quantized_encoder import load_artifact
+from models.quantized_reranker import load_artifact as load_reranker_artifact
+from models.model_registry import ModelKey, ModelRegistry, model_key
+from models.model_bundle import resolve_model
 
 CURRENT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = CURRENT_DIR
@@ -31,15 +54,127 @@ DOC_RETRIEVAL_DIR = CURRENT_DIR / "doc_retrieval"
 sys.path.append(str(DOC_RETRIEVAL_DIR))
 
 from dpr.model import Pooler
+from database.chunk_store import ChunkStore, tokenizer_identity
+from database.index_versions import current_index_dir
 from retrieval.bm25_retrieval import BM25Retriever
-from retrieval.dpr_retrieval import hybrid_search_ids
-from retrieval.rerank import rerank
+from retrieval.dpr_retrieval import hybrid_search_with_signals
+from retrieval.cascade import RerankCascade
+from retrieval.query_encoder import BatchingQueryEncoder, encode_queries
+from retrieval.embedding_cache import QueryEmbeddingCache
+from retrieval.rerank import BatchingReranker
+from retrieval.score_cache import RerankScoreCache
+from metrics import (
+    REQUEST_ERRORS,
+    gauge,
+    STAGE_DURATION,
+    STAGE_ERRORS,
+    render_prometheus,
+    stage_timer,
+    track_request,
+)
+from db_pool import PostgresConnectionPool
+from prefork import PreforkServer, process_memory, read_worker_status
+from warmup import WarmupState, run_warmup_steps
+from startup import BackgroundConnection, StartupOrchestrator
+from serving_bundle import BundleManager, ReloadInProgressError, ServingBundle
+from answer_cache import AnswerCache, context_id
+from admission import AdmissionController, AdmissionRejected
+from images import (
+    IMAGE_HEADER_BYTES,
+    ImageVariantCache,
+    image_dimensions,
+    media_type_of,
+    parse_byte_range,
+    resize_image,
+)
 
 
 CHROMA_URL = os.getenv("CHROMA_URL", "http://chromadb:8000")  
 CHROMA_COLLECTION_NAME = "corpus"
 CONFIG_PATH = PROJECT_ROOT / "doc_retrieval" / "database" / "config.json"
-PYSERINI_INDEX_DIR = "/app/pyserini_index"
+PYSERINI_INDEX_DIR = os.getenv("PYSERINI_INDEX_DIR", "/app/pyserini_index")
+IMAGE_CACHE_CONTROL = os.getenv("IMAGE_CACHE_CONTROL", "public, max-age=86400")
+IMAGE_VARIANT_CACHE_SIZE = int(os.getenv("IMAGE_VARIANT_CACHE_SIZE", "128"))
+# 지정하지 않으면 서빙 중인 인덱스 버전 안의 chunk_store 를 쓴다
+CHUNK_STORE_DIR = os.getenv("CHUNK_STORE_DIR")
+
+# 서빙 번들(인코더/리랭커/Chroma 컬렉션/Lucene 인덱스) 교체 설정
+SERVING_MANIFEST_PATH = os.getenv("SERVING_MANIFEST_PATH", "/app/serving.json")
+RELOAD_WATCH_SECONDS = float(os.getenv("RELOAD_WATCH_SECONDS", "30"))
+BUNDLE_DRAIN_TIMEOUT = float(os.getenv("BUNDLE_DRAIN_TIMEOUT", "60"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# RAG_WORKERS > 1 이면 모델을 한 번 로드한 뒤 워커를 fork 한다 (CPU 전용)
+RAG_WORKERS = int(os.getenv("RAG_WORKERS", "1"))
+PREFORK_TORCH_THREADS = int(
+    os.getenv("PREFORK_TORCH_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, RAG_WORKERS))))
+)
+PREFORK_MEMORY_LOG_SECONDS = float(os.getenv("PREFORK_MEMORY_LOG_SECONDS", "60"))
+
+ENCODER_BATCHING = os.getenv("ENCODER_BATCHING", "true").lower() == "true"
+ENCODER_BATCH_WINDOW_MS = float(os.getenv("ENCODER_BATCH_WINDOW_MS", "5"))
+ENCODER_MAX_BATCH_SIZE = int(os.getenv("ENCODER_MAX_BATCH_SIZE", "16"))
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+
+# 단계별 동시 실행 수/대기열. 대기열이 차거나 대기 시간을 넘기면 503, 클라이언트 한도를 넘기면 429
+ADMISSION_RETRIEVAL_CONCURRENCY = int(os.getenv("ADMISSION_RETRIEVAL_CONCURRENCY", "4"))
+ADMISSION_RETRIEVAL_QUEUE = int(os.getenv("ADMISSION_RETRIEVAL_QUEUE", "32"))
+ADMISSION_LLM_CONCURRENCY = int(os.getenv("ADMISSION_LLM_CONCURRENCY", "16"))
+ADMISSION_LLM_QUEUE = int(os.getenv("ADMISSION_LLM_QUEUE", "64"))
+ADMISSION_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT_SECONDS", "5"))
+ADMISSION_MAX_PER_CLIENT = int(os.getenv("ADMISSION_MAX_PER_CLIENT", "8"))
+# anyio 스레드풀 크기. 대기 중인 요청은 스레드를 잡지 않고, 슬롯을 받은 검색/LLM 작업과
+# 나머지 sync 엔드포인트(/ready, /images 등)만 이 풀을 쓴다.
+RAG_THREADPOOL_SIZE = int(os.getenv("RAG_THREADPOOL_SIZE", "40"))
+# 슬롯을 받은 작업이 모두 스레드를 쓰고 있어도 sync 엔드포인트용으로 남겨 둘 스레드 수
+THREADPOOL_RESERVE = 8
+
+# 같은 쿼리에 같은 문맥이 검색되면 LLM 답변을 재사용한다 (ANSWER_CACHE_SIZE=0 이면 끔)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "600"))
+
+RERANK_BATCH_WINDOW_MS = float(os.getenv("RERANK_BATCH_WINDOW_MS", "5"))
+RERANK_MAX_BATCH_SIZE = int(os.getenv("RERANK_MAX_BATCH_SIZE", "32"))
+RERANK_MAX_BATCH_TOKENS = int(os.getenv("RERANK_MAX_BATCH_TOKENS", "16384"))
+# 단일 프로세스 실행 시 torch intra-op 스레드 수 (0 이면 torch 기본값).
+# 프로세스 전체 설정이라 리랭커뿐 아니라 질문 인코더에도 적용되고, pre-fork 워커는 PREFORK_TORCH_THREADS 를 쓴다
+RERANK_NUM_THREADS = int(os.getenv("RERANK_NUM_THREADS", "0"))
+# 인덱싱 때 chunk store 에 저장한 리랭커 토큰 id 를 쓰고 요청마다 질의만 토크나이즈한다
+RERANK_PRETOKENIZED = os.getenv("RERANK_PRETOKENIZED", "true").lower() == "true"
+# 배치 안의 (query, doc) 쌍을 토큰 길이 구간별로 나눠 forward 한다 (비우면 배치 전체를 한 번에 패딩)
+RERANK_LENGTH_BUCKETS = [
+    int(b) for b in os.getenv("RERANK_LENGTH_BUCKETS", "64,128,256").split(",") if b.strip()
+]
+# 같은 쿼리가 같은 청크를 다시 리랭크하면 점수를 재사용한다 (RERANK_SCORE_CACHE_SIZE=0 이면 끔)
+RERANK_SCORE_CACHE_SIZE = int(os.getenv("RERANK_SCORE_CACHE_SIZE", "50000"))
+RERANK_SCORE_CACHE_TTL = float(os.getenv("RERANK_SCORE_CACHE_TTL", "3600"))
+
+# 리랭크 캐스케이드: 검색 신호가 확실하면 리랭크 생략, 아니면 후보를 단계적으로 늘리며 조기 종료
+RERANK_CASCADE = os.getenv("RERANK_CASCADE", "false").lower() == "true"
+RERANK_CASCADE_SKIP_MARGIN = float(os.getenv("RERANK_CASCADE_SKIP_MARGIN", "0.05"))
+RERANK_CASCADE_MIN_AGREEMENT = float(os.getenv("RERANK_CASCADE_MIN_AGREEMENT", "0.67"))
+RERANK_CASCADE_FIRST_STAGE = int(os.getenv("RERANK_CASCADE_FIRST_STAGE", "5"))
+RERANK_CASCADE_STEP = int(os.getenv("RERANK_CASCADE_STEP", "3"))
+# 생략/조기 종료한 요청 중 전체 리랭크와 비교할 표본 비율 (품질 영향 측정)
+RERANK_CASCADE_SHADOW_RATE = float(os.getenv("RERANK_CASCADE_SHADOW_RATE", "0.05"))
+
+# 준비(readiness) 전에 미리 로드/실행해 둘 모드와 합성 쿼리
+WARMUP_MODES = [
+    m.strip() for m in os.getenv("WARMUP_MODES", "default,consultant").split(",") if m.strip()
+]
+WARMUP_QUERY = os.getenv("WARMUP_QUERY", "warm-up 질의입니다")
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))
+
+QUESTION_ENCODER_DTYPE = os.getenv("QUESTION_ENCODER_DTYPE", "float32")
+# 참조가 끊긴 모델을 LRU 로 남겨 둘 메모리 한도 (0 이면 참조가 끊기는 즉시 내린다)
+MODEL_REGISTRY_MAX_MB = float(os.getenv("MODEL_REGISTRY_MAX_MB", "0"))
+
+STARTUP_WORKERS = int(os.getenv("STARTUP_WORKERS", "3"))
+STARTUP_TIMEOUT_SECONDS = float(os.getenv("STARTUP_TIMEOUT_SECONDS", "600"))
+CHROMA_RETRY_SECONDS = float(os.getenv("CHROMA_RETRY_SECONDS", "1"))
 
 LOGGER_NAME = "rag"
 logging.basicConfig(level=logging.INFO)
@@ -56,6 +191,8 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# pre-fork 는 CPU 에서만 쓴다 (CUDA 는 fork 후 모델을 공유할 수 없다)
+PREFORK_ENABLED = RAG_WORKERS > 1 and DEVICE == "cpu"
 logger.info(f"Using device: {DEVICE}")
 
 def load_db_config():
@@ -78,21 +215,12 @@ def load_db_config():
 
 
 db_config = load_db_config()
-db_conn = None
-
-
-def get_db_connection():
-    global db_conn
-    if db_conn is None or db_conn.closed:
-        db_conn = psycopg2.connect(
-            host=db_config["host"],
-            port=db_config.get("port", 5432),
-            dbname=db_config["dbname"],
-            user=db_config["user"],
-            password=db_config["password"],
-        )
-        logger.info("DB 연결 성공")
-    return db_conn
+db_pool = PostgresConnectionPool(
+    db_config,
+    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+    acquire_timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+    health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30")),
+)
 
 
 def extract_image_tokens(text: str) -> List[str]:
@@ -131,35 +259,42 @@ def fetch_images_by_ids(tokens: List[str]) -> List[Dict]:
 
     logger.info(f"이미지 조회용 ID 목록: {image_ids}")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
+        # 본문 바이너리는 /images/{id} 로 따로 내려주고, 여기서는 크기 계산용 헤더만 읽는다
         query = """
-            SELECT id, image_data, image_index
+            SELECT id, image_index, substring(image_data from 1 for %s), length(image_data)
             FROM image
             WHERE id = ANY(%s)
         """
-        cursor.execute(query, (image_ids,))
-        results = cursor.fetchall()
+        results = db_pool.fetchall(query, (IMAGE_HEADER_BYTES, image_ids))
 
         images: List[Dict] = []
         for row in results:
+            width, height = image_dimensions(bytes(row[2]))
             images.append(
                 {
                     "id": row[0],
-                    "index": row[2],
-                    "base64": base64.b64encode(row[1]).decode("utf-8"),
+                    "index": row[1],
+                    "width": width,
+                    "height": height,
+                    "size": row[3],
+                    "url": f"/images/{quote(row[0])}",
                 }
             )
         logger.info(f"이미지 조회 완료: {len(images)}개 매칭")
         return images
 
     except Exception as e:
+        STAGE_ERRORS.labels(stage="images").inc()
         logger.error(f"이미지 조회 오류: {e}")
         return []
-    finally:
-        cursor.close()
+
+def fetch_image_data(image_id: str) -> Optional[bytes]:
+    rows = db_pool.fetchall("SELECT image_data FROM image WHERE id = %s", (image_id,))
+    if not rows:
+        return None
+    return bytes(rows[0][0])
+
 
 def fetch_documents_from_db(doc_ids: List[str]) -> Dict[str, str]:
   
@@ -167,23 +302,68 @@ def fetch_documents_from_db(doc_ids: List[str]) -> Dict[str, str]:
         logger.info("not doc_ids!!!! not doc_ids!!!! not doc_ids!!!!")
         return {}
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
         query = "SELECT id, content FROM text WHERE id::text = ANY(%s)"
-        cursor.execute(query, (doc_ids,))
-        results = cursor.fetchall()
+        results = db_pool.fetchall(query, (doc_ids,))
 
         doc_contents = {str(row[0]): row[1] for row in results}
         logger.info(f"DB에서 {len(doc_contents)}개 문서 조회 완료")
         return doc_contents
 
     except Exception as e:
+        STAGE_ERRORS.labels(stage="db_fetch").inc()
         logger.error(f"DB 조회 오류: {e}")
         return {}
-    finally:
-        cursor.close()
+
+def load_chunk_store(store_dir) -> Optional[ChunkStore]:
+    try:
+        store = ChunkStore.open_if_exists(store_dir)
+    except Exception as e:
+        logger.error(f"Chunk store 로드 실패 ({store_dir}): {e}")
+        return None
+
+    if store is None:
+        logger.warning(f"Chunk store 없음 ({store_dir}) - 문서 본문은 DB에서 조회합니다.")
+    else:
+        logger.info(
+            f"Chunk store 로드 완료: {len(store)}개 청크, version={store.version}"
+        )
+    return store
+
+
+def fetch_doc_token_ids(bundle: ServingBundle, doc_ids: List[str]) -> Optional[List]:
+    """
+    인덱싱 때 서빙 중인 리랭커 토크나이저로 만들어 둔 청크 토큰 id.
+    chunk store 에 해당 토크나이저의 토큰이 없으면 None (리랭커가 본문을 토크나이즈한다).
+    """
+    chunk_store = bundle.get("chunk_store")
+    if not RERANK_PRETOKENIZED or chunk_store is None:
+        return None
+    token_store = chunk_store.token_store(bundle["rerank_tokenizer_id"])
+    if token_store is None:
+        return None
+    return token_store.get_many(doc_ids)
+
+
+# 본문을 찾지 못한 청크 자리에 넣는 문자열 (리랭크 점수 캐시에 넣지 않는다)
+MISSING_DOC = "[내용 없음]"
+
+
+def fetch_documents(doc_ids: List[str], chunk_store: Optional[ChunkStore]) -> Dict[str, str]:
+    """chunk store 에서 먼저 찾고, 없는 id 만 DB에서 조회한다."""
+    if chunk_store is None:
+        return fetch_documents_from_db(doc_ids)
+
+    doc_contents = chunk_store.get_many(doc_ids)
+    missing = [doc_id for doc_id in doc_ids if doc_id not in doc_contents]
+    logger.info(
+        f"Chunk store 조회: {len(doc_contents)}개 적중, {len(missing)}개 DB 조회 필요"
+    )
+
+    if missing:
+        doc_contents.update(fetch_documents_from_db(missing))
+    return doc_contents
+
 
 import re
 
@@ -196,49 +376,312 @@ else:
     chroma_host = "chromadb"
     chroma_port = 8000
 
-try:
-    chroma_client = HttpClient(host=chroma_host, port=chroma_port)
-    chroma_collection = chroma_client.get_or_create_collection(CHROMA_COLLECTION_NAME)
+def connect_chroma():
+    if CHROMA_URL.startswith("file://"):
+        # 서버 없이 로컬 디렉토리를 프로세스 안에서 연다 (부하 테스트 등)
+        from chromadb import PersistentClient
+
+        chroma_client = PersistentClient(path=CHROMA_URL[len("file://"):])
+    else:
+        chroma_client = HttpClient(host=chroma_host, port=chroma_port)
+    chroma_client.heartbeat()
     logger.info(f"ChromaDB 서버 연결 성공: {CHROMA_URL}")
+    return chroma_client
+
+
+# 연결에 실패해도 프로세스를 죽이지 않고 백그라운드에서 재시도한다 (준비 전까지 /ready=503)
+chroma = BackgroundConnection("chroma", connect_chroma, retry_interval=CHROMA_RETRY_SECONDS)
+
+
+model_registry = ModelRegistry(max_bytes=int(MODEL_REGISTRY_MAX_MB * 2**20))
 
+pooler = Pooler("cls")
+
+# EMBEDDING_CACHE_SIZE=0 이면 쿼리 임베딩 캐시를 끈다
+embedding_cache = (
+    QueryEmbeddingCache(
+        max_entries=EMBEDDING_CACHE_SIZE,
+        ttl_seconds=EMBEDDING_CACHE_TTL,
+        dtype=EMBEDDING_CACHE_DTYPE,
+    )
+    if EMBEDDING_CACHE_SIZE > 0
+    else None
+)
+
+# 프롬프트 템플릿이나 LLM 모델이 바뀌면 이전 답변을 쓰지 않는다
+ANSWER_PROMPT_VERSION = f"{PROMPT_TEMPLATE_VERSION}:{LLM_MODEL_ID}"
+answer_cache = (
+    AnswerCache(max_entries=ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL)
+    if ANSWER_CACHE_SIZE > 0
+    else None
+)
+
+rerank_score_cache = (
+    RerankScoreCache(max_entries=RERANK_SCORE_CACHE_SIZE, ttl_seconds=RERANK_SCORE_CACHE_TTL)
+    if RERANK_SCORE_CACHE_SIZE > 0
+    else None
+)
+
+rerank_cascade = (
+    RerankCascade(
+        skip_margin=RERANK_CASCADE_SKIP_MARGIN,
+        min_agreement=RERANK_CASCADE_MIN_AGREEMENT,
+        first_stage=RERANK_CASCADE_FIRST_STAGE,
+        step=RERANK_CASCADE_STEP,
+        top_k=3,
+        shadow_rate=RERANK_CASCADE_SHADOW_RATE,
+    )
+    if RERANK_CASCADE
+    else None
+)
+
+RETRIEVAL_MODES = ("default", "consultant")
+
+
+def resolve_bundle_spec(overrides: Optional[Dict] = None) -> Dict:
+    """
+    서빙 번들 spec 을 정한다. 기본값 < SERVING_MANIFEST_PATH(JSON) < overrides 순으로 덮어쓴다.
+      question_encoder / reranker : 모델 경로 (None 이면 기존 해석 규칙)
+      chroma_collection           : Chroma 컬렉션 이름
+      index_dir                   : Lucene 인덱스 디렉토리 (None 이면 PYSERINI_INDEX_DIR 의 CURRENT)
+    """
+    spec = {
+        "question_encoder": None,
+        "reranker": None,
+        "chroma_collection": CHROMA_COLLECTION_NAME,
+        "index_dir": None,
+    }
+    if os.path.isfile(SERVING_MANIFEST_PATH):
+        with open(SERVING_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            spec.update(json.load(f))
+    if overrides:
+        spec.update({k: v for k, v in overrides.items() if v is not None})
+
+    if spec["index_dir"] is None:
+        index_dir, index_version = current_index_dir(PYSERINI_INDEX_DIR)
+    else:
+        index_dir, index_version = Path(spec["index_dir"]), Path(spec["index_dir"]).name
+    spec["index_dir"] = str(index_dir)
+    spec["index_version"] = index_version
+    return spec
+
+
+def new_bundle(spec: Dict) -> ServingBundle:
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    return ServingBundle(f"{spec.get('index_version') or 'base'}-{digest}", spec)
+
+
+def question_encoder_source(spec: Dict, mode: str):
+    """(레지스트리 키, 로더) - 같은 spec/모드면 항상 같은 키가 나온다."""
+    if spec["question_encoder"]:
+        model_path = spec["question_encoder"]
+        local_files_only = os.path.isdir(model_path)
+    else:
+        model_path, local_files_only = resolve_question_encoder(mode == "consultant")
+
+    # CPU 에서는 내보낸 int8 TorchScript 아티팩트(pooler 포함)를 우선 사용한다
+    artifact = resolve_question_encoder_artifact(model_path, DEVICE)
+    if artifact is not None:
+        return model_key(artifact, "int8"), lambda: load_artifact(artifact)
+
+    key = model_key(model_path, QUESTION_ENCODER_DTYPE)
+    return key, lambda: load_question_encoder(
+        model_path, local_files_only, QUESTION_ENCODER_DTYPE
+    )
+
+
+def reranker_source(spec: Dict):
+    if spec["reranker"]:
+        rerank_model_path = spec["reranker"]
+        local_files_only = os.path.isdir(rerank_model_path)
+    else:
+        rerank_model_path, local_files_only = resolve_model("reranker")
+
+    # CPU 에서는 내보낸 int8 TorchScript 리랭커를 우선 사용한다 (RERANKER_RUNTIME)
+    artifact = resolve_reranker_artifact(rerank_model_path, DEVICE)
+    if artifact is not None:
+        return model_key(artifact, "int8"), lambda: load_reranker_artifact(artifact)
+
+    def _load():
+        rerank_tokenizer = AutoTokenizer.from_pretrained(
+            rerank_model_path, local_files_only=local_files_only
+        )
+        rerank_model = AutoModelForSequenceClassification.from_pretrained(
+            rerank_model_path, local_files_only=local_files_only
+        ).to(DEVICE)
+        return rerank_tokenizer, rerank_model
+
+    return model_key(rerank_model_path, "float32"), _load
+
+
+def retire_query_embeddings(model_id: str) -> None:
+    """정리되는 번들의 인코더 임베딩을 캐시에서 지운다. 서빙 중인 번들이 같은 가중치를 쓰면 남긴다."""
+    current = bundles.current
+    if current is not None and not current.closed:
+        serving = {encoder.model_id for encoder in current.get("query_encoders", {}).values()}
+        if model_id in serving:
+            return
+    embedding_cache.invalidate_model(model_id)
+
+
+# 번들 로딩 단계는 실패하면 StartupOrchestrator 가 같은 단계를 다시 실행한다.
+# 그래서 각 단계는 중간에 잡은 레지스트리 참조/배처를 실패 시 스스로 돌려놓고,
+# 모두 성공한 뒤에만 번들에 등록한다 (재시도가 참조 수를 두 번 세지 않도록).
+
+
+def _load_bundle_encoders(bundle: ServingBundle) -> None:
+    """모드별 질문 인코더. 같은 경로로 해석되는 모드는 레지스트리에서 한 인스턴스를 공유한다."""
+    encoder_keys: Dict[str, ModelKey] = {}
+    query_encoders: Dict[ModelKey, BatchingQueryEncoder] = {}
+    acquired: List[ModelKey] = []
     try:
-        doc_count = chroma_collection.count()
-        logger.info(
-            f"Chroma collection '{CHROMA_COLLECTION_NAME}' document count = {doc_count}"
+        for mode in RETRIEVAL_MODES:
+            key, loader = question_encoder_source(bundle.spec, mode)
+            logger.info(f"Loading DPR models for mode={mode} -> {key}")
+
+            # 번들마다 참조를 하나씩 잡아 두므로 서빙 중인 인코더는 제거되지 않는다
+            model_registry.acquire(key, loader)
+            acquired.append(key)
+            encoder_keys[mode] = key
+
+            # 인코더 인스턴스 단위로 하나만 만들어 모드가 달라도 같은 배치에 합류한다
+            if ENCODER_BATCHING and key not in query_encoders:
+                tokenizer, q_encoder = model_registry.get(key)
+                query_encoders[key] = BatchingQueryEncoder(
+                    q_encoder,
+                    tokenizer,
+                    pooler,
+                    device=DEVICE,
+                    max_length=512,
+                    max_batch_size=ENCODER_MAX_BATCH_SIZE,
+                    window_ms=ENCODER_BATCH_WINDOW_MS,
+                    embedding_cache=embedding_cache,
+                )
+    except Exception:
+        for query_encoder in query_encoders.values():
+            query_encoder.close()
+        for key in acquired:
+            model_registry.release(key)
+        raise
+
+    # 닫을 때는 역순이므로 배처가 먼저 멈춘 뒤 레지스트리 참조가 풀린다
+    for key in acquired:
+        bundle.on_close(lambda k=key: model_registry.release(k))
+    if embedding_cache is not None:
+        for query_encoder in query_encoders.values():
+            bundle.on_close(lambda m=query_encoder.model_id: retire_query_embeddings(m))
+    for query_encoder in query_encoders.values():
+        bundle.on_close(query_encoder.close)
+    bundle.set("encoder_keys", encoder_keys)
+    bundle.set("query_encoders", query_encoders)
+
+
+def _load_bundle_reranker(bundle: ServingBundle) -> None:
+    key, loader = reranker_source(bundle.spec)
+    rerank_tokenizer, rerank_model = model_registry.acquire(key, loader)
+    try:
+        tokenizer_id = tokenizer_identity(rerank_tokenizer)
+        reranker = BatchingReranker(
+            rerank_model,
+            rerank_tokenizer,
+            device=DEVICE,
+            max_length=512,
+            max_batch_tokens=RERANK_MAX_BATCH_TOKENS,
+            max_batch_size=RERANK_MAX_BATCH_SIZE,
+            window_ms=RERANK_BATCH_WINDOW_MS,
+            length_buckets=RERANK_LENGTH_BUCKETS,
+            score_cache=rerank_score_cache,
+            index_version=bundle.spec.get("index_version"),
         )
-    except Exception as e:
-        logger.error(f"Chroma collection count 확인 중 오류: {e}")
+    except Exception:
+        model_registry.release(key)
+        raise
 
-except Exception as e:
-    logger.error(f"ChromaDB 서버 연결 오류: {e}")
-    sys.exit(1)
+    bundle.on_close(lambda: model_registry.release(key))
+    bundle.set("reranker", reranker, close_fn=reranker.close)
+    bundle.set("rerank_tokenizer_id", tokenizer_id)
 
 
-_retrieval_models_cache = {
-    "consultant": None,
-    "default": None,
-}
+def _load_bundle_index(bundle: ServingBundle) -> None:
+    index_dir = bundle.spec["index_dir"]
+    bm25_retriever = BM25Retriever(index_dir)
 
+    def _close_searcher():
+        if bm25_retriever.searcher is not None:
+            bm25_retriever.searcher.close()
 
-def get_retrieval_models(is_consultant_mode: bool):
+    bundle.set("bm25_retriever", bm25_retriever, close_fn=_close_searcher)
 
-    key = "consultant" if is_consultant_mode else "default"
-    if _retrieval_models_cache[key] is None:
-        logger.info(f"Loading DPR models for mode={key}")
-        tokenizer, q_encoder = load_models_and_data(is_consultant_mode)
-        _retrieval_models_cache[key] = (tokenizer, q_encoder)
-    else:
-        tokenizer, q_encoder = _retrieval_models_cache[key]
-    return tokenizer, q_encoder
+    chunk_store = load_chunk_store(CHUNK_STORE_DIR or os.path.join(index_dir, "chunk_store"))
+    if chunk_store is not None:
+        bundle.on_close(chunk_store.close)
+    bundle.set("chunk_store", chunk_store)
 
 
-bm25_retriever = BM25Retriever(PYSERINI_INDEX_DIR)
+def add_bundle_loads(bundle: ServingBundle, loader: StartupOrchestrator) -> None:
+    # 리랭커 / 질문 인코더 / BM25 인덱스는 서로 독립적이므로 병렬로 로드한다
+    loader.add("reranker", lambda: _load_bundle_reranker(bundle))
+    loader.add("question_encoder", lambda: _load_bundle_encoders(bundle))
+    loader.add("bm25", lambda: _load_bundle_index(bundle))
 
-pooler = Pooler("cls")
 
-rerank_model_name = "cross-encoder/ms-marco-MiniLM-L-6-v2"
-rerank_tokenizer = AutoTokenizer.from_pretrained(rerank_model_name)
-rerank_model = AutoModelForSequenceClassification.from_pretrained(rerank_model_name).to(DEVICE)
+def bundle_collection(bundle: ServingBundle):
+    """번들의 Chroma 컬렉션. 기본 컬렉션만 없을 때 생성하고, 그 외에는 존재해야 한다."""
+    collection = bundle.get("chroma_collection")
+    if collection is None:
+        name = bundle.spec["chroma_collection"]
+        client = chroma.get()
+        if name == CHROMA_COLLECTION_NAME:
+            collection = client.get_or_create_collection(name)
+        else:
+            collection = client.get_collection(name)
+        logger.info(f"Chroma collection '{name}' document count = {collection.count()}")
+        bundle.set("chroma_collection", collection)
+    return collection
+
+
+def bundle_retrieval_models(bundle: ServingBundle, is_consultant_mode: bool):
+    """(tokenizer, q_encoder, query_encoder) - ENCODER_BATCHING=false 면 query_encoder 는 None"""
+    key = bundle["encoder_keys"]["consultant" if is_consultant_mode else "default"]
+    tokenizer, q_encoder = model_registry.get(key)
+    return tokenizer, q_encoder, bundle["query_encoders"].get(key)
+
+
+def build_bundle(spec: Dict) -> ServingBundle:
+    """현재 번들과 별개로 새 번들을 로드한다 (hot reload 용)."""
+    bundle = new_bundle(spec)
+    loader = StartupOrchestrator(max_workers=STARTUP_WORKERS)
+    add_bundle_loads(bundle, loader)
+    loader.start()
+    try:
+        loader.wait(timeout=STARTUP_TIMEOUT_SECONDS, retry_failed=False)
+    except Exception:
+        bundle.close()
+        raise
+    finally:
+        loader.close()
+    logger.info(f"[BUNDLE] {bundle.version} 로드 완료: {loader.report()}")
+    return bundle
+
+
+bundles = BundleManager(
+    build_bundle,
+    lambda bundle: run_warmup_steps(bundle_warmup_steps(bundle)),
+    drain_timeout=BUNDLE_DRAIN_TIMEOUT,
+)
+if answer_cache is not None:
+    bundles.on_activate(lambda bundle: answer_cache.retain_index(bundle.spec.get("index_version")))
+if rerank_score_cache is not None:
+    bundles.on_activate(
+        lambda bundle: rerank_score_cache.retain(
+            bundle["reranker"].model_id, bundle.spec.get("index_version")
+        )
+    )
+
+# 기동 시 첫 번들은 startup 오케스트레이터로 로드하고, warm-up 이 끝나면 활성화한다
+initial_bundle = new_bundle(resolve_bundle_spec())
+startup = StartupOrchestrator(max_workers=STARTUP_WORKERS)
+add_bundle_loads(initial_bundle, startup)
 
 app = FastAPI(title="RAG API")
 app.add_middleware(
@@ -250,6 +693,44 @@ app.add_middleware(
 )
 
 
+_stream_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-stream")
+
+retrieval_admission = AdmissionController(
+    "retrieval",
+    max_concurrency=ADMISSION_RETRIEVAL_CONCURRENCY,
+    max_queue=ADMISSION_RETRIEVAL_QUEUE,
+    max_queue_wait=ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+    max_per_client=ADMISSION_MAX_PER_CLIENT,
+)
+llm_admission = AdmissionController(
+    "llm",
+    max_concurrency=ADMISSION_LLM_CONCURRENCY,
+    max_queue=ADMISSION_LLM_QUEUE,
+    max_queue_wait=ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+    max_per_client=ADMISSION_MAX_PER_CLIENT,
+)
+
+
+def client_id(http_request: Request) -> str:
+    """공정성 판단에 쓰는 클라이언트 식별자: X-Client-Id > X-Forwarded-For 첫 주소 > 접속 IP"""
+    explicit = http_request.headers.get("x-client-id")
+    if explicit:
+        return explicit
+    forwarded = http_request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+    if forwarded:
+        return forwarded
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    logger.warning(f"[ADMISSION] {e} - Retry-After {e.retry_after}s")
+    return HTTPException(
+        status_code=e.status_code,
+        detail=f"요청이 많아 처리할 수 없습니다 ({e.stage}: {e.reason})",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 class RAGRequest(BaseModel):
     query: str
     is_consultant_mode: Optional[bool] = Field(default=False, alias="isConsultantMode")
@@ -260,111 +741,694 @@ class RAGResponse(BaseModel):
     images: List = []
 
 
-@app.post("/rag", response_model=RAGResponse)
-def rag_generate(request: RAGRequest):
-    query = request.query
-    is_consultant_mode = request.is_consultant_mode
+def retrieve_documents(query: str, is_consultant_mode: bool):
+    """
+    Hybrid 검색 -> DB 조회 -> Reranking 까지 수행.
+    반환값: (doc_ids, reranked_docs, search_timings, context)
+    context 는 (인덱스 버전, 리랭크된 청크 id 해시) 로 답변 캐시 키에 쓰인다.
+    """
+    # 검색이 끝날 때까지 현재 번들이 교체/정리되지 않도록 잡아 둔다
+    with bundles.use() as bundle:
+        return _retrieve_documents(bundle, query, is_consultant_mode)
 
-    logger.info(
-        f"RAG 요청 - 쿼리: {query[:50]}"
-    )
 
-    try:
-        tokenizer, q_encoder = get_retrieval_models(is_consultant_mode)
+def _retrieve_documents(bundle: ServingBundle, query: str, is_consultant_mode: bool):
+    tokenizer, q_encoder, query_encoder = bundle_retrieval_models(bundle, is_consultant_mode)
 
-        logger.info("Hybrid 검색 (DPR + BM25) 시작")
-        doc_ids = hybrid_search_ids(
+    logger.info("Hybrid 검색 (DPR + BM25) 시작")
+    with stage_timer("hybrid_search"):
+        doc_ids, search_timings, signals = hybrid_search_with_signals(
             query=query,
             q_encoder=q_encoder,
             tokenizer=tokenizer,
             pooler=pooler,
-            chroma_collection=chroma_collection,
-            bm25_retriever=bm25_retriever,
+            chroma_collection=bundle_collection(bundle),
+            bm25_retriever=bundle["bm25_retriever"],
             device=DEVICE,
             max_length=512,
             dense_top_k=30,
             bm25_top_k=30,
             final_top_k=10,
             alpha=0.5,
+            query_encoder=query_encoder,
+        )
+    logger.info(f"Hybrid search returned {len(doc_ids)} document IDs: {doc_ids}")
+    logger.info(
+        f"Hybrid 검색 소요 시간 - DPR: {search_timings.get('dpr_ms', 0.0):.1f}ms, "
+        f"BM25: {search_timings.get('bm25_ms', 0.0):.1f}ms, "
+        f"total: {search_timings['total_ms']:.1f}ms"
+    )
+
+    # 리랭크를 생략하면 RRF 상위 3개 본문만 있으면 된다
+    skip_rerank = rerank_cascade is not None and rerank_cascade.should_skip(signals)
+    fetch_ids = doc_ids[:3] if skip_rerank else doc_ids
+
+    with stage_timer("db_fetch"):
+        doc_contents = fetch_documents(fetch_ids, bundle["chunk_store"])
+
+    for rank, doc_id in enumerate(fetch_ids, start=1):
+        content = doc_contents.get(doc_id, MISSING_DOC)
+        preview = content.replace("\n", " ")[:] if content else "[빈 문서]"
+        logger.info(
+            f"[RAG][DB][{rank}] id={doc_id}, len={len(content) if content else 0}, preview='{preview}'\n ======================== \n"
         )
-        logger.info(f"Hybrid search returned {len(doc_ids)} document IDs: {doc_ids}")
 
-        doc_contents = fetch_documents_from_db(doc_ids)
+    docs = [doc_contents.get(doc_id, MISSING_DOC) for doc_id in fetch_ids]
+    logger.info(f"Fetched {len(docs)} docs from DB")
+
+    reranked_ids = []
+    if docs:
+        logger.info("Reranking 시작")
+        ranked = rank_documents(bundle, query, doc_ids, docs, signals, skip_rerank)
+        reranked_ids = [doc_ids[i] for i in ranked]
+        reranked_docs = [docs[i] for i in ranked]
+        for rank, d in enumerate(reranked_docs, start=1):
+            preview = d.replace("\n", " ")[:200]
+            logger.info(f"[RAG][RERANK][{rank}] preview='{preview}'")
+        logger.info(f"Reranking 완료 - top {len(reranked_docs)} docs 사용")
+    else:
+        logger.warning("검색 결과가 없어 Reranking 생략")
+        reranked_docs = []
+
+    context = context_id(bundle.spec.get("index_version"), reranked_ids)
+    return doc_ids, reranked_docs, search_timings, context
+
+
+def rank_documents(
+    bundle: ServingBundle,
+    query: str,
+    doc_ids: List[str],
+    docs: List[str],
+    signals: Dict[str, float],
+    skip_rerank: bool,
+) -> List[int]:
+    """리랭크 상위 3개 문서의 docs 내 인덱스. RERANK_CASCADE=true 면 캐스케이드를 거친다."""
+    reranker = bundle["reranker"]
+    token_ids = fetch_doc_token_ids(bundle, doc_ids[: len(docs)])
+    chunk_ids = [doc_id if doc != MISSING_DOC else None for doc_id, doc in zip(doc_ids, docs)]
+    if rerank_cascade is None:
+        with stage_timer("rerank"):
+            return reranker.rank(
+                query, docs, top_k=3, doc_token_ids=token_ids, chunk_ids=chunk_ids
+            )
 
-        for rank, doc_id in enumerate(doc_ids, start=1):
-            content = doc_contents.get(doc_id, "[내용 없음]")
-            preview = content.replace("\n", " ")[:] if content else "[빈 문서]"
-            logger.info(
-                f"[RAG][DB][{rank}] id={doc_id}, len={len(content) if content else 0}, preview='{preview}'\n ======================== \n"
+    if skip_rerank:
+        logger.info(
+            f"[CASCADE] 리랭크 생략 - margin={signals['margin']:.3f}, "
+            f"agreement={signals['agreement']:.2f}"
+        )
+        ranked, decision = rerank_cascade.skip(len(docs)), "skip"
+    else:
+        with stage_timer("rerank"):
+            ranked, decision = rerank_cascade.rank(
+                lambda indices: reranker.score(
+                    query,
+                    [docs[i] for i in indices],
+                    [token_ids[i] for i in indices] if token_ids is not None else None,
+                    [chunk_ids[i] for i in indices],
+                ),
+                len(docs),
             )
+        logger.info(f"[CASCADE] {decision} - 후보 {len(docs)}개 중 상위 {ranked}")
 
-        docs = [doc_contents.get(doc_id, "[내용 없음]") for doc_id in doc_ids]
-        logger.info(f"Fetched {len(docs)} docs from DB")
-
-        if docs:
-            logger.info("Reranking 시작")
-            reranked_docs = rerank(
-                query,
-                docs,
-                rerank_model,
-                rerank_tokenizer,
-                top_k=3,
-                device=DEVICE,
+    def full_rerank_ids() -> List[str]:
+        # 요청이 끝난 뒤 백그라운드에서 돌므로 아래에서 잡아 둔 번들 참조를 여기서 놓는다
+        try:
+            if bundle.closed:
+                raise RuntimeError(f"번들 {bundle.version} 이 이미 정리됨")
+            contents = fetch_documents(doc_ids, bundle["chunk_store"])
+            all_docs = [contents.get(doc_id, MISSING_DOC) for doc_id in doc_ids]
+            all_token_ids = fetch_doc_token_ids(bundle, doc_ids)
+            all_chunk_ids = [
+                doc_id if doc != MISSING_DOC else None for doc_id, doc in zip(doc_ids, all_docs)
+            ]
+            ranked_all = reranker.rank(
+                query, all_docs, top_k=3, doc_token_ids=all_token_ids, chunk_ids=all_chunk_ids
             )
-            for rank, d in enumerate(reranked_docs, start=1):
-                preview = d.replace("\n", " ")[:200]
-                logger.info(f"[RAG][RERANK][{rank}] preview='{preview}'")
-            logger.info(f"Reranking 완료 - top {len(reranked_docs)} docs 사용")
-        else:
-            logger.warning("검색 결과가 없어 Reranking 생략")
-            reranked_docs = []
+            return [doc_ids[i] for i in ranked_all]
+        finally:
+            bundle.exit()
 
-        if reranked_docs:
-            context = "\n\n--- 다음 문서 ---\n\n".join(reranked_docs)
-        else:
-            context = "[검색 결과 없음]\n\n"
+    # shadow 가 끝날 때까지 drain 이 이 번들을 기다리도록 사용 중 표시를 하나 더 건다
+    bundle.enter()
+    if not rerank_cascade.maybe_shadow(decision, [doc_ids[i] for i in ranked], full_rerank_ids):
+        bundle.exit()
+    return ranked
 
 
-        all_image_tokens = set()
+def build_context(reranked_docs: List[str]) -> str:
+    if reranked_docs:
+        return "\n\n--- 다음 문서 ---\n\n".join(reranked_docs)
+    return "[검색 결과 없음]\n\n"
 
-        for doc in reranked_docs:
-            tokens = extract_image_tokens(doc)
-            all_image_tokens.update(tokens)
 
-        logger.info(f"총 이미지 토큰 추출: {all_image_tokens}")
+def collect_images(reranked_docs: List[str]) -> List[Dict]:
+    all_image_tokens = set()
 
+    for doc in reranked_docs:
+        tokens = extract_image_tokens(doc)
+        all_image_tokens.update(tokens)
+
+    logger.info(f"총 이미지 토큰 추출: {all_image_tokens}")
+
+    with stage_timer("images"):
         images = fetch_images_by_ids(list(all_image_tokens))
-        logger.info(f"DB에서 {len(images)}개 이미지 조회됨")
+    logger.info(f"DB에서 {len(images)}개 이미지 조회됨")
+    return images
 
-        prompt = system_prompt(
-            is_consultant_mode=is_consultant_mode,
-            query=query,
-            context=context,
+
+def _mode_name(is_consultant_mode: bool) -> str:
+    return "consultant" if is_consultant_mode else "default"
+
+
+def cached_answer(query: str, is_consultant_mode: bool, context):
+    if answer_cache is None:
+        return None
+    return answer_cache.get(
+        _mode_name(is_consultant_mode), query, context, ANSWER_PROMPT_VERSION
+    )
+
+
+def store_answer(query: str, is_consultant_mode: bool, context, answer: str, images: List[Dict]):
+    if answer_cache is not None:
+        answer_cache.put(
+            _mode_name(is_consultant_mode), query, context, ANSWER_PROMPT_VERSION, answer, images
         )
 
-        logger.info("답변 생성을 시작합니다.")
-        response_content = generate_answer(prompt)
 
-        logger.info("RAG 응답 생성 완료")
-        return RAGResponse(
-            answer=response_content,
-            images=images,
+@app.post("/rag", response_model=RAGResponse)
+async def rag_generate(request: RAGRequest, http_request: Request):
+    # 대기열 판단은 이벤트 루프에서 하고, 슬롯을 받은 단계의 blocking 작업만 스레드풀로 넘긴다
+    query = request.query
+    is_consultant_mode = request.is_consultant_mode
+    client = client_id(http_request)
+
+    logger.info(
+        f"RAG 요청 - 쿼리: {query[:50]}"
+    )
+    require_ready()
+
+    with track_request("rag"):
+        try:
+            async with retrieval_admission.slot(client):
+                _, reranked_docs, _, context_key = await run_in_threadpool(
+                    retrieve_documents, query, is_consultant_mode
+                )
+
+            cached = cached_answer(query, is_consultant_mode, context_key)
+            if cached is not None:
+                answer, images = cached
+                logger.info("동일 문맥의 캐시된 답변을 반환합니다.")
+                return RAGResponse(answer=answer, images=images)
+
+            context = build_context(reranked_docs)
+            images = await run_in_threadpool(collect_images, reranked_docs)
+
+            prompt = system_prompt(
+                is_consultant_mode=is_consultant_mode,
+                query=query,
+                context=context,
+            )
+
+            logger.info("답변 생성을 시작합니다.")
+            async with llm_admission.slot(client):
+                with stage_timer("llm"):
+                    response_content = await run_in_threadpool(generate_answer, prompt)
+            store_answer(query, is_consultant_mode, context_key, response_content, images)
+
+            logger.info("RAG 응답 생성 완료")
+            return RAGResponse(
+                answer=response_content,
+                images=images,
+            )
+
+        except AdmissionRejected as e:
+            raise admission_error(e)
+        except Exception as e:
+            logger.error(f"RAG 처리 중 오류: {e}")
+            import traceback
+
+            logger.error(f"스택 트레이스: {traceback.format_exc()}")
+            raise HTTPException(status_code=500, detail=f"RAG 처리 오류: {str(e)}")
+
+
+def _sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/rag/stream")
+async def rag_generate_stream(request: RAGRequest, http_request: Request):
+    """
+    SSE 스트리밍 버전의 /rag.
+    이벤트 순서: retrieval(검색 메타데이터) -> token(답변 조각, 여러 번) -> images -> done
+    오류 발생 시 error 이벤트를 보내고 스트림을 종료한다.
+    """
+    query = request.query
+    is_consultant_mode = request.is_consultant_mode
+
+    logger.info(f"RAG 스트리밍 요청 - 쿼리: {query[:50]}")
+    require_ready()
+
+    # 스트림을 열기 전에 이미 과부하면 상태 코드로 바로 거절한다
+    client = client_id(http_request)
+    try:
+        retrieval_admission.check(client)
+        llm_admission.check(client)
+    except AdmissionRejected as e:
+        raise admission_error(e)
+
+    async def event_stream():
+        with track_request("rag_stream"):
+            try:
+                async with retrieval_admission.slot(client):
+                    doc_ids, reranked_docs, search_timings, context_key = await run_in_threadpool(
+                        retrieve_documents, query, is_consultant_mode
+                    )
+                yield _sse_event(
+                    "retrieval",
+                    {
+                        "doc_ids": doc_ids,
+                        "num_context_docs": len(reranked_docs),
+                        "timings": search_timings,
+                    },
+                )
+
+                cached = cached_answer(query, is_consultant_mode, context_key)
+                if cached is not None:
+                    answer, images = cached
+                    logger.info("동일 문맥의 캐시된 답변을 스트리밍합니다.")
+                    yield _sse_event("token", {"text": answer})
+                    yield _sse_event("images", {"images": images})
+                    yield _sse_event("done", {})
+                    return
+
+                # 이미지 조회는 답변 생성과 동시에 진행하고, 토큰을 모두 보낸 뒤 전송한다.
+                images_future = _stream_executor.submit(collect_images, reranked_docs)
+
+                prompt = system_prompt(
+                    is_consultant_mode=is_consultant_mode,
+                    query=query,
+                    context=build_context(reranked_docs),
+                )
+
+                logger.info("스트리밍 답변 생성을 시작합니다.")
+                llm_started = time.perf_counter()
+                first_token = True
+                answer_parts = []
+                async with llm_admission.slot(client):
+                    with stage_timer("llm"):
+                        # 조각을 하나 받을 때만 스레드풀 스레드를 쓴다
+                        async for delta in iterate_in_threadpool(generate_answer_stream(prompt)):
+                            if first_token:
+                                STAGE_DURATION.labels(stage="llm_first_token").observe(
+                                    time.perf_counter() - llm_started
+                                )
+                                first_token = False
+                            answer_parts.append(delta)
+                            yield _sse_event("token", {"text": delta})
+
+                images = await asyncio.wrap_future(images_future)
+                store_answer(query, is_consultant_mode, context_key, "".join(answer_parts), images)
+                yield _sse_event("images", {"images": images})
+                yield _sse_event("done", {})
+                logger.info("RAG 스트리밍 응답 완료")
+
+            except AdmissionRejected as e:
+                REQUEST_ERRORS.labels(endpoint="rag_stream").inc()
+                logger.warning(f"[ADMISSION] {e} - Retry-After {e.retry_after}s")
+                yield _sse_event(
+                    "error",
+                    {
+                        "detail": f"요청이 많아 처리할 수 없습니다 ({e.stage}: {e.reason})",
+                        "status": e.status_code,
+                        "retry_after": e.retry_after,
+                    },
+                )
+            except Exception as e:
+                REQUEST_ERRORS.labels(endpoint="rag_stream").inc()
+                logger.error(f"RAG 스트리밍 처리 중 오류: {e}")
+                yield _sse_event("error", {"detail": f"RAG 처리 오류: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+image_variant_cache = ImageVariantCache(IMAGE_VARIANT_CACHE_SIZE)
+
+
+@app.get("/images/{image_id}")
+def get_image(image_id: str, request: Request, w: Optional[int] = None):
+    """
+    이미지 바이너리를 직접 내려준다.
+    ETag/Cache-Control 로 캐시 가능하고, Range 요청과 ?w=<px> 축소본을 지원한다.
+    """
+    try:
+        data = fetch_image_data(image_id)
+    except Exception as e:
+        logger.error(f"이미지 조회 오류: {e}")
+        raise HTTPException(status_code=503, detail="이미지 조회 실패")
+
+    if data is None:
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다")
+
+    digest = hashlib.sha1(data).hexdigest()
+    if w:
+        variant_key = (image_id, digest, w)
+        resized = image_variant_cache.get(variant_key)
+        if resized is None:
+            resized = resize_image(data, w)
+            image_variant_cache.put(variant_key, resized)
+        data = resized
+        etag = f'"{digest}-w{w}"'
+    else:
+        etag = f'"{digest}"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMAGE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    media_type = media_type_of(data)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header:
+        byte_range = parse_byte_range(range_header, len(data))
+        if byte_range is None:
+            return Response(
+                status_code=416, headers={"Content-Range": f"bytes */{len(data)}"}
+            )
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return Response(
+            content=data[start : end + 1],
+            status_code=206,
+            media_type=media_type,
+            headers=headers,
         )
 
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
+PROCESS_MEMORY = gauge(
+    "rag_process_memory_bytes",
+    "Memory of this worker process from smaps_rollup",
+    labelnames=("kind",),
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    for kind, value in process_memory().items():
+        PROCESS_MEMORY.labels(kind=kind).set(value)
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+
+warmup_state = WarmupState(retry_interval=WARMUP_RETRY_SECONDS)
+
+
+def _warmup_retrieval(bundle: ServingBundle, is_consultant_mode: bool) -> None:
+    """쿼리 인코딩 -> Chroma 조회까지 한 모드를 한 번 돌린다."""
+    tokenizer, q_encoder, _ = bundle_retrieval_models(bundle, is_consultant_mode)
+
+    # 임베딩 캐시를 거치지 않고 모델을 직접 실행해 실제 forward 를 데운다
+    embedding = encode_queries(
+        [WARMUP_QUERY], q_encoder, tokenizer, pooler, device=DEVICE, max_length=512
+    )[0]
+    bundle_collection(bundle).query(query_embeddings=[embedding.tolist()], n_results=1)
+
+
+def _wait_startup() -> None:
+    startup.wait(timeout=STARTUP_TIMEOUT_SECONDS)
+
+
+def _wait_chroma() -> None:
+    if not chroma.wait(timeout=STARTUP_TIMEOUT_SECONDS):
+        raise ConnectionError(f"ChromaDB 연결 대기 시간 초과: {chroma.last_error}")
+
+
+def _warmup_bm25(bundle: ServingBundle) -> None:
+    bm25_retriever = bundle["bm25_retriever"]
+    if bm25_retriever.searcher is None:
+        logger.warning("BM25 인덱스가 없어 BM25 warm-up 을 생략합니다.")
+        return
+    bm25_retriever.search(WARMUP_QUERY, top_k=1)
+
+
+def _warmup_rerank(bundle: ServingBundle) -> None:
+    bundle["reranker"].score(WARMUP_QUERY, [WARMUP_QUERY])
+
+
+def bundle_warmup_steps(bundle: ServingBundle):
+    steps = [("chroma_collection", lambda: bundle_collection(bundle))]
+    for mode in WARMUP_MODES:
+        is_consultant_mode = mode == "consultant"
+        steps.append(
+            (
+                f"retrieval_{mode}",
+                lambda c=is_consultant_mode: _warmup_retrieval(bundle, c),
+            )
+        )
+    steps.append(("bm25", lambda: _warmup_bm25(bundle)))
+    steps.append(("rerank", lambda: _warmup_rerank(bundle)))
+    return steps
+
+
+def warmup_steps():
+    return (
+        [("startup", _wait_startup), ("chroma", _wait_chroma)]
+        + bundle_warmup_steps(initial_bundle)
+        + [("activate", lambda: bundles.activate(initial_bundle))]
+    )
+
+
+class ReloadWatcher:
+    """
+    SERVING_MANIFEST_PATH 의 수정 시각과 인덱스 CURRENT 버전을 주기적으로 확인하고,
+    바뀌었으면 새 번들로 교체한다. 같은 변경에 대해 실패한 교체는 반복하지 않는다.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._last_seen = None
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def fingerprint():
+        try:
+            manifest_mtime = os.path.getmtime(SERVING_MANIFEST_PATH)
+        except OSError:
+            manifest_mtime = None
+        return manifest_mtime, current_index_dir(PYSERINI_INDEX_DIR)[1]
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            if not warmup_state.ready:
+                continue
+            fingerprint = self.fingerprint()
+            if fingerprint == self._last_seen:
+                continue
+            self._last_seen = fingerprint
+            logger.info(f"[BUNDLE] 변경 감지 {fingerprint} - 새 번들 로드 시작")
+            try:
+                bundles.reload(resolve_bundle_spec())
+            except Exception as e:
+                logger.error(f"[BUNDLE] 자동 교체 실패: {e}")
+
+    def start(self) -> None:
+        self._last_seen = self.fingerprint()
+        self._thread = threading.Thread(target=self._loop, name="rag-reload-watch", daemon=True)
+        self._thread.start()
+
+
+reload_watcher = ReloadWatcher(RELOAD_WATCH_SECONDS)
+
+
+@app.on_event("startup")
+def startup_event():
+    startup.record("imports", time.perf_counter() - _IMPORT_STARTED)
+    if not PREFORK_ENABLED:
+        configure_single_process()
+    startup.start()
+    chroma.start()
+    warmup_state.start(warmup_steps())
+    if RELOAD_WATCH_SECONDS > 0:
+        reload_watcher.start()
+
+
+@app.on_event("startup")
+async def configure_threadpool():
+    """검색/LLM 동시 실행 한도가 모두 차도 스레드풀이 먼저 막히지 않도록 풀 크기를 맞춘다."""
+    needed = ADMISSION_RETRIEVAL_CONCURRENCY + ADMISSION_LLM_CONCURRENCY + THREADPOOL_RESERVE
+    tokens = max(RAG_THREADPOOL_SIZE, needed)
+    if needed > RAG_THREADPOOL_SIZE:
+        logger.warning(
+            f"[ADMISSION] 동시 실행 한도 합({needed - THREADPOOL_RESERVE}) + 여유({THREADPOOL_RESERVE}) 가 "
+            f"RAG_THREADPOOL_SIZE({RAG_THREADPOOL_SIZE}) 보다 커서 스레드풀을 {tokens} 로 늘립니다"
+        )
+    anyio.to_thread.current_default_thread_limiter().total_tokens = tokens
+
+
+def require_ready() -> None:
+    if not warmup_state.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG 서버 준비 중입니다",
+            headers={"Retry-After": str(int(WARMUP_RETRY_SECONDS))},
+        )
+
+
+@app.get("/health")
+def health():
+    """liveness: 프로세스가 살아 있으면 항상 200"""
+    return {"status": "ok", "ready": warmup_state.ready}
+
+
+@app.get("/ready")
+def ready():
+    """readiness: warm-up 이 끝나기 전에는 503 을 돌려 트래픽을 받지 않는다."""
+    report = warmup_state.report()
+    report["startup"] = startup.report()
+    report["chroma"] = chroma.report()
+    report["models"] = model_registry.stats()
+    report["bundle"] = bundles.status()
+    report["admission"] = {
+        "retrieval": retrieval_admission.stats(),
+        "llm": llm_admission.stats(),
+    }
+    current = bundles.current
+    if current is not None and current.get("reranker") is not None:
+        report["reranker"] = current["reranker"].stats()
+        report["reranker"]["pretokenized"] = (
+            fetch_doc_token_ids(current, []) is not None
+        )
+    if rerank_score_cache is not None:
+        report["rerank_score_cache"] = rerank_score_cache.stats()
+    if rerank_cascade is not None:
+        report["rerank_cascade"] = rerank_cascade.stats()
+    if not warmup_state.ready:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+
+def require_admin(token: Optional[str]) -> None:
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다")
+
+
+@app.post("/admin/reload")
+def admin_reload(
+    overrides: Optional[Dict] = Body(default=None),
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    """
+    새 번들을 현재 번들 옆에 로드 -> warm-up -> 원자적 교체.
+    body 로 question_encoder / reranker / chroma_collection / index_dir 를 덮어쓸 수 있다.
+    이전 번들은 진행 중인 요청이 끝난 뒤 정리된다.
+    """
+    require_admin(x_admin_token)
+    require_ready()
+    try:
+        return bundles.reload(resolve_bundle_spec(overrides))
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        logger.error(f"RAG 처리 중 오류: {e}")
-        import traceback
+        raise HTTPException(status_code=500, detail=f"번들 교체 실패: {e}")
+
+
+@app.get("/admin/bundle")
+def admin_bundle(x_admin_token: Optional[str] = Header(default=None)):
+    require_admin(x_admin_token)
+    return bundles.status()
+
+
+@app.get("/workers")
+def workers_status():
+    """pre-fork 모드면 부모가 기록한 워커별 메모리, 아니면 현재 프로세스 메모리"""
+    status = read_worker_status() if RAG_WORKERS > 1 else None
+    if status is None:
+        status = {"workers": [{"worker_id": 0, "pid": os.getpid(), **process_memory()}]}
+    status["served_by"] = os.getpid()
+    return status
+
+
+def preload_models() -> None:
+    """
+    pre-fork 부모에서 초기 번들의 모델 가중치만 레지스트리에 올린다.
+    워커의 번들 로드는 같은 키로 레지스트리를 조회하므로 다시 로드하지 않고 공유 페이지를 쓴다.
+    """
+    # fork 전에 OpenMP 스레드 풀이 만들어지지 않도록 부모는 단일 스레드로 로드한다
+    torch.set_num_threads(1)
+
+    spec = initial_bundle.spec
+    models = []
+    seen = set()
+    for mode in RETRIEVAL_MODES:
+        key, loader = question_encoder_source(spec, mode)
+        if key in seen:
+            continue
+        seen.add(key)
+        # 부모가 잡은 참조는 놓지 않으므로 공유 가중치는 LRU 로 제거되지 않는다
+        models.append(model_registry.acquire(key, loader)[1])
+
+    key, loader = reranker_source(spec)
+    models.append(model_registry.acquire(key, loader)[1])
+
+    for model in models:
+        model.eval()
+        model.requires_grad_(False)
+    logger.info(f"[PREFORK] 공유 모델: {model_registry.stats()}")
+
+
+def configure_worker(worker_id: int) -> None:
+    torch.set_num_threads(PREFORK_TORCH_THREADS)
+    logger.info(
+        f"[PREFORK] worker {worker_id} 초기화 - torch threads={PREFORK_TORCH_THREADS}"
+    )
+
+
+def configure_single_process() -> None:
+    """pre-fork 를 쓰지 않을 때 시작 시 한 번만 torch 스레드 수를 맞춘다 (configure_worker 의 단일 프로세스판)"""
+    if RERANK_NUM_THREADS > 0:
+        torch.set_num_threads(RERANK_NUM_THREADS)
+    logger.info(f"[STARTUP] torch threads={torch.get_num_threads()}")
 
-        logger.error(f"스택 트레이스: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"RAG 처리 오류: {str(e)}")
 
 @app.on_event("shutdown")
 def shutdown_event():
     """서버 종료 시 DB 연결 정리"""
-    global db_conn
-    if db_conn and not db_conn.closed:
-        db_conn.close()
-        logger.info("DB 연결 종료")
+    warmup_state.mark_not_ready("shutting_down")
+    db_pool.close()
+    if bundles.current is not None:
+        bundles.current.close()
+    if rerank_cascade is not None:
+        rerank_cascade.close()
+    close_backend()
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=False)
+    if PREFORK_ENABLED:
+        # 워커가 import 하는 것과 같은 모듈 객체에 모델을 올려야 fork 후 공유된다
+        import main as worker_module
+
+        PreforkServer(
+            "main:app",
+            host="0.0.0.0",
+            port=8001,
+            workers=RAG_WORKERS,
+            preload=worker_module.preload_models,
+            post_fork=worker_module.configure_worker,
+            memory_log_interval=PREFORK_MEMORY_LOG_SECONDS,
+        ).run()
+    else:
+        if RAG_WORKERS > 1:
+            logger.warning("CUDA 에서는 fork 후 모델 공유가 불가능해 단일 프로세스로 실행합니다.")
+        uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=False)
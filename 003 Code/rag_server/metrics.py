@@ -0,0 +1,311 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+STAGE_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Metric:
+    """
+    labelnames 가 있으면 labels(...) 로 자식 메트릭을 만들어 쓰고,
+    없으면 메트릭 자신에 바로 값을 기록한다.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def labels(self, **labels) -> "_Metric":
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+
+    def _samples(self, labels: Sequence[Tuple[str, str]]) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        if self.labelnames:
+            with self._lock:
+                children = sorted(self._children.items())
+            for key, child in children:
+                lines.extend(child._samples(list(zip(self.labelnames, key))))
+        else:
+            lines.extend(self._samples([]))
+        return lines
+
+
+class Histogram(_Metric):
+    """Prometheus 형식으로 내보낼 수 있는 누적 버킷 히스토그램 (thread-safe)"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.buckets[:-1])
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets, self._counts):
+                running += count
+                cumulative.append((bound, running))
+            return {"buckets": cumulative, "sum": self._sum, "count": self._count}
+
+    def _samples(self, labels: Sequence[Tuple[str, str]]) -> List[str]:
+        snap = self.snapshot()
+        lines = []
+        for bound, count in snap["buckets"]:
+            bucket_labels = _label_str(list(labels) + [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+        lines.append(f"{self.name}_sum{_label_str(labels)} {snap['sum']}")
+        lines.append(f"{self.name}_count{_label_str(labels)} {snap['count']}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self, labels: Sequence[Tuple[str, str]]) -> List[str]:
+        return [f"{self.name}{_label_str(labels)} {self._value}"]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self, labels: Sequence[Tuple[str, str]]) -> List[str]:
+        return [f"{self.name}{_label_str(labels)} {self._value}"]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = factory()
+                self._metrics[name] = metric
+            return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        labelnames: Sequence[str] = (),
+    ) -> Histogram:
+        return self._get_or_create(
+            name, lambda: Histogram(name, documentation, buckets, labelnames)
+        )
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(name, lambda: Gauge(name, documentation, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    labelnames: Sequence[str] = (),
+) -> Histogram:
+    return REGISTRY.histogram(name, documentation, buckets, labelnames)
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+# --------------------------------------------
+# RAG 파이프라인 단계별 / 요청별 메트릭
+# --------------------------------------------
+
+STAGE_DURATION = histogram(
+    "rag_stage_duration_seconds",
+    "Latency of each RAG pipeline stage",
+    STAGE_LATENCY_BUCKETS,
+    labelnames=("stage",),
+)
+STAGE_ERRORS = counter(
+    "rag_stage_errors_total",
+    "Exceptions raised inside a RAG pipeline stage",
+    labelnames=("stage",),
+)
+REQUESTS_IN_FLIGHT = gauge(
+    "rag_requests_in_flight",
+    "Requests currently being processed",
+    labelnames=("endpoint",),
+)
+REQUEST_DURATION = histogram(
+    "rag_request_duration_seconds",
+    "End-to-end request latency",
+    STAGE_LATENCY_BUCKETS,
+    labelnames=("endpoint",),
+)
+REQUEST_ERRORS = counter(
+    "rag_request_errors_total",
+    "Requests that ended with an error",
+    labelnames=("endpoint",),
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """with stage_timer("rerank"): ... 구간의 소요 시간을 stage 히스토그램에 기록"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def track_request(endpoint: str):
+    """요청 단위 in-flight 게이지, 전체 지연 시간, 오류 수를 기록"""
+    in_flight = REQUESTS_IN_FLIGHT.labels(endpoint=endpoint)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REQUEST_ERRORS.labels(endpoint=endpoint).inc()
+        raise
+    finally:
+        in_flight.dec()
+        REQUEST_DURATION.labels(endpoint=endpoint).observe(time.perf_counter() - started)
@@ -1,32 +1,113 @@
 import os
+import logging
+import threading
 from pathlib import Path
+from typing import AsyncIterator, Iterator
 from dotenv import load_dotenv
-from openai import OpenAI
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 load_dotenv(dotenv_path=BASE_DIR / ".env")
 
 from config import load_api_key
+from models.llm_backend import BackgroundLoop, LLMBackend, MockBackend, OpenAICompatibleBackend
 
-MODEL_ID = os.getenv("MODEL_ID", "gpt-4o-mini")
-
-client = OpenAI(api_key=load_api_key())
+logger = logging.getLogger("rag")
 
+MODEL_ID = os.getenv("MODEL_ID", "gpt-4o-mini")
 
-def generate_answer(prompt: str) -> str:
-    try:
-        response = client.responses.create(
-            model=MODEL_ID,
-            input=prompt,
-            max_output_tokens=int(os.getenv("out_seq_length", 1024)),
-            temperature=float(os.getenv("temperature", 0.7)),
-            top_p=float(os.getenv("top_p", 0.9)),
+# "openai" (기본) 또는 "mock" - mock 은 API 키 없이 결정적인 답변을 흉내낸다 (테스트/부하 테스트용)
+# 예전 이름인 "fake" 도 mock 으로 취급한다.
+# 로컬 Qwen 등은 vLLM/Ollama 같은 OpenAI 호환 서버로 띄우고 LLM_BASE_URL 만 바꾸면 된다.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE_MS = float(os.getenv("LLM_BACKOFF_BASE_MS", "200"))
+LLM_BACKOFF_MAX_MS = float(os.getenv("LLM_BACKOFF_MAX_MS", "5000"))
+# 0 이면 hedge 하지 않음. 보통 p95 응답(첫 토큰) 시간 정도로 둔다.
+LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "0"))
+
+MOCK_LLM_FIRST_TOKEN_MS = float(os.getenv("MOCK_LLM_FIRST_TOKEN_MS", "200"))
+MOCK_LLM_TOKEN_DELAY_MS = float(
+    os.getenv("MOCK_LLM_TOKEN_DELAY_MS", os.getenv("FAKE_LLM_TOKEN_DELAY_MS", "20"))
+)
+
+
+def create_backend() -> LLMBackend:
+    if LLM_BACKEND in ("mock", "fake"):
+        return MockBackend(
+            first_token_ms=MOCK_LLM_FIRST_TOKEN_MS, token_delay_ms=MOCK_LLM_TOKEN_DELAY_MS
         )
-        return response.output_text.strip()
+    if LLM_BACKEND != "openai":
+        raise ValueError(f"알 수 없는 LLM_BACKEND: {LLM_BACKEND}")
+
+    api_key = os.getenv("LLM_API_KEY")
+    if api_key is None and LLM_BASE_URL.startswith("https://api.openai.com"):
+        api_key = load_api_key()
+    return OpenAICompatibleBackend(
+        base_url=LLM_BASE_URL,
+        api_key=api_key,
+        model=MODEL_ID,
+        max_tokens=int(os.getenv("out_seq_length", 1024)),
+        temperature=float(os.getenv("temperature", 0.7)),
+        top_p=float(os.getenv("top_p", 0.9)),
+        timeout=LLM_TIMEOUT_SECONDS,
+        connect_timeout=LLM_CONNECT_TIMEOUT,
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        max_retries=LLM_MAX_RETRIES,
+        backoff_base_ms=LLM_BACKOFF_BASE_MS,
+        backoff_max_ms=LLM_BACKOFF_MAX_MS,
+        hedge_after_ms=LLM_HEDGE_AFTER_MS,
+    )
+
+
+backend = create_backend()
+# 루프 스레드는 첫 호출 때 만든다 (pre-fork 모드에서 부모가 스레드를 띄우지 않도록)
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> BackgroundLoop:
+    # 스레드풀의 첫 요청들이 동시에 들어와도 루프(와 backend 의 클라이언트/세마포어)는 하나만 쓴다
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                _loop = BackgroundLoop()
+    return _loop
+
+
+async def agenerate_answer(prompt: str) -> str:
+    try:
+        return await backend.generate(prompt)
     except Exception as e:
+        logger.error(f"[LLM] 생성 실패: {e}")
         return f"Error during generation: {e}"
 
 
+def agenerate_answer_stream(prompt: str) -> AsyncIterator[str]:
+    """답변 텍스트 조각(delta)을 생성되는 대로 yield 하는 async iterator"""
+    return backend.stream(prompt)
+
+
+def generate_answer(prompt: str) -> str:
+    return _background_loop().run(agenerate_answer(prompt))
+
+
+def generate_answer_stream(prompt: str) -> Iterator[str]:
+    """답변 텍스트 조각(delta)을 생성되는 대로 yield 한다."""
+    yield from _background_loop().iterate(agenerate_answer_stream(prompt))
+
+
+def close_backend() -> None:
+    if _loop is not None:
+        _loop.run(backend.aclose())
+
+
 # ===================================================================
 # ===================================================================
 # ===================================================================
@@ -0,0 +1,368 @@
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from metrics import STAGE_LATENCY_BUCKETS, counter, gauge, histogram
+
+logger = logging.getLogger("rag")
+
+LLM_REQUEST_DURATION = histogram(
+    "rag_llm_request_duration_seconds",
+    "Latency of one LLM HTTP attempt",
+    STAGE_LATENCY_BUCKETS,
+    labelnames=("backend", "outcome"),
+)
+LLM_RETRIES = counter(
+    "rag_llm_retries_total", "LLM attempts retried after a retryable error", labelnames=("reason",)
+)
+LLM_HEDGES = counter(
+    "rag_llm_hedges_total", "Hedged LLM requests", labelnames=("result",)
+)
+LLM_IN_FLIGHT = gauge("rag_llm_in_flight", "LLM requests holding a concurrency slot")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+class RetryableLLMError(LLMError):
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMBackend:
+    """
+    LLM 호출 인터페이스. 모든 메서드는 async 이며 BackgroundLoop 위에서 실행된다.
+      generate(prompt) -> 완성된 답변
+      stream(prompt)   -> 답변 조각(delta)을 yield 하는 async iterator
+    """
+
+    name = "base"
+
+    async def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class MockBackend(LLMBackend):
+    """
+    API 키 없이 동작하는 결정적 mock. 같은 프롬프트에는 항상 같은 답변을 내고,
+    첫 토큰 지연과 토큰 간 지연을 흉내내 부하 테스트에 쓴다.
+    """
+
+    name = "mock"
+
+    def __init__(self, first_token_ms: float = 200.0, token_delay_ms: float = 20.0) -> None:
+        self.first_token_ms = first_token_ms
+        self.token_delay_ms = token_delay_ms
+
+    @staticmethod
+    def answer_for(prompt: str) -> str:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"[mock-llm:{digest}] 프롬프트 길이 {len(prompt)}자에 대한 테스트 답변입니다."
+
+    async def generate(self, prompt: str) -> str:
+        words = self.answer_for(prompt).split(" ")
+        await asyncio.sleep((self.first_token_ms + self.token_delay_ms * len(words)) / 1000.0)
+        return " ".join(words)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token_ms / 1000.0)
+        for i, word in enumerate(self.answer_for(prompt).split(" ")):
+            if i:
+                await asyncio.sleep(self.token_delay_ms / 1000.0)
+            yield word if i == 0 else " " + word
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    OpenAI 호환 /chat/completions 백엔드 (OpenAI, vLLM, Ollama 등 로컬 Qwen 서버 포함).
+
+    - httpx.AsyncClient 하나로 keep-alive 연결을 풀링한다
+    - 동시 요청 수는 max_concurrency 로 제한한다 (초과분은 슬롯을 기다림)
+    - 연결 오류 / 타임아웃 / 429 / 5xx 는 full-jitter 지수 백오프로 재시도한다 (Retry-After 존중)
+    - hedge_after_ms > 0 이면, 그 시간 안에 답(스트리밍은 첫 토큰)이 없을 때 같은 요청을
+      한 번 더 보내 먼저 끝난 쪽을 쓰고 나머지는 취소한다. 여유 슬롯이 있을 때만 hedge 한다.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 32,
+        max_concurrency: int = 16,
+        max_retries: int = 2,
+        backoff_base_ms: float = 200.0,
+        backoff_max_ms: float = 5000.0,
+        hedge_after_ms: float = 0.0,
+    ) -> None:
+        self.model = model
+        self.params = {"max_tokens": max_tokens, "temperature": temperature, "top_p": top_p}
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base_ms / 1000.0
+        self.backoff_max = backoff_max_ms / 1000.0
+        self.hedge_after = hedge_after_ms / 1000.0 if hedge_after_ms > 0 else None
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+        )
+        # 이벤트 루프에 묶이므로 첫 호출 시 생성한다
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _slots(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _payload(self, prompt: str, stream: bool) -> Dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+            **self.params,
+        }
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response) -> None:
+        if response.status_code < 400:
+            return
+        if response.status_code in RETRYABLE_STATUS:
+            retry_after = response.headers.get("retry-after")
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            raise RetryableLLMError(f"HTTP {response.status_code}", retry_after)
+        raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+    def _backoff(self, attempt: int, error: RetryableLLMError) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.backoff_max))
+        return delay
+
+    async def _with_retries(self, attempt_fn):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await attempt_fn()
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                error = RetryableLLMError(type(e).__name__)
+            except RetryableLLMError as e:
+                error = e
+
+            if attempt == self.max_retries:
+                raise LLMError(f"LLM 요청 실패 ({attempt + 1}회 시도): {error}")
+            LLM_RETRIES.labels(reason=str(error)).inc()
+            delay = self._backoff(attempt, error)
+            logger.warning(f"[LLM] {error} - {delay * 1000:.0f}ms 후 재시도 ({attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    async def _hedged(self, start_fn):
+        """start_fn() 을 실행하고, hedge_after 안에 끝나지 않으면 하나 더 띄워 먼저 끝난 결과를 쓴다."""
+        primary = asyncio.ensure_future(start_fn())
+        if self.hedge_after is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done or self._slots().locked():
+            return await primary
+
+        LLM_HEDGES.labels(result="launched").inc()
+        hedge = asyncio.ensure_future(start_fn())
+        pending = {primary, hedge}
+        winner = None
+        error = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and winner is None:
+                    winner = task
+                elif task.exception() is not None:
+                    error = task.exception()
+
+        # 같은 wait 라운드에 둘 다 끝나면 진 쪽은 done 에 있으므로 pending 만 보면 열린 스트림이 샌다
+        losers = [task for task in (primary, hedge) if task is not winner]
+        for task in losers:
+            if not task.done():
+                task.cancel()
+        await _discard(losers, winner)
+        if winner is None:
+            raise error
+        if winner is hedge:
+            LLM_HEDGES.labels(result="won").inc()
+        return winner.result()
+
+    async def _complete_once(self, prompt: str) -> str:
+        async with self._slots():
+            LLM_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                response = await self._client.post(
+                    "/chat/completions", json=self._payload(prompt, stream=False)
+                )
+                self._raise_for_status(response)
+                outcome = "ok"
+                return response.json()["choices"][0]["message"]["content"].strip()
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            finally:
+                LLM_IN_FLIGHT.dec()
+                LLM_REQUEST_DURATION.labels(backend=self.name, outcome=outcome).observe(
+                    time.perf_counter() - started
+                )
+
+    async def generate(self, prompt: str) -> str:
+        return await self._hedged(lambda: self._with_retries(lambda: self._complete_once(prompt)))
+
+    async def _open_stream(self, prompt: str) -> "_OpenStream":
+        """스트림을 열고 첫 토큰까지 읽어 둔다 (재시도/hedge 는 첫 토큰 전까지만 의미가 있음)."""
+        slots = self._slots()
+        await slots.acquire()
+        LLM_IN_FLIGHT.inc()
+        opened = _OpenStream(self, slots)
+        try:
+            request = self._client.build_request(
+                "POST", "/chat/completions", json=self._payload(prompt, stream=True)
+            )
+            opened.response = await self._client.send(request, stream=True)
+            if opened.response.status_code >= 400:
+                await opened.response.aread()
+            self._raise_for_status(opened.response)
+            opened.lines = opened.response.aiter_lines()
+            opened.first = await opened.next_delta()
+            return opened
+        except BaseException:
+            await opened.aclose(outcome="error")
+            raise
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        opened = await self._hedged(lambda: self._with_retries(lambda: self._open_stream(prompt)))
+        try:
+            if opened.first:
+                yield opened.first
+            while True:
+                delta = await opened.next_delta()
+                if delta is None:
+                    break
+                yield delta
+            await opened.aclose(outcome="ok")
+        finally:
+            await opened.aclose(outcome="cancelled")
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class _OpenStream:
+    """열린 SSE 스트림 하나. 닫힐 때 동시성 슬롯을 돌려준다."""
+
+    def __init__(self, backend: OpenAICompatibleBackend, slots: asyncio.Semaphore) -> None:
+        self.backend = backend
+        self.slots = slots
+        self.response: Optional[httpx.Response] = None
+        self.lines = None
+        self.first: Optional[str] = None
+        self.started = time.perf_counter()
+        self.closed = False
+
+    async def next_delta(self) -> Optional[str]:
+        """다음 텍스트 조각. 스트림이 끝나면 None"""
+        async for line in self.lines:
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return None
+            event = json.loads(data)
+            if "error" in event:
+                raise LLMError(f"Error during generation: {event['error']}")
+            choices = event.get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                return delta
+        return None
+
+    async def aclose(self, outcome: str) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self.response is not None:
+                await self.response.aclose()
+        finally:
+            self.slots.release()
+            LLM_IN_FLIGHT.dec()
+            LLM_REQUEST_DURATION.labels(backend=self.backend.name, outcome=outcome).observe(
+                time.perf_counter() - self.started
+            )
+
+
+async def _discard(tasks, winner) -> None:
+    """hedge 에서 진 쪽 정리: 취소를 기다리고, 이미 열린 스트림이면 닫는다."""
+    for task in tasks:
+        if task is winner:
+            continue
+        try:
+            result = await task
+        except BaseException:
+            continue
+        if isinstance(result, _OpenStream):
+            await result.aclose(outcome="cancelled")
+
+
+class BackgroundLoop:
+    """
+    동기 엔드포인트(FastAPI 스레드풀)에서 async 백엔드를 쓰기 위한 전용 이벤트 루프 스레드.
+    커넥션 풀과 세마포어가 모두 이 루프 하나에 묶인다.
+    """
+
+    def __init__(self, name: str = "rag-llm-loop") -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def iterate(self, agen: AsyncIterator, timeout: Optional[float] = None):
+        """async iterator 를 동기 iterator 로 바꾼다. 소비가 중단되면 원본도 닫는다."""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
@@ -1,32 +1,71 @@
 import os
 import logging
+from typing import Optional, Tuple
+
+import torch
 from transformers import AutoTokenizer, AutoModel
 from pathlib import Path
 
+from models.model_bundle import MODEL_BUNDLE_DIR, resolve_model
+from models.quantized_encoder import (
+    ARTIFACT_MODEL as ENCODER_ARTIFACT_MODEL,
+    is_artifact,
+    load_artifact,
+    read_manifest,
+    same_source,
+)
+from models.quantized_reranker import ARTIFACT_MODEL as RERANKER_ARTIFACT_MODEL
+
 logger = logging.getLogger("rag")
 
+# auto: CPU 에서 int8 아티팩트가 있으면 사용 / torchscript: 아티팩트 필수 / eager: 항상 fp32 HF 모델
+QUESTION_ENCODER_RUNTIME = os.getenv("QUESTION_ENCODER_RUNTIME", "auto").lower()
+QUESTION_ENCODER_ARTIFACT_DIR = os.getenv(
+    "QUESTION_ENCODER_ARTIFACT_DIR", str(Path(MODEL_BUNDLE_DIR) / "question_encoder_int8")
+)
+# 리랭커도 같은 규칙 (auto | torchscript | eager)
+RERANKER_RUNTIME = os.getenv("RERANKER_RUNTIME", "auto").lower()
+RERANKER_ARTIFACT_DIR = os.getenv(
+    "RERANKER_ARTIFACT_DIR", str(Path(MODEL_BUNDLE_DIR) / "reranker_int8")
+)
+
 
-def load_models_and_data(is_consultant_mode: bool):
+def resolve_question_encoder(is_consultant_mode: bool) -> Tuple[str, bool]:
+    """
+    질문 인코더 위치를 정한다. (model_path, local_files_only)
+    학습된 로컬 모델 > 고정 번들 > Hub 순서. 현재는 두 모드가 같은 모델을 쓴다.
+    """
     current_dir = Path(__file__).resolve().parent
 
     qe_local_path = current_dir / "question_encoder"
 
-    model_path: str
-
     if qe_local_path.is_dir() and (qe_local_path / "config.json").is_file():
-        model_path = str(qe_local_path)
-        logger.info(f"Local trained question encoder found at: {model_path}")
-    else:
-        model_path = "snumin44/biencoder-ko-bert-question"
-        logger.info(
-            f"No local trained question encoder found in {qe_local_path}. "
-            f"Falling back to: {model_path}"
-        )
+        logger.info(f"Local trained question encoder found at: {qe_local_path}")
+        return str(qe_local_path), True
+
+    model_path, local_files_only = resolve_model("question_encoder")
+    logger.info(
+        f"No local trained question encoder found in {qe_local_path}. "
+        f"Using: {model_path}"
+    )
+    return model_path, local_files_only
+
+
+def load_question_encoder(
+    model_path: str,
+    local_files_only: bool = False,
+    dtype: str = "float32",
+):
+    torch_dtype = getattr(torch, dtype)
 
     try:
-        logger.info(f"Loading model from: {model_path}")
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-        q_encoder = AutoModel.from_pretrained(model_path)
+        logger.info(f"Loading model from: {model_path} (dtype={dtype})")
+        tokenizer = AutoTokenizer.from_pretrained(
+            model_path, local_files_only=local_files_only
+        )
+        q_encoder = AutoModel.from_pretrained(
+            model_path, local_files_only=local_files_only, torch_dtype=torch_dtype
+        )
 
         logger.info("Model and tokenizer loaded successfully.")
         return tokenizer, q_encoder
@@ -39,7 +78,7 @@ def load_models_and_data(is_consultant_mode: bool):
             try:
                 fallback_path = "klue/roberta-base"
                 tokenizer = AutoTokenizer.from_pretrained(fallback_path)
-                q_encoder = AutoModel.from_pretrained(fallback_path)
+                q_encoder = AutoModel.from_pretrained(fallback_path, torch_dtype=torch_dtype)
                 logger.info("Fallback model klue/roberta-base loaded successfully.")
                 return tokenizer, q_encoder
             except Exception as e2:
@@ -47,3 +86,75 @@ def load_models_and_data(is_consultant_mode: bool):
                 raise e2
         else:
             raise e
+
+
+def resolve_artifact(
+    role: str,
+    model_path: str,
+    device: str,
+    runtime: str,
+    artifact_dir: str,
+    model_file: str,
+) -> Optional[str]:
+    """
+    model_path 대신 쓸 int8 아티팩트 경로. 없거나 쓰지 않을 때는 None.
+    model_path 자체가 아티팩트 디렉토리면 그대로 쓰고, 아니면 artifact_dir 에서
+    같은 원본 모델로 내보낸 아티팩트를 찾는다 (원본이 다르면 점수/임베딩이 달라지므로 쓰지 않음).
+    runtime: auto | torchscript (아티팩트 필수) | eager (항상 fp32 HF 모델)
+    """
+    if runtime == "eager":
+        return None
+    if device != "cpu":
+        if runtime == "torchscript":
+            logger.warning(f"[INT8] device={device} 에서는 {role} int8 아티팩트를 쓰지 않습니다")
+        return None
+
+    if is_artifact(model_path, model_file):
+        return model_path
+
+    if not is_artifact(artifact_dir, model_file):
+        if runtime == "torchscript":
+            raise FileNotFoundError(
+                f"{role} runtime=torchscript 이지만 아티팩트가 없습니다: {artifact_dir}"
+            )
+        return None
+
+    manifest = read_manifest(artifact_dir)
+    if not same_source(manifest, model_path):
+        message = f"[INT8] 아티팩트 원본({manifest.get('source')})이 {role}({model_path})와 다릅니다"
+        if runtime == "torchscript":
+            raise ValueError(message)
+        logger.warning(f"{message} - fp32 모델을 사용합니다")
+        return None
+    return artifact_dir
+
+
+def resolve_question_encoder_artifact(model_path: str, device: str = "cpu") -> Optional[str]:
+    # 원본이 다른 인코더의 아티팩트는 Chroma 에 저장된 문서 임베딩과 맞지 않는다
+    return resolve_artifact(
+        "question_encoder",
+        model_path,
+        device,
+        QUESTION_ENCODER_RUNTIME,
+        QUESTION_ENCODER_ARTIFACT_DIR,
+        ENCODER_ARTIFACT_MODEL,
+    )
+
+
+def resolve_reranker_artifact(model_path: str, device: str = "cpu") -> Optional[str]:
+    return resolve_artifact(
+        "reranker",
+        model_path,
+        device,
+        RERANKER_RUNTIME,
+        RERANKER_ARTIFACT_DIR,
+        RERANKER_ARTIFACT_MODEL,
+    )
+
+
+def load_models_and_data(is_consultant_mode: bool, device: str = "cpu"):
+    model_path, local_files_only = resolve_question_encoder(is_consultant_mode)
+    artifact = resolve_question_encoder_artifact(model_path, device)
+    if artifact is not None:
+        return load_artifact(artifact)
+    return load_question_encoder(model_path, local_files_only)
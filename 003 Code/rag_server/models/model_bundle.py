@@ -0,0 +1,113 @@
+"""
+고정(pinned) 모델 번들.
+
+서버 기동 시 Hugging Face Hub 를 조회하지 않도록, 사용하는 모델을 특정 revision 으로
+미리 받아 한 디렉토리에 모아 둔다.
+
+  MODEL_BUNDLE_DIR/
+    bundle.json          : {role: {"repo_id", "revision", "path"}}
+    question_encoder/    : snapshot
+    reranker/            : snapshot
+
+번들 생성 (이미지 빌드 시 한 번):
+  python models/model_bundle.py --output /app/models/bundle \
+      --question-encoder snumin44/biencoder-ko-bert-question@<commit> \
+      --reranker cross-encoder/ms-marco-MiniLM-L-6-v2@<commit>
+"""
+import os
+import json
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("rag")
+
+BUNDLE_MANIFEST = "bundle.json"
+MODEL_BUNDLE_DIR = os.getenv(
+    "MODEL_BUNDLE_DIR", str(Path(__file__).resolve().parent / "bundle")
+)
+
+DEFAULT_MODELS = {
+    "question_encoder": "snumin44/biencoder-ko-bert-question",
+    "reranker": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+}
+
+
+def load_bundle_manifest(bundle_dir: str = MODEL_BUNDLE_DIR) -> Optional[Dict]:
+    path = Path(bundle_dir) / BUNDLE_MANIFEST
+    if not path.is_file():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_model(role: str, bundle_dir: str = MODEL_BUNDLE_DIR) -> Tuple[str, bool]:
+    """
+    role 에 해당하는 모델 위치를 돌려준다.
+    반환값: (model_path, local_files_only)
+      - 번들에 있으면 로컬 경로와 True (Hub 조회 없음)
+      - 없으면 DEFAULT_MODELS 의 Hub id 와 False
+    """
+    manifest = load_bundle_manifest(bundle_dir)
+    entry = (manifest or {}).get(role)
+    if entry is not None:
+        path = Path(bundle_dir) / entry["path"]
+        if (path / "config.json").is_file():
+            logger.info(
+                f"[BUNDLE] {role}: {entry['repo_id']}@{entry['revision'][:12]} ({path})"
+            )
+            return str(path), True
+        logger.warning(f"[BUNDLE] {role} 경로가 비어 있습니다: {path}")
+
+    logger.warning(f"[BUNDLE] {role} 가 번들에 없어 Hub 에서 받습니다: {DEFAULT_MODELS[role]}")
+    return DEFAULT_MODELS[role], False
+
+
+def _parse_spec(spec: str) -> Tuple[str, Optional[str]]:
+    repo_id, _, revision = spec.partition("@")
+    return repo_id, revision or None
+
+
+def build_bundle(output_dir: str, specs: Dict[str, str]) -> Dict:
+    from huggingface_hub import HfApi, snapshot_download
+
+    api = HfApi()
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_bundle_manifest(output_dir) or {}
+    for role, spec in specs.items():
+        repo_id, revision = _parse_spec(spec)
+        # 브랜치/태그 이름은 커밋 해시로 고정해서 기록한다
+        commit = api.model_info(repo_id, revision=revision).sha
+        print(f"[BUNDLE] {role}: {repo_id}@{commit}")
+        snapshot_download(
+            repo_id=repo_id,
+            revision=commit,
+            local_dir=str(output / role),
+            allow_patterns=["*.json", "*.txt", "*.safetensors", "*.model", "*.bin"],
+        )
+        manifest[role] = {"repo_id": repo_id, "revision": commit, "path": role}
+
+    with open(output / BUNDLE_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 서버용 고정 모델 번들 생성")
+    parser.add_argument("--output", default=MODEL_BUNDLE_DIR)
+    parser.add_argument("--question-encoder", default=DEFAULT_MODELS["question_encoder"])
+    parser.add_argument("--reranker", default=DEFAULT_MODELS["reranker"])
+    args = parser.parse_args()
+
+    build_bundle(
+        args.output,
+        {"question_encoder": args.question_encoder, "reranker": args.reranker},
+    )
+    print("번들 생성 완료!")
+
+
+if __name__ == "__main__":
+    main()
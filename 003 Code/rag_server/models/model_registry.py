@@ -0,0 +1,200 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import torch
+
+from metrics import counter, gauge
+
+logger = logging.getLogger("rag")
+
+ModelKey = Tuple[str, str, str]
+
+
+def checkpoint_fingerprint(model_dir: str) -> str:
+    """
+    모델 디렉토리 안 파일들의 (상대 경로, 크기, mtime) 해시.
+    같은 경로에 새 체크포인트를 덮어쓰면 값이 바뀌어 레지스트리가 이전 인스턴스를 돌려주지 않는다.
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(model_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            rel = os.path.relpath(path, model_dir)
+            digest.update(f"{rel}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def model_key(model_path: str, dtype: str = "float32") -> ModelKey:
+    """
+    레지스트리 키: (해석된 모델 경로, dtype, 체크포인트 지문).
+    로컬 경로는 realpath 로 바꿔 심볼릭 링크/상대 경로가 달라도 같은 키가 되게 하고,
+    파일이 바뀌면 지문이 달라져 번들 재로드 때 새 가중치를 로드한다. Hub id 는 지문이 비어 있다.
+    """
+    fingerprint = ""
+    if os.path.isdir(model_path):
+        model_path = os.path.realpath(model_path)
+        fingerprint = checkpoint_fingerprint(model_path)
+    return model_path, dtype, fingerprint
+
+
+def module_nbytes(value: Any) -> int:
+    """value(또는 그 안의 tuple/list 원소) 중 torch 모듈의 파라미터+버퍼 바이트 수 합"""
+    items = value if isinstance(value, (tuple, list)) else (value,)
+    total = 0
+    for item in items:
+        if isinstance(item, torch.nn.Module):
+            for tensor in list(item.parameters()) + list(item.buffers()):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class _Entry:
+    def __init__(self, value: Any, nbytes: int, load_ms: float) -> None:
+        self.value = value
+        self.nbytes = nbytes
+        self.load_ms = load_ms
+        self.refcount = 0
+        self.last_used = time.time()
+
+
+class ModelRegistry:
+    """
+    (모델 경로, dtype) 당 인스턴스를 하나만 유지하는 모델 저장소.
+
+    - acquire(): 없으면 loader 로 로드하고 참조 수를 올린다. 같은 키를 동시에 요청하면
+      한 스레드만 로드하고 나머지는 그 결과를 기다린다.
+    - release(): 참조 수를 내린다. 참조가 0 인 항목만 LRU 순으로 제거 대상이 된다.
+    - max_bytes 를 넘으면 참조가 없는 항목부터 제거한다 (사용 중인 모델은 제거하지 않음).
+      max_bytes 가 없으면 참조가 0 이 되는 즉시 제거한다 (교체된 번들의 모델이 메모리에 남지 않도록).
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._loading: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+
+        self._bytes = gauge("rag_model_registry_bytes", "Bytes held by registered models")
+        self._count = gauge("rag_model_registry_entries", "Models held by the registry")
+        self._loads = counter("rag_model_registry_loads_total", "Models loaded into the registry")
+        self._hits = counter(
+            "rag_model_registry_hits_total", "acquire() calls served by an already loaded model"
+        )
+        self._evictions = counter(
+            "rag_model_registry_evictions_total", "Unreferenced models evicted by the LRU"
+        )
+
+    def acquire(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refcount += 1
+                    entry.last_used = time.time()
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return entry.value
+
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = threading.Event()
+                    self._loading[key] = loading
+                    break
+            # 다른 스레드가 같은 모델을 로드 중: 끝나면 다시 조회
+            loading.wait()
+
+        try:
+            started = time.perf_counter()
+            value = loader()
+            load_ms = (time.perf_counter() - started) * 1000
+            nbytes = module_nbytes(value)
+        except Exception:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+            raise
+
+        with self._lock:
+            entry = _Entry(value, nbytes, load_ms)
+            entry.refcount = 1
+            self._entries[key] = entry
+            del self._loading[key]
+            self._loads.inc()
+            self._evict_locked()
+            self._update_gauges_locked()
+        loading.set()
+
+        logger.info(
+            f"[REGISTRY] 모델 로드: {key} ({nbytes / 2**20:.1f} MiB, {load_ms:.1f}ms)"
+        )
+        return value
+
+    def get(self, key: Hashable) -> Any:
+        """이미 acquire 된 모델을 참조 수 변화 없이 꺼낸다 (요청 경로용)."""
+        with self._lock:
+            entry = self._entries[key]
+            entry.last_used = time.time()
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def release(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                logger.warning(f"[REGISTRY] 참조되지 않은 모델 release: {key}")
+                return
+            entry.refcount -= 1
+            entry.last_used = time.time()
+            self._evict_locked()
+            self._update_gauges_locked()
+
+    def _total_bytes_locked(self) -> int:
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def _evict_locked(self) -> None:
+        # 한도가 없으면 참조가 없는 항목을 모두 내린다
+        total = self._total_bytes_locked()
+        for key in list(self._entries.keys()):
+            if self.max_bytes is not None and total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refcount > 0:
+                continue
+            del self._entries[key]
+            total -= entry.nbytes
+            self._evictions.inc()
+            logger.info(f"[REGISTRY] LRU 제거: {key} ({entry.nbytes / 2**20:.1f} MiB)")
+
+        if self.max_bytes is not None and total > self.max_bytes:
+            logger.warning(
+                f"[REGISTRY] 사용 중인 모델만으로 메모리 한도 초과: "
+                f"{total / 2**20:.1f} MiB > {self.max_bytes / 2**20:.1f} MiB"
+            )
+
+    def _update_gauges_locked(self) -> None:
+        self._bytes.set(self._total_bytes_locked())
+        self._count.set(len(self._entries))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "total_bytes": self._total_bytes_locked(),
+                "max_bytes": self.max_bytes,
+                "models": [
+                    {
+                        "key": list(key) if isinstance(key, tuple) else key,
+                        "bytes": entry.nbytes,
+                        "refcount": entry.refcount,
+                        "load_ms": round(entry.load_ms, 1),
+                        "last_used": entry.last_used,
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
@@ -0,0 +1,347 @@
+"""
+질문 인코더의 int8 CPU 추론 아티팩트.
+
+학습된 질문 인코더에 Pooler("cls") 를 붙인 그래프를 동적 양자화(Linear -> int8)한 뒤
+TorchScript 로 저장한다. 서버는 CPU 에서 이 아티팩트가 있으면 fp32 HuggingFace 모델 대신 쓴다.
+
+  ARTIFACT_DIR/
+    encoder.pt     : torch.jit 모듈 (input_ids, attention_mask, token_type_ids) -> (batch, hidden)
+    export.json    : 원본 모델, pooler, 패리티/지연 시간 측정 결과
+    tokenizer 파일들
+
+내보내기 (이미지 빌드 시 번들 생성 다음에 한 번):
+  python models/quantized_encoder.py --output /app/models/bundle/question_encoder_int8
+  python models/quantized_encoder.py --source models/question_encoder --queries-file eval_queries.txt
+
+fp32 모델과의 임베딩 cosine 최솟값이 --min-cosine 보다 낮으면 아티팩트를 쓰지 않고 exit 1.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+logger = logging.getLogger("rag")
+
+ARTIFACT_MANIFEST = "export.json"
+ARTIFACT_MODEL = "encoder.pt"
+ARTIFACT_FORMAT = "torchscript-int8-dynamic"
+
+# --queries-file 이 없을 때 패리티/지연 측정에 쓰는 질의
+DEFAULT_PARITY_QUERIES = [
+    "연차 휴가는 어떻게 신청하나요?",
+    "출장비 정산 기한이 언제까지인가요?",
+    "재택 근무 신청 절차를 알려주세요",
+    "법인 카드 분실 시 어디에 연락해야 하나요?",
+    "신규 입사자 교육 과정은 몇 주 동안 진행되나요?",
+    "야간 수당 지급 기준",
+    "건강 검진 대상자와 검진 기관 목록",
+    "퇴직금 중간 정산이 가능한 경우는?",
+    "회의실 예약은 며칠 전부터 가능한가요",
+    "계약직 직원도 복리후생 대상에 포함되나요?",
+    "성과 평가 이의 신청 방법",
+    "보안 점검 기간에 외부 저장 장치를 써도 되나요?",
+    "장비 대여 신청서 양식은 어디에 있나요?",
+    "경비 처리 증빙 서류는 원본을 제출해야 하나요",
+    "급여 명세서 재발급",
+    "사내 규정 개정 내용을 어디서 확인할 수 있나요? 올해 바뀐 항목이 궁금합니다.",
+]
+
+
+class _EncoderWithPooler(torch.nn.Module):
+    """trace 용: 인코더 출력에 Pooler 를 적용해 임베딩만 돌려준다."""
+
+    def __init__(self, encoder: torch.nn.Module, pooler: torch.nn.Module) -> None:
+        super().__init__()
+        self.encoder = encoder
+        self.pooler = pooler
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        outputs = self.encoder(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+            return_dict=False,
+        )
+        return self.pooler(
+            attention_mask,
+            SimpleNamespace(last_hidden_state=outputs[0], pooler_output=outputs[1]),
+        )
+
+
+class CPUArtifactModule(torch.nn.Module):
+    """양자화된 TorchScript 아티팩트 래퍼의 공통 부분: CPU 외 device 로는 옮기지 않는다."""
+
+    def to(self, *args, **kwargs):
+        device = torch._C._nn._parse_to(*args, **kwargs)[0]
+        if device is not None and device.type != "cpu":
+            raise ValueError(f"int8 아티팩트는 CPU 전용입니다 (요청: {device})")
+        return self
+
+
+class TorchScriptQuestionEncoder(CPUArtifactModule):
+    """
+    내보낸 int8 아티팩트를 감싼 질문 인코더.
+    pooler 가 그래프에 포함되어 있으므로 forward 는 (batch, hidden) 임베딩을 바로 돌려준다
+    (encode_queries 는 includes_pooler 를 보고 별도 pooler 를 건너뛴다).
+    """
+
+    includes_pooler = True
+
+    def __init__(self, module: torch.jit.ScriptModule, manifest: Dict, identity: str) -> None:
+        super().__init__()
+        self.module = module
+        self.manifest = manifest
+        # 쿼리 임베딩 캐시 키: fp32 모델과 다른 임베딩이므로 식별자도 따로 둔다
+        self._rag_identity = identity
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        if token_type_ids is None:
+            token_type_ids = torch.zeros_like(input_ids)
+        return self.module(input_ids, attention_mask, token_type_ids)
+
+
+def is_artifact(path: str, model_file: str = ARTIFACT_MODEL) -> bool:
+    return (Path(path) / ARTIFACT_MANIFEST).is_file() and (Path(path) / model_file).is_file()
+
+
+def read_manifest(path: str) -> Dict:
+    with open(Path(path) / ARTIFACT_MANIFEST, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def same_source(manifest: Dict, model_path: str) -> bool:
+    """아티팩트가 model_path 의 모델에서 내보낸 것인지 (로컬 경로는 realpath 로 비교)"""
+    source = manifest.get("source", "")
+    if os.path.isdir(source) and os.path.isdir(model_path):
+        return os.path.realpath(source) == os.path.realpath(model_path)
+    return source == model_path
+
+
+def load_artifact(path: str) -> Tuple[AutoTokenizer, TorchScriptQuestionEncoder]:
+    manifest = read_manifest(path)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"지원하지 않는 아티팩트 형식: {manifest.get('format')} ({path})")
+
+    engine = manifest.get("quantized_engine")
+    if engine and engine in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = engine
+    if manifest.get("torch") != torch.__version__:
+        logger.warning(
+            f"[INT8] 내보낸 torch({manifest.get('torch')}) 와 현재 torch({torch.__version__}) 가 다릅니다"
+        )
+
+    tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+    module = torch.jit.load(str(Path(path) / ARTIFACT_MODEL), map_location="cpu")
+    module.eval()
+
+    encoder = TorchScriptQuestionEncoder(
+        module, manifest, f"{manifest['source']}@int8-{manifest['sha1'][:12]}"
+    )
+    logger.info(
+        f"[INT8] 질문 인코더 아티팩트 로드: {path} (source={manifest['source']}, "
+        f"min_cosine={manifest['parity']['min_cosine']:.4f})"
+    )
+    return tokenizer, encoder
+
+
+# ----------------------------------------------------------------------
+# 내보내기
+# ----------------------------------------------------------------------
+
+def file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _encode(tokenizer, fn, queries: List[str], max_length: int) -> torch.Tensor:
+    batch = tokenizer(
+        queries, padding=True, truncation=True, max_length=max_length, return_tensors="pt"
+    )
+    token_type_ids = batch.get("token_type_ids")
+    if token_type_ids is None:
+        token_type_ids = torch.zeros_like(batch["input_ids"])
+    with torch.no_grad():
+        return fn(batch["input_ids"], batch["attention_mask"], token_type_ids)
+
+
+def _latency_ms(tokenizer, fn, queries: List[str], max_length: int, runs: int) -> Dict:
+    """서버와 같은 단건 경로(토크나이즈 + forward + pooling)의 쿼리당 지연 시간"""
+    for query in queries[:3]:
+        _encode(tokenizer, fn, [query], max_length)
+    samples = []
+    for i in range(runs):
+        started = time.perf_counter()
+        _encode(tokenizer, fn, [queries[i % len(queries)]], max_length)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50": round(statistics.median(samples), 2),
+        "p95": round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+        "mean": round(statistics.fmean(samples), 2),
+    }
+
+
+def export(
+    source: str,
+    output: str,
+    queries: List[str],
+    pooler_type: str = "cls",
+    max_length: int = 512,
+    local_files_only: bool = False,
+    min_cosine: float = 0.98,
+    latency_runs: int = 50,
+) -> Dict:
+    from dpr.model import Pooler
+
+    tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=local_files_only)
+    # trace 가 가능한 eager attention 으로 로드한다 (sdpa 는 shape 별 분기가 그래프에 고정될 수 있음)
+    model = AutoModel.from_pretrained(
+        source, local_files_only=local_files_only, attn_implementation="eager"
+    ).eval()
+    reference = _EncoderWithPooler(model, Pooler(pooler_type)).eval()
+
+    quantized = torch.ao.quantization.quantize_dynamic(
+        _EncoderWithPooler(model, Pooler(pooler_type)).eval(),
+        {torch.nn.Linear},
+        dtype=torch.qint8,
+    )
+    # 길이가 다른 두 문장으로 trace 해서 패딩이 있는 배치 경로를 기록한다
+    example = tokenizer(
+        queries[:2], padding=True, truncation=True, max_length=max_length, return_tensors="pt"
+    )
+    example_token_types = example.get("token_type_ids")
+    if example_token_types is None:
+        example_token_types = torch.zeros_like(example["input_ids"])
+    with torch.no_grad():
+        traced = torch.jit.trace(
+            quantized,
+            (example["input_ids"], example["attention_mask"], example_token_types),
+            check_trace=False,
+        )
+    traced = torch.jit.freeze(traced.eval())
+
+    # 패리티: 단건과 배치(패딩 포함) 모두에서 fp32 임베딩과 비교
+    reference_emb = _encode(tokenizer, reference, queries, max_length)
+    batched_emb = _encode(tokenizer, traced, queries, max_length)
+    single_emb = torch.cat([_encode(tokenizer, traced, [q], max_length) for q in queries])
+    cosines = torch.cat([
+        torch.nn.functional.cosine_similarity(reference_emb, batched_emb, dim=-1),
+        torch.nn.functional.cosine_similarity(reference_emb, single_emb, dim=-1),
+    ])
+    parity = {
+        "num_queries": len(queries),
+        "min_cosine": round(float(cosines.min()), 6),
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "threshold": min_cosine,
+    }
+
+    latency = {
+        "threads": torch.get_num_threads(),
+        "fp32_ms": _latency_ms(tokenizer, reference, queries, max_length, latency_runs),
+        "int8_ms": _latency_ms(tokenizer, traced, queries, max_length, latency_runs),
+    }
+    latency["speedup_p50"] = round(latency["fp32_ms"]["p50"] / latency["int8_ms"]["p50"], 2)
+
+    report = {"source": source, "parity": parity, "latency": latency}
+    if parity["min_cosine"] < min_cosine:
+        return {**report, "ok": False}
+
+    out = Path(output)
+    out.mkdir(parents=True, exist_ok=True)
+    model_file = out / ARTIFACT_MODEL
+    torch.jit.save(traced, str(model_file))
+    tokenizer.save_pretrained(str(out))
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "source": source,
+        "pooler": pooler_type,
+        "max_length": max_length,
+        "hidden_size": int(reference_emb.shape[-1]),
+        "quantized_engine": torch.backends.quantized.engine,
+        "torch": torch.__version__,
+        "sha1": file_sha1(model_file),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "parity": parity,
+        "latency": latency,
+    }
+    with open(out / ARTIFACT_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return {**report, "ok": True, "output": str(out)}
+
+
+def main():
+    rag_server_dir = Path(__file__).resolve().parent.parent
+    sys.path.insert(0, str(rag_server_dir))
+    sys.path.append(str(rag_server_dir / "doc_retrieval"))
+    from models.load_models_data import QUESTION_ENCODER_ARTIFACT_DIR, resolve_question_encoder
+
+    parser = argparse.ArgumentParser(description="질문 인코더 int8 TorchScript 아티팩트 내보내기")
+    parser.add_argument("--source", default=None, help="fp32 질문 인코더 (기본: 서버와 같은 해석 규칙)")
+    parser.add_argument("--output", default=QUESTION_ENCODER_ARTIFACT_DIR)
+    parser.add_argument("--pooler", default="cls", choices=["cls", "mean", "max", "pooler_output"])
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--queries-file", default=None, help="패리티/지연 측정 질의 (한 줄에 하나)")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--threads", type=int, default=1, help="측정 시 torch 스레드 수 (파드 CPU limit 과 맞춤)")
+    parser.add_argument("--latency-runs", type=int, default=50)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    if args.source:
+        source, local_files_only = args.source, os.path.isdir(args.source)
+    else:
+        source, local_files_only = resolve_question_encoder(False)
+
+    queries = DEFAULT_PARITY_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    if len(queries) < 2:
+        parser.error("패리티 측정에는 질의가 2개 이상 필요합니다")
+
+    report = export(
+        source,
+        args.output,
+        queries,
+        pooler_type=args.pooler,
+        max_length=args.max_length,
+        local_files_only=local_files_only,
+        min_cosine=args.min_cosine,
+        latency_runs=args.latency_runs,
+    )
+
+    parity, latency = report["parity"], report["latency"]
+    print(f"[INT8] source: {source}")
+    print(
+        f"[INT8] cosine min={parity['min_cosine']:.4f} mean={parity['mean_cosine']:.4f} "
+        f"(질의 {parity['num_queries']}개, 기준 {parity['threshold']})"
+    )
+    print(
+        f"[INT8] 쿼리당 지연 (threads={latency['threads']}): "
+        f"fp32 p50={latency['fp32_ms']['p50']}ms p95={latency['fp32_ms']['p95']}ms / "
+        f"int8 p50={latency['int8_ms']['p50']}ms p95={latency['int8_ms']['p95']}ms "
+        f"(x{latency['speedup_p50']})"
+    )
+    if not report["ok"]:
+        print("[INT8] 패리티 기준 미달 - 아티팩트를 저장하지 않았습니다")
+        sys.exit(1)
+    print(f"[INT8] 저장 완료: {report['output']}")
+
+
+if __name__ == "__main__":
+    main()
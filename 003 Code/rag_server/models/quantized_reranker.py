@@ -0,0 +1,412 @@
+"""
+cross-encoder 리랭커의 int8 CPU 추론 아티팩트와 순위 일치도 도구.
+
+리랭커(AutoModelForSequenceClassification)를 동적 양자화(Linear -> int8)한 뒤 TorchScript 로
+저장한다. batch / 시퀀스 길이는 고정하지 않으므로 BatchingReranker 의 가변 배치를 그대로 받는다.
+RERANKER_RUNTIME=auto|torchscript|eager 로 선택한다 (models/load_models_data.py).
+
+  ARTIFACT_DIR/
+    reranker.pt    : torch.jit 모듈 (input_ids, attention_mask, token_type_ids) -> logits (batch,)
+    export.json    : 원본 모델, 순위 일치도/지연 시간 측정 결과
+    tokenizer 파일들
+
+  # 내보내기 (기준 모델 대비 top-3 overlap 이 --min-top3-overlap 미만이면 저장하지 않고 exit 1)
+  python models/quantized_reranker.py export --output /app/models/bundle/reranker_int8 \
+      --eval-data doc_retrieval/data/test.json
+
+  # 임의의 두 리랭커(HF 경로 또는 아티팩트)의 순위 일치도 비교
+  python models/quantized_reranker.py agreement --candidate /app/models/bundle/reranker_int8 \
+      --eval-data rerank_eval.jsonl
+
+평가 데이터:
+  *.jsonl : 한 줄에 {"query": ..., "docs": [...]} (운영 후보 목록을 덤프한 것)
+  *.json  : doc_retrieval 검증 셋 형식 [{"question", "positive", "hard_neg"?}, ...]
+            - 질문마다 자기 positive/hard_neg 에 다른 질문의 passage 를 섞어 후보 목록을 만든다
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+if __name__ == "__main__":
+    # 스크립트로 실행할 때도 rag_server 기준 import 가 되도록
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.quantized_encoder import (
+    DEFAULT_PARITY_QUERIES,
+    CPUArtifactModule,
+    file_sha1,
+    is_artifact,
+    read_manifest,
+)
+
+logger = logging.getLogger("rag")
+
+ARTIFACT_MANIFEST = "export.json"
+ARTIFACT_MODEL = "reranker.pt"
+ARTIFACT_FORMAT = "torchscript-int8-dynamic-cross-encoder"
+
+# --eval-data 가 없을 때 DEFAULT_PARITY_QUERIES 와 짝지어 쓰는 passage
+DEFAULT_PARITY_DOCS = [
+    "연차 휴가 신청은 사내 포털의 전자결재 메뉴에서 진행하며 팀장 승인 후 확정됩니다.",
+    "출장비는 출장 종료 후 30일 이내에 영수증을 첨부해 정산해야 하며 기한이 지나면 다음 달로 이월됩니다.",
+    "재택 근무는 주 2회까지 가능하고 전날 오후 6시까지 근태 시스템에 등록해야 합니다.",
+    "법인 카드를 분실한 경우 즉시 재무팀과 카드사 고객센터에 분실 신고를 해야 합니다.",
+    "신규 입사자 교육 과정은 4주 동안 진행되며 첫 주에는 보안 교육과 사내 규정 교육이 포함됩니다.",
+    "야간 수당은 오후 10시부터 오전 6시 사이 근무 시간에 대해 통상임금의 50%를 가산해 지급합니다.",
+    "건강 검진은 매년 전 직원을 대상으로 하며 지정 검진 기관 목록은 인사팀 공지에서 확인할 수 있습니다.",
+    "퇴직금 중간 정산은 무주택자의 주택 구입, 본인 또는 가족의 장기 요양 등 법정 사유에 한해 가능합니다.",
+    "회의실 예약은 사용일 기준 2주 전부터 가능하며 반복 예약은 최대 4주까지 허용됩니다.",
+    "계약직 직원도 복리후생 대상에 포함되며 세부 기준은 별도 공지를 따릅니다.",
+    "성과 평가 결과에 이의가 있으면 결과 공개 후 7일 이내에 인사팀에 이의 신청서를 제출합니다.",
+    "보안 점검 기간에는 외부 저장 장치 사용이 제한되며 예외는 정보보안팀 승인이 필요합니다.",
+]
+
+
+class _CrossEncoderLogits(torch.nn.Module):
+    """trace 용: (batch,) 점수 텐서만 돌려준다."""
+
+    def __init__(self, model: torch.nn.Module) -> None:
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        logits = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+            return_dict=False,
+        )[0]
+        return logits.squeeze(-1)
+
+
+class TorchScriptReranker(CPUArtifactModule):
+    """
+    내보낸 int8 리랭커 래퍼. HF 모델처럼 model(**batch).logits 로 호출할 수 있어
+    rerank() / BatchingReranker 가 그대로 사용한다.
+    """
+
+    def __init__(self, module: torch.jit.ScriptModule, manifest: Dict, identity: str) -> None:
+        super().__init__()
+        self.module = module
+        self.manifest = manifest
+        self._rag_identity = identity
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        if token_type_ids is None:
+            token_type_ids = torch.zeros_like(input_ids)
+        return SimpleNamespace(logits=self.module(input_ids, attention_mask, token_type_ids))
+
+
+def load_artifact(path: str) -> Tuple[AutoTokenizer, TorchScriptReranker]:
+    manifest = read_manifest(path)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"지원하지 않는 아티팩트 형식: {manifest.get('format')} ({path})")
+
+    engine = manifest.get("quantized_engine")
+    if engine and engine in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = engine
+    if manifest.get("torch") != torch.__version__:
+        logger.warning(
+            f"[INT8] 내보낸 torch({manifest.get('torch')}) 와 현재 torch({torch.__version__}) 가 다릅니다"
+        )
+
+    tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+    module = torch.jit.load(str(Path(path) / ARTIFACT_MODEL), map_location="cpu")
+    module.eval()
+
+    model = TorchScriptReranker(
+        module, manifest, f"{manifest['source']}@int8-{manifest['sha1'][:12]}"
+    )
+    logger.info(
+        f"[INT8] 리랭커 아티팩트 로드: {path} (source={manifest['source']}, "
+        f"top3_overlap={manifest['agreement']['top3_overlap']:.3f})"
+    )
+    return tokenizer, model
+
+
+def load_reranker(path: str) -> Tuple[AutoTokenizer, torch.nn.Module]:
+    """HF 경로/Hub id 또는 int8 아티팩트 디렉토리"""
+    if is_artifact(path, ARTIFACT_MODEL):
+        return load_artifact(path)
+    local_files_only = os.path.isdir(path)
+    tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=local_files_only)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        path, local_files_only=local_files_only
+    ).eval()
+    return tokenizer, model
+
+
+# ----------------------------------------------------------------------
+# 평가 셋 / 순위 일치도
+# ----------------------------------------------------------------------
+
+def default_eval_set(num_candidates: int = 10, seed: int = 0) -> List[Tuple[str, List[str]]]:
+    rng = random.Random(seed)
+    return [
+        (query, rng.sample(DEFAULT_PARITY_DOCS, min(num_candidates, len(DEFAULT_PARITY_DOCS))))
+        for query in DEFAULT_PARITY_QUERIES
+    ]
+
+
+def load_eval_set(
+    path: str, num_candidates: int = 10, limit: Optional[int] = None, seed: int = 0
+) -> List[Tuple[str, List[str]]]:
+    """(query, 후보 passage 목록) 리스트"""
+    if path.endswith(".jsonl"):
+        eval_set = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    eval_set.append((row["query"], list(row["docs"])[:num_candidates]))
+        return eval_set[:limit] if limit else eval_set
+
+    with open(path, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    if limit:
+        samples = samples[:limit]
+
+    rng = random.Random(seed)
+    pool = [p for sample in samples for p in sample["positive"]]
+    eval_set = []
+    for sample in samples:
+        docs = list(sample["positive"]) + list(sample.get("hard_neg") or [])
+        docs = docs[:num_candidates]
+        while len(docs) < num_candidates and len(pool) > len(docs):
+            candidate = rng.choice(pool)
+            if candidate not in docs:
+                docs.append(candidate)
+        rng.shuffle(docs)
+        eval_set.append((sample["question"], docs))
+    return eval_set
+
+
+def score_pairs(tokenizer, model, query: str, docs: List[str], max_length: int = 512) -> np.ndarray:
+    batch = tokenizer(
+        [query] * len(docs),
+        docs,
+        padding=True,
+        truncation=True,
+        max_length=max_length,
+        return_tensors="pt",
+    )
+    with torch.no_grad():
+        logits = model(**batch).logits
+    return logits.reshape(-1).float().numpy()
+
+
+def ranking_agreement(
+    reference: List[np.ndarray], candidate: List[np.ndarray], k: int = 3
+) -> Dict:
+    """기준 대비 후보 모델의 상위 k 겹침 비율, top-1 일치율, 상위 k 순서 완전 일치율"""
+    overlaps, top1, exact = [], [], []
+    for ref, cand in zip(reference, candidate):
+        ref_top = [int(i) for i in np.argsort(-ref, kind="stable")[:k]]
+        cand_top = [int(i) for i in np.argsort(-cand, kind="stable")[:k]]
+        overlaps.append(len(set(ref_top) & set(cand_top)) / max(1, len(ref_top)))
+        top1.append(float(ref_top[:1] == cand_top[:1]))
+        exact.append(float(ref_top == cand_top))
+    if not overlaps:
+        return {"num_queries": 0}
+    return {
+        "num_queries": len(overlaps),
+        f"top{k}_overlap": round(statistics.fmean(overlaps), 4),
+        f"min_top{k}_overlap": round(min(overlaps), 4),
+        "top1_agreement": round(statistics.fmean(top1), 4),
+        f"top{k}_exact_order": round(statistics.fmean(exact), 4),
+    }
+
+
+def _score_all(tokenizer, model, eval_set, max_length: int) -> Tuple[List[np.ndarray], Dict]:
+    """평가 셋 전체 점수와 요청(질의 1개 + 후보 목록) 단위 지연 시간"""
+    for query, docs in eval_set[:2]:
+        score_pairs(tokenizer, model, query, docs, max_length)
+    scores, samples = [], []
+    for query, docs in eval_set:
+        started = time.perf_counter()
+        scores.append(score_pairs(tokenizer, model, query, docs, max_length))
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    latency = {
+        "p50": round(statistics.median(samples), 2),
+        "p95": round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+        "mean": round(statistics.fmean(samples), 2),
+    }
+    return scores, latency
+
+
+def compare_rerankers(reference, candidate, eval_set, max_length: int = 512) -> Dict:
+    ref_scores, ref_latency = _score_all(*reference, eval_set, max_length)
+    cand_scores, cand_latency = _score_all(*candidate, eval_set, max_length)
+    return {
+        "agreement": ranking_agreement(ref_scores, cand_scores, k=3),
+        "latency": {
+            "threads": torch.get_num_threads(),
+            "reference_ms": ref_latency,
+            "candidate_ms": cand_latency,
+            "speedup_p50": round(ref_latency["p50"] / cand_latency["p50"], 2),
+        },
+    }
+
+
+# ----------------------------------------------------------------------
+# 내보내기
+# ----------------------------------------------------------------------
+
+def export(
+    source: str,
+    output: str,
+    eval_set: List[Tuple[str, List[str]]],
+    max_length: int = 512,
+    local_files_only: bool = False,
+    min_top3_overlap: float = 0.9,
+) -> Dict:
+    tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=local_files_only)
+    # trace 가 가능한 eager attention 으로 로드한다 (sdpa 는 shape 별 분기가 그래프에 고정될 수 있음)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        source, local_files_only=local_files_only, attn_implementation="eager"
+    ).eval()
+
+    quantized = torch.ao.quantization.quantize_dynamic(
+        _CrossEncoderLogits(model).eval(), {torch.nn.Linear}, dtype=torch.qint8
+    )
+    # 길이가 다른 두 쌍으로 trace 해서 패딩이 있는 가변 배치 경로를 기록한다
+    query, docs = eval_set[0]
+    example = tokenizer(
+        [query, query], [docs[0], docs[-1][: max(1, len(docs[-1]) // 2)]],
+        padding=True, truncation=True, max_length=max_length, return_tensors="pt",
+    )
+    example_token_types = example.get("token_type_ids")
+    if example_token_types is None:
+        example_token_types = torch.zeros_like(example["input_ids"])
+    with torch.no_grad():
+        traced = torch.jit.trace(
+            quantized,
+            (example["input_ids"], example["attention_mask"], example_token_types),
+            check_trace=False,
+        )
+    traced = torch.jit.freeze(traced.eval())
+
+    candidate = TorchScriptReranker(traced, {}, "export")
+    report = compare_rerankers((tokenizer, model), (tokenizer, candidate), eval_set, max_length)
+    report["source"] = source
+    if report["agreement"]["top3_overlap"] < min_top3_overlap:
+        return {**report, "ok": False}
+
+    out = Path(output)
+    out.mkdir(parents=True, exist_ok=True)
+    model_file = out / ARTIFACT_MODEL
+    torch.jit.save(traced, str(model_file))
+    tokenizer.save_pretrained(str(out))
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "source": source,
+        "max_length": max_length,
+        "quantized_engine": torch.backends.quantized.engine,
+        "torch": torch.__version__,
+        "sha1": file_sha1(model_file),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "agreement": {**report["agreement"], "threshold": min_top3_overlap},
+        "latency": report["latency"],
+    }
+    with open(out / ARTIFACT_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return {**report, "ok": True, "output": str(out)}
+
+
+def _print_report(report: Dict) -> None:
+    agreement, latency = report["agreement"], report["latency"]
+    print(
+        f"[RERANK] 질의 {agreement['num_queries']}개: top-3 overlap={agreement['top3_overlap']:.3f} "
+        f"(min {agreement['min_top3_overlap']:.2f}), top-1 일치={agreement['top1_agreement']:.3f}, "
+        f"top-3 순서 일치={agreement['top3_exact_order']:.3f}"
+    )
+    print(
+        f"[RERANK] 요청당 지연 (threads={latency['threads']}): "
+        f"기준 p50={latency['reference_ms']['p50']}ms p95={latency['reference_ms']['p95']}ms / "
+        f"후보 p50={latency['candidate_ms']['p50']}ms p95={latency['candidate_ms']['p95']}ms "
+        f"(x{latency['speedup_p50']})"
+    )
+
+
+def main():
+    from models.load_models_data import RERANKER_ARTIFACT_DIR
+    from models.model_bundle import resolve_model
+
+    parser = argparse.ArgumentParser(description="리랭커 int8 TorchScript 내보내기 / 순위 일치도 비교")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="int8 아티팩트 생성")
+    p_export.add_argument("--source", default=None, help="fp32 리랭커 (기본: 번들/Hub 해석 규칙)")
+    p_export.add_argument("--output", default=RERANKER_ARTIFACT_DIR)
+    p_export.add_argument("--min-top3-overlap", type=float, default=0.9)
+
+    p_agree = sub.add_parser("agreement", help="기준 리랭커 대비 후보의 top-3 overlap")
+    p_agree.add_argument("--reference", default=None, help="기준 리랭커 (기본: 번들/Hub 해석 규칙)")
+    p_agree.add_argument("--candidate", required=True, help="HF 경로/Hub id 또는 int8 아티팩트 디렉토리")
+    p_agree.add_argument("--output", default=None, help="결과 JSON 경로")
+
+    for p in (p_export, p_agree):
+        p.add_argument("--eval-data", default=None, help="*.jsonl {query, docs} 또는 검증 셋 *.json")
+        p.add_argument("--num-candidates", type=int, default=10, help="질의당 후보 수 (서버 final_top_k)")
+        p.add_argument("--limit", type=int, default=None, help="평가 질의 수 제한")
+        p.add_argument("--max-length", type=int, default=512)
+        p.add_argument("--threads", type=int, default=1, help="torch 스레드 수 (파드 CPU limit 과 맞춤)")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    if args.eval_data:
+        eval_set = load_eval_set(args.eval_data, args.num_candidates, args.limit)
+    else:
+        eval_set = default_eval_set(args.num_candidates)
+    if not eval_set:
+        parser.error("평가 질의가 없습니다")
+
+    if args.command == "export":
+        if args.source:
+            source, local_files_only = args.source, os.path.isdir(args.source)
+        else:
+            source, local_files_only = resolve_model("reranker")
+        report = export(
+            source,
+            args.output,
+            eval_set,
+            max_length=args.max_length,
+            local_files_only=local_files_only,
+            min_top3_overlap=args.min_top3_overlap,
+        )
+        print(f"[RERANK] source: {source}")
+        _print_report(report)
+        if not report["ok"]:
+            print("[RERANK] 순위 일치도 기준 미달 - 아티팩트를 저장하지 않았습니다")
+            sys.exit(1)
+        print(f"[RERANK] 저장 완료: {report['output']}")
+        return
+
+    reference_path = args.reference or resolve_model("reranker")[0]
+    report = compare_rerankers(
+        load_reranker(reference_path), load_reranker(args.candidate), eval_set, args.max_length
+    )
+    report.update(reference=reference_path, candidate=args.candidate)
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Pre-fork 서빙 모드.
+
+부모 프로세스가 리슨 소켓을 열고 모델 가중치를 한 번만 로드한 뒤 워커를 fork 한다.
+가중치 텐서는 fork 이후 아무도 쓰지 않으므로 copy-on-write 로 모든 워커가 같은 물리 페이지를 공유한다.
+Chroma/Postgres 클라이언트, 배칭 스레드, Lucene JVM 은 각 워커의 startup 에서 따로 만든다
+(fork 전에 스레드나 JVM 을 띄우면 자식 프로세스에서 교착될 수 있음).
+
+부모는 워커가 죽으면 다시 fork 하고, 주기적으로 워커별 RSS/PSS 를 기록한다.
+"""
+import gc
+import os
+import json
+import time
+import signal
+import socket
+import logging
+import importlib
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("rag")
+
+PREFORK_STATUS_PATH = os.getenv("PREFORK_STATUS_PATH", "/tmp/rag_workers.json")
+
+
+def process_memory(pid="self") -> Dict[str, int]:
+    """
+    /proc/<pid>/smaps_rollup 기준 메모리 (bytes).
+      rss     : 상주 메모리 (공유 페이지 포함)
+      pss     : 공유 페이지를 공유 프로세스 수로 나눈 비례 몫
+      shared  : 다른 프로세스와 공유 중인 페이지
+      private : 이 프로세스만 쓰는 페이지
+    """
+    fields = {
+        "Rss": "rss",
+        "Pss": "pss",
+        "Shared_Clean": "shared",
+        "Shared_Dirty": "shared",
+        "Private_Clean": "private",
+        "Private_Dirty": "private",
+    }
+    memory = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in fields:
+                    memory[fields[name]] += int(rest.split()[0]) * 1024
+    except (FileNotFoundError, PermissionError):
+        # smaps_rollup 이 없는 커널: RSS 만 statm 에서 읽는다
+        try:
+            with open(f"/proc/{pid}/statm", "r") as f:
+                memory["rss"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (FileNotFoundError, PermissionError):
+            pass
+    return memory
+
+
+def read_worker_status() -> Optional[Dict]:
+    try:
+        with open(PREFORK_STATUS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _create_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    def __init__(
+        self,
+        app_import: str,
+        host: str,
+        port: int,
+        workers: int,
+        preload: Optional[Callable[[], None]] = None,
+        post_fork: Optional[Callable[[int], None]] = None,
+        memory_log_interval: float = 60.0,
+    ) -> None:
+        self.app_import = app_import
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.preload = preload
+        self.post_fork = post_fork
+        self.memory_log_interval = memory_log_interval
+        self._children: Dict[int, int] = {}  # pid -> worker_id
+        self._stopping = False
+
+    def _load_app(self):
+        module_name, _, attr = self.app_import.partition(":")
+        module = importlib.import_module(module_name)
+        return getattr(module, attr)
+
+    def _spawn(self, app, sock: socket.socket, worker_id: int) -> None:
+        pid = os.fork()
+        if pid:
+            self._children[pid] = worker_id
+            logger.info(f"[PREFORK] worker {worker_id} 시작 (pid={pid})")
+            return
+
+        # ---- 자식 프로세스 ----
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            os.environ["RAG_WORKER_ID"] = str(worker_id)
+            if self.post_fork is not None:
+                self.post_fork(worker_id)
+
+            import uvicorn
+
+            server = uvicorn.Server(uvicorn.Config(app, lifespan="on", log_level="info"))
+            server.run(sockets=[sock])
+        except Exception as e:
+            logger.error(f"[PREFORK] worker {worker_id} 비정상 종료: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _write_status(self) -> None:
+        status = {
+            "master": {"pid": os.getpid(), **process_memory()},
+            "workers": [
+                {"worker_id": worker_id, "pid": pid, **process_memory(pid)}
+                for pid, worker_id in sorted(self._children.items(), key=lambda x: x[1])
+            ],
+            "updated_at": time.time(),
+        }
+        tmp = f"{PREFORK_STATUS_PATH}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        os.replace(tmp, PREFORK_STATUS_PATH)
+
+        for worker in status["workers"]:
+            logger.info(
+                f"[PREFORK] worker {worker['worker_id']} (pid={worker['pid']}) "
+                f"rss={worker['rss'] / 2**20:.0f}MiB pss={worker['pss'] / 2**20:.0f}MiB "
+                f"shared={worker['shared'] / 2**20:.0f}MiB private={worker['private'] / 2**20:.0f}MiB"
+            )
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        sock = _create_socket(self.host, self.port)
+        logger.info(f"[PREFORK] {self.host}:{self.port} 에서 워커 {self.workers}개로 서빙")
+
+        started = time.perf_counter()
+        app = self._load_app()
+        if self.preload is not None:
+            self.preload()
+        logger.info(f"[PREFORK] 공유 모델 로드 완료: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        # 지금까지 만든 객체를 GC 대상에서 빼서, 자식의 GC 가 공유 페이지를 건드려 복사되지 않게 한다
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for worker_id in range(self.workers):
+            self._spawn(app, sock, worker_id)
+
+        last_status = 0.0
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+
+            if pid:
+                worker_id = self._children.pop(pid)
+                if not self._stopping:
+                    logger.error(
+                        f"[PREFORK] worker {worker_id} (pid={pid}) 종료됨 "
+                        f"(status={status}) - 다시 시작합니다."
+                    )
+                    time.sleep(1.0)
+                    self._spawn(app, sock, worker_id)
+                continue
+
+            if time.monotonic() - last_status >= self.memory_log_interval:
+                last_status = time.monotonic()
+                try:
+                    self._write_status()
+                except OSError as e:
+                    logger.warning(f"[PREFORK] 워커 상태 기록 실패: {e}")
+            time.sleep(0.5)
+
+        sock.close()
+        logger.info("[PREFORK] 모든 워커 종료")
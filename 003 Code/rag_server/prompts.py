@@ -1,3 +1,7 @@
+# 템플릿 문구를 바꾸면 올린다 (답변 캐시 키에 포함되어 이전 답변이 재사용되지 않음)
+PROMPT_TEMPLATE_VERSION = "1"
+
+
 def system_prompt(is_consultant_mode: bool, query: str, context: str) -> str:
     if is_consultant_mode:
         system_message = (
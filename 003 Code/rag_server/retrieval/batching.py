@@ -0,0 +1,210 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Optional
+
+from metrics import histogram
+
+logger = logging.getLogger("rag")
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# 워커가 멈췄거나 닫힌 배처 때문에 호출 스레드가 영원히 기다리지 않도록 하는 기본 대기 시간
+DEFAULT_RESULT_TIMEOUT = 60.0
+
+_STOP = object()
+
+
+def _resolve(future: Future, result: Any = None, exception: Optional[BaseException] = None) -> None:
+    # close() 와 워커가 같은 항목을 동시에 끝내려 할 수 있으므로 이미 끝난 future 는 건너뛴다
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class _PendingItem:
+    __slots__ = ("payload", "future", "enqueued_at", "cost")
+
+    def __init__(self, payload: Any, cost: int = 0) -> None:
+        self.payload = payload
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+        self.cost = cost
+
+
+class MicroBatcher:
+    """
+    여러 요청 스레드에서 들어온 작업을 짧은 시간창(window_ms) 동안 모아
+    process_fn 한 번으로 처리하고, 결과를 각 호출자에게 돌려준다.
+
+    process_fn(payloads) 는 payloads 와 같은 길이/순서의 결과 리스트를 반환해야 한다.
+
+    cost_fn / max_batch_cost 를 주면 배치에 담긴 항목들의 비용(예: 토큰 수) 합이
+    예산을 넘지 않도록 자른다. 예산을 넘긴 항목은 다음 배치의 첫 항목이 된다.
+
+    close() 이후의 submit 은 거부되고, 아직 배치에 들어가지 못한 항목은 RuntimeError 로 끝난다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        window_ms: float = 5.0,
+        cost_fn: Optional[Callable[[Any], int]] = None,
+        max_batch_cost: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.process_fn = process_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window_ms) / 1000.0
+        self.cost_fn = cost_fn
+        self.max_batch_cost = max_batch_cost
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._carry: Optional[_PendingItem] = None
+        self._closed = False
+        # _closed 와 _carry 를 보호한다 (워커와 close() 가 같이 건드린다)
+        self._lock = threading.Lock()
+        self._batch_size_hist = histogram(
+            f"rag_{name}_batch_size",
+            f"Number of requests merged into one {name} batch",
+            BATCH_SIZE_BUCKETS,
+        )
+        self._queue_wait_hist = histogram(
+            f"rag_{name}_queue_wait_seconds",
+            f"Seconds a request waited in the {name} queue before its batch started",
+            QUEUE_WAIT_BUCKETS,
+        )
+
+        self._worker = threading.Thread(
+            target=self._run, name=f"{name}-batcher", daemon=True
+        )
+        self._worker.start()
+        logger.info(
+            f"[BATCH][{name}] started (max_batch_size={self.max_batch_size}, window_ms={window_ms})"
+        )
+
+    def submit(self, payload: Any) -> Future:
+        cost = self.cost_fn(payload) if self.cost_fn is not None else 0
+        item = _PendingItem(payload, cost)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} batcher closed")
+            self._queue.put(item)
+        return item.future
+
+    def __call__(self, payload: Any, timeout: Optional[float] = DEFAULT_RESULT_TIMEOUT) -> Any:
+        return self.submit(payload).result(timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        # 진행 중인 배치는 끝까지 처리하고, 대기 중인 항목은 바로 실패시킨다
+        failed = self._fail_pending()
+        if failed:
+            logger.warning(f"[BATCH][{self.name}] closed with {failed} pending item(s)")
+        self._queue.put(_STOP)
+        self._worker.join(timeout=5)
+
+    def _fail_pending(self) -> int:
+        pending = []
+        carry = self._take_carry()
+        if carry is not None:
+            pending.append(carry)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                pending.append(item)
+
+        error = RuntimeError(f"{self.name} batcher closed")
+        for item in pending:
+            _resolve(item.future, exception=error)
+        return len(pending)
+
+    def _take_carry(self) -> Optional[_PendingItem]:
+        with self._lock:
+            carry, self._carry = self._carry, None
+        return carry
+
+    def _set_carry(self, item: _PendingItem) -> None:
+        with self._lock:
+            if not self._closed:
+                self._carry = item
+                return
+        # close() 가 이미 대기 항목을 비웠으면 넘길 곳이 없으므로 바로 실패시킨다
+        _resolve(item.future, exception=RuntimeError(f"{self.name} batcher closed"))
+
+    def _collect(self, first: _PendingItem) -> List[_PendingItem]:
+        batch = [first]
+        batch_cost = first.cost
+        deadline = first.enqueued_at + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+
+            if (
+                self.max_batch_cost is not None
+                and batch_cost + item.cost > self.max_batch_cost
+            ):
+                self._set_carry(item)
+                break
+
+            batch.append(item)
+            batch_cost += item.cost
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._take_carry()
+            if first is None:
+                first = self._queue.get()
+            if first is _STOP:
+                # STOP 뒤에 남은 항목이 있으면 기다리게 두지 않는다
+                self._fail_pending()
+                break
+
+            batch = self._collect(first)
+            started = time.monotonic()
+            for item in batch:
+                self._queue_wait_hist.observe(started - item.enqueued_at)
+            self._batch_size_hist.observe(len(batch))
+
+            try:
+                results = self.process_fn([item.payload for item in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name} batch returned {len(results)} results for {len(batch)} inputs"
+                    )
+            except Exception as e:
+                logger.error(f"[BATCH][{self.name}] batch of {len(batch)} failed: {e}")
+                for item in batch:
+                    _resolve(item.future, exception=e)
+                continue
+
+            for item, result in zip(batch, results):
+                _resolve(item.future, result=result)
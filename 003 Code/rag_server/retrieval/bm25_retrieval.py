@@ -1,6 +1,5 @@
 import logging
 from typing import List, Tuple, Optional
-from pyserini.search.lucene import LuceneSearcher
 
 logger = logging.getLogger("rag")
 
@@ -12,6 +11,9 @@ class BM25Retriever:
     
     def _initialize_searcher(self) -> None:
         try:
+            # pyserini import 시점에 JVM 이 뜨므로, pre-fork 부모 프로세스에서는 import 하지 않는다
+            from pyserini.search.lucene import LuceneSearcher
+
             self.searcher = LuceneSearcher(self.index_path)
             logger.info(f"BM25 index loaded from {self.index_path}")
             logger.info(f"Index contains {self.searcher.num_docs} documents")
@@ -0,0 +1,239 @@
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import counter, histogram
+
+logger = logging.getLogger("rag")
+
+CANDIDATE_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30)
+OVERLAP_BUCKETS = (0.0, 0.34, 0.67, 1.0)
+
+CASCADE_DECISIONS = counter(
+    "rag_rerank_cascade_total",
+    "Rerank cascade outcome per request (skip / early_exit / full)",
+    labelnames=("decision",),
+)
+CASCADE_SCORED = histogram(
+    "rag_rerank_cascade_scored_pairs",
+    "Query-document pairs sent to the cross-encoder per request",
+    CANDIDATE_BUCKETS,
+)
+CASCADE_SHADOW_OVERLAP = histogram(
+    "rag_rerank_cascade_shadow_top3_overlap",
+    "Top-3 overlap between the cascade result and a sampled full rerank",
+    OVERLAP_BUCKETS,
+    labelnames=("decision",),
+)
+
+
+def fusion_signals(
+    dpr_results: List[Tuple[str, float]],
+    bm25_results: List[Tuple[str, float]],
+    final_scores: List[Tuple[str, float]],
+    top_k: int = 3,
+) -> Dict[str, float]:
+    """
+    리랭크 생략 판단에 쓰는 검색 단계 신호.
+      margin    : RRF 상위 top_k 번째와 그 다음 문서의 점수 차 / top_k 번째 점수 (경계가 얼마나 뚜렷한지)
+      agreement : DPR 상위 top_k 와 BM25 상위 top_k 의 겹침 비율 (두 검색기가 같은 문서를 보는지)
+    """
+    if len(final_scores) > top_k and final_scores[top_k - 1][1] > 0:
+        cut, below = final_scores[top_k - 1][1], final_scores[top_k][1]
+        margin = (cut - below) / cut
+    else:
+        # 후보가 top_k 개 이하면 잘라낼 문서가 없다
+        margin = 1.0
+
+    dpr_top = {doc_id for doc_id, _ in dpr_results[:top_k]}
+    bm25_top = {doc_id for doc_id, _ in bm25_results[:top_k]}
+    agreement = len(dpr_top & bm25_top) / top_k if dpr_top and bm25_top else 0.0
+    return {"margin": margin, "agreement": agreement}
+
+
+def top_overlap(a: List, b: List) -> float:
+    return len(set(a) & set(b)) / max(1, len(a))
+
+
+class RerankCascade:
+    """
+    신뢰도 기반 리랭크 캐스케이드.
+
+    1) 검색 신호가 충분히 확실하면(margin >= skip_margin, agreement >= min_agreement)
+       cross-encoder 를 건너뛰고 RRF 상위 top_k 를 그대로 쓴다.
+    2) 아니면 RRF 순서대로 first_stage 개를 먼저 점수화하고, step 개씩 후보를 늘린다.
+       새로 넣은 후보가 현재 top_k 에 하나도 들어오지 못하면 순위가 안정된 것으로 보고 멈춘다.
+
+    품질 영향은 shadow_rate 비율로 표본을 뽑아 전체 리랭크 결과와의 top_k 겹침을 백그라운드에서 잰다.
+    """
+
+    def __init__(
+        self,
+        skip_margin: float = 0.05,
+        min_agreement: float = 0.67,
+        first_stage: int = 5,
+        step: int = 3,
+        top_k: int = 3,
+        shadow_rate: float = 0.05,
+        log_every: int = 100,
+    ) -> None:
+        self.skip_margin = skip_margin
+        self.min_agreement = min_agreement
+        self.first_stage = max(top_k, first_stage)
+        self.step = max(1, step)
+        self.top_k = top_k
+        self.shadow_rate = shadow_rate
+        self.log_every = max(1, log_every)
+
+        self._lock = threading.Lock()
+        self._decisions = {"skip": 0, "early_exit": 0, "full": 0}
+        self._scored = 0
+        self._candidates = 0
+        self._shadow_overlap = {"skip": [0, 0.0], "early_exit": [0, 0.0]}
+        self._shadow_pending = 0
+        self._shadow_executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank-shadow")
+            if shadow_rate > 0
+            else None
+        )
+
+    def should_skip(self, signals: Optional[Dict[str, float]]) -> bool:
+        if not signals:
+            return False
+        return (
+            signals["margin"] >= self.skip_margin
+            and signals["agreement"] >= self.min_agreement
+        )
+
+    def skip(self, num_candidates: int) -> List[int]:
+        """리랭크 생략: RRF 순서 상위 top_k"""
+        self._record("skip", 0, num_candidates)
+        return list(range(min(self.top_k, num_candidates)))
+
+    def rank(
+        self, score_fn: Callable[[List[int]], np.ndarray], num_candidates: int
+    ) -> Tuple[List[int], str]:
+        """
+        score_fn(indices) 는 RRF 순서의 후보 인덱스들에 대한 cross-encoder 점수를 돌려준다.
+        반환값: (점수 내림차순 상위 top_k 인덱스, "early_exit" | "full")
+        """
+        scores: Dict[int, float] = {}
+
+        def score_range(start: int, end: int) -> None:
+            indices = list(range(start, end))
+            for index, score in zip(indices, score_fn(indices)):
+                scores[index] = float(score)
+
+        def current_top() -> List[int]:
+            return sorted(scores, key=lambda i: scores[i], reverse=True)[: self.top_k]
+
+        end = min(self.first_stage, num_candidates)
+        score_range(0, end)
+        decision = "full"
+        while end < num_candidates:
+            top_before = set(current_top())
+            next_end = min(end + self.step, num_candidates)
+            score_range(end, next_end)
+            end = next_end
+            # 새 후보가 top_k 에 못 들어왔으면 더 낮은 RRF 순위의 후보도 들어오지 않는다고 본다
+            if end < num_candidates and set(current_top()) == top_before:
+                decision = "early_exit"
+                break
+
+        self._record(decision, len(scores), num_candidates)
+        return current_top(), decision
+
+    # ------------------------------------------------------------------
+    # 품질 영향 (shadow) / 통계
+    # ------------------------------------------------------------------
+
+    def maybe_shadow(
+        self,
+        decision: str,
+        served: List[str],
+        full_rank_fn: Callable[[], List[str]],
+    ) -> bool:
+        """
+        skip / early_exit 요청 중 shadow_rate 만큼을 골라 전체 리랭크 결과(full_rank_fn, 상위 top_k id)와
+        실제로 쓴 결과(served)의 겹침을 백그라운드에서 기록한다. 요청 지연에는 더해지지 않는다.
+
+        shadow 는 한 번에 하나만 돌고, 앞의 shadow 가 아직 끝나지 않았으면 이번 표본은 건너뛴다
+        (대기열이 쌓여 지난 번들의 자원을 붙잡지 않도록). 제출했으면 True.
+        """
+        if self._shadow_executor is None or decision == "full":
+            return False
+        if random.random() >= self.shadow_rate:
+            return False
+        with self._lock:
+            if self._shadow_pending:
+                return False
+            self._shadow_pending += 1
+
+        def _run():
+            try:
+                overlap = top_overlap(full_rank_fn(), served)
+            except Exception as e:
+                logger.warning(f"[CASCADE] shadow 리랭크 실패: {e}")
+                return
+            finally:
+                with self._lock:
+                    self._shadow_pending -= 1
+            CASCADE_SHADOW_OVERLAP.labels(decision=decision).observe(overlap)
+            with self._lock:
+                stat = self._shadow_overlap[decision]
+                stat[0] += 1
+                stat[1] += overlap
+            if overlap < 1.0:
+                logger.info(
+                    f"[CASCADE] shadow: {decision} 결과가 전체 리랭크와 다름 "
+                    f"(top-{self.top_k} overlap={overlap:.2f})"
+                )
+
+        try:
+            self._shadow_executor.submit(_run)
+        except RuntimeError:
+            # close() 로 executor 가 이미 멈춘 경우
+            with self._lock:
+                self._shadow_pending -= 1
+            return False
+        return True
+
+    def _record(self, decision: str, scored: int, num_candidates: int) -> None:
+        CASCADE_DECISIONS.labels(decision=decision).inc()
+        CASCADE_SCORED.observe(scored)
+        with self._lock:
+            self._decisions[decision] += 1
+            self._scored += scored
+            self._candidates += num_candidates
+            total = sum(self._decisions.values())
+        if total % self.log_every == 0:
+            stats = self.stats()
+            logger.info(
+                f"[CASCADE] {total}건 - skip={stats['skip_rate']:.1%}, "
+                f"early_exit={stats['early_exit_rate']:.1%}, "
+                f"점수화 비율={stats['scored_ratio']:.1%}, shadow overlap={stats['shadow_overlap']}"
+            )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self._decisions.values())
+            return {
+                "requests": total,
+                "decisions": dict(self._decisions),
+                "skip_rate": self._decisions["skip"] / total if total else 0.0,
+                "early_exit_rate": self._decisions["early_exit"] / total if total else 0.0,
+                # 전체 리랭크 대비 실제로 점수화한 쌍의 비율
+                "scored_ratio": self._scored / self._candidates if self._candidates else 0.0,
+                "shadow_overlap": {
+                    decision: round(total_overlap / count, 4) if count else None
+                    for decision, (count, total_overlap) in self._shadow_overlap.items()
+                },
+            }
+
+    def close(self) -> None:
+        if self._shadow_executor is not None:
+            self._shadow_executor.shutdown(wait=False)
@@ -1,10 +1,17 @@
+import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Tuple
 import torch
 from chromadb.api.models.Collection import Collection
 from transformers import PreTrainedModel, PreTrainedTokenizer
 
+from metrics import stage_timer
+
 from .bm25_retrieval import BM25Retriever
+from .cascade import fusion_signals
+from .query_encoder import BatchingQueryEncoder, encode_queries
 
 logger = logging.getLogger("rag")
 
@@ -17,44 +24,33 @@ def dpr_search_ids(
     device: str = "cuda",
     max_length: int = 512,
     top_k: int = 30,
+    query_encoder: Optional[BatchingQueryEncoder] = None,
 ) -> List[Tuple[str, float]]:
 
-    if device is None:
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+    with stage_timer("encode"):
+        if query_encoder is not None:
+            embedding = query_encoder.encode(query)
+        else:
+            if device is None:
+                device = "cuda" if torch.cuda.is_available() else "cpu"
 
-    q_encoder = q_encoder.to(device)
-    q_encoder.eval()
+            q_encoder = q_encoder.to(device)
+            q_encoder.eval()
 
-    if pooler is not None and hasattr(pooler, "to"):
-        pooler.to(device)
+            if pooler is not None and hasattr(pooler, "to"):
+                pooler.to(device)
 
-    q_batch = tokenizer(
-        [query],
-        padding=True,
-        truncation=True,
-        max_length=max_length,
-        return_tensors="pt",
-    )
-    q_batch = {k: v.to(device) for k, v in q_batch.items()}
+            embedding = encode_queries(
+                [query], q_encoder, tokenizer, pooler, device, max_length
+            )[0]
 
-    with torch.no_grad():
-        outputs = q_encoder(
-            input_ids=q_batch["input_ids"],
-            attention_mask=q_batch["attention_mask"],
-            token_type_ids=q_batch.get("token_type_ids", None),
+    with stage_timer("chroma"):
+        chroma_res = chroma_collection.query(
+            query_embeddings=[embedding.tolist()],
+            n_results=top_k,
+            include=["distances", "metadatas"],
         )
 
-    if pooler is not None:
-        embedding = pooler(q_batch["attention_mask"], outputs).cpu().numpy()
-    else:
-        embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-
-    chroma_res = chroma_collection.query(
-        query_embeddings=[embedding[0].tolist()],
-        n_results=top_k,
-        include=["distances", "metadatas"],  
-    )
-
     logger.info(f"[DPR] Chroma query result ids: {chroma_res.get('ids')}")
     logger.info(f"[DPR] Chroma query result distances: {chroma_res.get('distances')}")
 
@@ -81,7 +77,70 @@ def dpr_search_ids(
     return results
 
 
-def hybrid_search_ids(
+_RETRIEVAL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_WORKERS", "8")),
+    thread_name_prefix="retrieval",
+)
+
+
+def _timed(stage: str, fn, *args, **kwargs):
+    start = time.perf_counter()
+    with stage_timer(stage):
+        result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def rrf_fusion(
+    dpr_results: List[Tuple[str, float]],
+    bm25_results: List[Tuple[str, float]],
+    alpha: float = 0.3,
+    rrf_k: int = 60,
+) -> List[Tuple[str, float]]:
+    rrf_scores: Dict[str, float] = {}
+
+    for rank, (doc_id, _) in enumerate(dpr_results):
+        rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + alpha * (1 / (rrf_k + rank + 1))
+
+    for rank, (doc_id, _) in enumerate(bm25_results):
+        rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + (1 - alpha) * (1 / (rrf_k + rank + 1))
+
+    return sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
+
+
+def _finish_hybrid(
+    dpr_results: List[Tuple[str, float]],
+    bm25_results: List[Tuple[str, float]],
+    timings: Dict[str, float],
+    started: float,
+    final_top_k: int,
+    alpha: float,
+) -> Tuple[List[str], Dict[str, float], Dict[str, float]]:
+    logger.info(f"[DPR] Retrieved {len(dpr_results)} document IDs")
+    logger.info(f"[BM25] Retrieved {len(bm25_results)} document IDs")
+
+    fusion_start = time.perf_counter()
+    with stage_timer("fusion"):
+        final_scores = rrf_fusion(dpr_results, bm25_results, alpha=alpha)
+        top_doc_ids = [doc_id for doc_id, _ in final_scores[:final_top_k]]
+        signals = fusion_signals(dpr_results, bm25_results, final_scores)
+    timings["fusion_ms"] = (time.perf_counter() - fusion_start) * 1000.0
+    timings["total_ms"] = (time.perf_counter() - started) * 1000.0
+
+    logger.info(f"[HYBRID] Final {len(top_doc_ids)} document IDs selected (RRF Method)")
+    for rank, (doc_id, score) in enumerate(final_scores[:final_top_k], start=1):
+        logger.info(f"[HYBRID][{rank}] id={doc_id}, rrf_score={score:.6f}")
+    logger.info(
+        "[HYBRID] timings - "
+        + ", ".join(f"{k}={v:.1f}" for k, v in timings.items())
+    )
+    logger.info(
+        f"[HYBRID] signals - margin={signals['margin']:.3f}, agreement={signals['agreement']:.2f}"
+    )
+
+    return top_doc_ids, timings, signals
+
+
+def hybrid_search_with_signals(
     query: str,
     q_encoder: PreTrainedModel,
     tokenizer: PreTrainedTokenizer,
@@ -94,8 +153,22 @@ def hybrid_search_ids(
     bm25_top_k: int = 30,
     final_top_k: int = 10,
     alpha: float = 0.3,
-) -> List[str]:
-    dpr_results = dpr_search_ids(
+    query_encoder: Optional[BatchingQueryEncoder] = None,
+) -> Tuple[List[str], Dict[str, float], Dict[str, float]]:
+    """
+    DPR(쿼리 인코딩 + Chroma 조회)과 BM25(Lucene 검색)를 동시에 실행한 뒤
+    RRF로 합친다. 두 검색기의 지연 시간이 더해지지 않고 큰 쪽만 남는다.
+
+    반환값: (doc_ids, timings, signals)
+      timings 는 dpr_ms / bm25_ms / fusion_ms / total_ms
+      signals 는 리랭크 캐스케이드 판단용 margin / agreement (cascade.fusion_signals)
+    """
+    started = time.perf_counter()
+
+    dpr_future = _RETRIEVAL_EXECUTOR.submit(
+        _timed,
+        "dpr",
+        dpr_search_ids,
         query,
         q_encoder,
         tokenizer,
@@ -104,40 +177,92 @@ def hybrid_search_ids(
         device,
         max_length,
         dense_top_k,
+        query_encoder,
     )
-    logger.info(f"[DPR] Retrieved {len(dpr_results)} document IDs")
 
-    bm25_results: List[Tuple[str, float]] = []
+    bm25_future = None
     if bm25_retriever is not None and bm25_top_k > 0:
-        bm25_results = bm25_retriever.search_with_scores(query, top_k=bm25_top_k)
-        logger.info(f"[BM25] Retrieved {len(bm25_results)} document IDs")
-
-    rrf_scores: Dict[str, float] = {}
-    rrf_k = 60
-
-    if dpr_results:
-        for rank, (doc_id, _) in enumerate(dpr_results):
-            if doc_id not in rrf_scores:
-                rrf_scores[doc_id] = 0.0
+        bm25_future = _RETRIEVAL_EXECUTOR.submit(
+            _timed, "bm25", bm25_retriever.search_with_scores, query, top_k=bm25_top_k
+        )
 
-            rrf_scores[doc_id] += alpha * (1 / (rrf_k + rank + 1))
+    timings: Dict[str, float] = {}
+    dpr_results, timings["dpr_ms"] = dpr_future.result()
 
-    if bm25_results:
-        for rank, (doc_id, _) in enumerate(bm25_results):
-            if doc_id not in rrf_scores:
-                rrf_scores[doc_id] = 0.0
+    bm25_results: List[Tuple[str, float]] = []
+    if bm25_future is not None:
+        bm25_results, timings["bm25_ms"] = bm25_future.result()
 
-            rrf_scores[doc_id] += (1 - alpha) * (1 / (rrf_k + rank + 1))
+    return _finish_hybrid(
+        dpr_results, bm25_results, timings, started, final_top_k, alpha
+    )
 
-    final_scores = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
 
-    top_doc_ids = [doc_id for doc_id, _ in final_scores[:final_top_k]]
+def hybrid_search_with_timings(
+    query: str,
+    q_encoder: PreTrainedModel,
+    tokenizer: PreTrainedTokenizer,
+    pooler,
+    chroma_collection: Collection,
+    bm25_retriever: Optional[BM25Retriever] = None,
+    device: str = "cuda",
+    max_length: int = 512,
+    dense_top_k: int = 30,
+    bm25_top_k: int = 30,
+    final_top_k: int = 10,
+    alpha: float = 0.3,
+    query_encoder: Optional[BatchingQueryEncoder] = None,
+) -> Tuple[List[str], Dict[str, float]]:
+    """hybrid_search_with_signals 에서 signals 를 뺀 (doc_ids, timings)"""
+    doc_ids, timings, _ = hybrid_search_with_signals(
+        query,
+        q_encoder,
+        tokenizer,
+        pooler,
+        chroma_collection,
+        bm25_retriever,
+        device,
+        max_length,
+        dense_top_k,
+        bm25_top_k,
+        final_top_k,
+        alpha,
+        query_encoder,
+    )
+    return doc_ids, timings
 
-    logger.info(f"[HYBRID] Final {len(top_doc_ids)} document IDs selected (RRF Method)")
-    for rank, (doc_id, score) in enumerate(final_scores[:final_top_k], start=1):
-        logger.info(f"[HYBRID][{rank}] id={doc_id}, rrf_score={score:.6f}")
 
-    return top_doc_ids
+def hybrid_search_ids(
+    query: str,
+    q_encoder: PreTrainedModel,
+    tokenizer: PreTrainedTokenizer,
+    pooler,
+    chroma_collection: Collection,
+    bm25_retriever: Optional[BM25Retriever] = None,
+    device: str = "cuda",
+    max_length: int = 512,
+    dense_top_k: int = 30,
+    bm25_top_k: int = 30,
+    final_top_k: int = 10,
+    alpha: float = 0.3,
+    query_encoder: Optional[BatchingQueryEncoder] = None,
+) -> List[str]:
+    doc_ids, _ = hybrid_search_with_timings(
+        query,
+        q_encoder,
+        tokenizer,
+        pooler,
+        chroma_collection,
+        bm25_retriever,
+        device,
+        max_length,
+        dense_top_k,
+        bm25_top_k,
+        final_top_k,
+        alpha,
+        query_encoder,
+    )
+    return doc_ids
 
 
 def search_documents(
@@ -0,0 +1,91 @@
+import hashlib
+import logging
+from typing import Optional
+
+import numpy as np
+
+from query_utils import normalize_query
+from ttl_cache import TTLCache
+
+logger = logging.getLogger("rag")
+
+
+def _tensor_bytes(tensor) -> np.ndarray:
+    """CPU 의 연속 텐서는 복사 없이 같은 메모리를 가리키는 numpy 배열로 돌려준다"""
+    data = tensor.detach()
+    if data.device.type != "cpu":
+        data = data.cpu()
+    data = data.contiguous()
+    try:
+        return data.numpy()
+    except TypeError:
+        # bfloat16 처럼 numpy 에 없는 dtype 은 같은 크기의 정수로 재해석한다
+        import torch
+
+        return data.view(torch.uint8 if data.element_size() == 1 else torch.int16).numpy()
+
+
+def model_identity(model) -> str:
+    """
+    캐시 키에 쓰는 모델 식별자. 경로 이름과 전체 가중치(state_dict)의 내용 해시로 만들어
+    같은 경로에 다른 체크포인트가 올라와도 구분된다. 모델 객체에 한 번만 계산해 둔다.
+
+    일부 파라미터만 해시하면 안 된다: Pooler("cls") 로 쓰는 BERT 인코더의 마지막 파라미터는
+    학습되지 않는 pooler.dense 라서 재학습한 체크포인트도 같은 값이 나온다.
+    """
+    identity = getattr(model, "_rag_identity", None)
+    if identity is not None:
+        return identity
+
+    digest = hashlib.sha1()
+    name_or_path = getattr(getattr(model, "config", None), "_name_or_path", "") or ""
+    digest.update(name_or_path.encode("utf-8"))
+
+    # 텐서를 float 로 복사하지 않고 저장된 바이트를 그대로 해시한다 (모델 크기만큼 메모리가 튀지 않는다)
+    state = model.state_dict() if hasattr(model, "state_dict") else {}
+    for name, tensor in state.items():
+        digest.update(name.encode("utf-8"))
+        digest.update(_tensor_bytes(tensor))
+
+    identity = f"{name_or_path}@{digest.hexdigest()[:12]}"
+    try:
+        model._rag_identity = identity
+    except AttributeError:
+        pass
+    return identity
+
+
+class QueryEmbeddingCache:
+    """
+    (모델 식별자, 정규화된 쿼리) -> 쿼리 임베딩 캐시.
+    임베딩은 dtype(float32/float16) 버퍼로 보관하고 꺼낼 때 float32 로 돌려준다.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: Optional[float] = 3600.0,
+        dtype: str = "float32",
+    ) -> None:
+        self.dtype = np.dtype(dtype)
+        self._cache = TTLCache("query_embedding", max_entries, ttl_seconds)
+
+    def get(self, model_id: str, query: str) -> Optional[np.ndarray]:
+        stored = self._cache.get((model_id, normalize_query(query)))
+        if stored is None:
+            return None
+        return stored.astype(np.float32)
+
+    def put(self, model_id: str, query: str, embedding: np.ndarray) -> None:
+        stored = np.array(embedding, dtype=self.dtype, copy=True)
+        stored.setflags(write=False)
+        self._cache.put((model_id, normalize_query(query)), stored)
+
+    def invalidate_model(self, model_id: str) -> int:
+        removed = self._cache.invalidate(lambda key: key[0] == model_id)
+        if removed:
+            logger.info(f"[EMB-CACHE] model={model_id} 항목 {removed}개 무효화")
+        return removed
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,111 @@
+import logging
+from typing import List, Optional
+
+import numpy as np
+import torch
+from transformers import PreTrainedModel, PreTrainedTokenizer
+
+from .batching import MicroBatcher
+from .embedding_cache import QueryEmbeddingCache, model_identity
+
+logger = logging.getLogger("rag")
+
+
+def encode_queries(
+    queries: List[str],
+    q_encoder: PreTrainedModel,
+    tokenizer: PreTrainedTokenizer,
+    pooler,
+    device: str = "cuda",
+    max_length: int = 512,
+) -> np.ndarray:
+    """쿼리 리스트를 한 번에 패딩/인코딩하여 (batch_size, hidden_size) 임베딩을 반환"""
+    q_batch = tokenizer(
+        queries,
+        padding=True,
+        truncation=True,
+        max_length=max_length,
+        return_tensors="pt",
+    )
+    q_batch = {k: v.to(device) for k, v in q_batch.items()}
+
+    with torch.no_grad():
+        outputs = q_encoder(
+            input_ids=q_batch["input_ids"],
+            attention_mask=q_batch["attention_mask"],
+            token_type_ids=q_batch.get("token_type_ids", None),
+        )
+
+    if getattr(q_encoder, "includes_pooler", False):
+        # int8 아티팩트는 pooler 까지 포함한 그래프라 임베딩을 바로 돌려준다
+        embeddings = outputs
+    elif pooler is not None:
+        embeddings = pooler(q_batch["attention_mask"], outputs)
+    else:
+        embeddings = outputs.last_hidden_state[:, 0, :]
+
+    return embeddings.float().cpu().numpy()
+
+
+class BatchingQueryEncoder:
+    """
+    동시에 들어온 /rag 요청들의 쿼리를 모아 q_encoder forward 를 한 번만 수행한다.
+    모델은 생성 시 한 번만 device 로 옮기고 eval 모드로 고정한다.
+
+    embedding_cache 가 주어지면 (모델 식별자, 정규화 쿼리) 로 먼저 조회하고
+    캐시에 없는 쿼리만 배치에 넣는다.
+    """
+
+    def __init__(
+        self,
+        q_encoder: PreTrainedModel,
+        tokenizer: PreTrainedTokenizer,
+        pooler,
+        device: str = "cuda",
+        max_length: int = 512,
+        max_batch_size: int = 16,
+        window_ms: float = 5.0,
+        embedding_cache: Optional[QueryEmbeddingCache] = None,
+    ) -> None:
+        self.q_encoder = q_encoder.to(device)
+        self.q_encoder.eval()
+        if pooler is not None and hasattr(pooler, "to"):
+            pooler.to(device)
+
+        self.tokenizer = tokenizer
+        self.pooler = pooler
+        self.device = device
+        self.max_length = max_length
+        self.embedding_cache = embedding_cache
+        self.model_id = model_identity(q_encoder)
+
+        self._batcher = MicroBatcher(
+            "encoder",
+            self._encode_batch,
+            max_batch_size=max_batch_size,
+            window_ms=window_ms,
+        )
+
+    def _encode_batch(self, queries: List[str]) -> List[np.ndarray]:
+        embeddings = encode_queries(
+            queries,
+            self.q_encoder,
+            self.tokenizer,
+            self.pooler,
+            self.device,
+            self.max_length,
+        )
+        return list(embeddings)
+
+    def encode(self, query: str) -> np.ndarray:
+        if self.embedding_cache is None:
+            return self._batcher(query)
+
+        embedding = self.embedding_cache.get(self.model_id, query)
+        if embedding is None:
+            embedding = self._batcher(query)
+            self.embedding_cache.put(self.model_id, query, embedding)
+        return embedding
+
+    def close(self) -> None:
+        self._batcher.close()
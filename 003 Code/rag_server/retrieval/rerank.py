@@ -1,8 +1,38 @@
-from typing import List
+import time
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence
 
+import numpy as np
 import torch
 from transformers import PreTrainedModel, PreTrainedTokenizer
 
+from metrics import counter, histogram
+
+from .batching import MicroBatcher
+from .embedding_cache import model_identity
+from .score_cache import RerankScoreCache
+
+TOKENIZE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+PADDING_BUCKETS = (0.0, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+RERANK_TOKENIZE_SECONDS = histogram(
+    "rag_rerank_tokenize_seconds",
+    "Seconds spent building cross-encoder inputs for one request",
+    TOKENIZE_BUCKETS,
+    labelnames=("mode",),
+)
+RERANK_DOC_TOKENS = counter(
+    "rag_rerank_doc_tokens_total",
+    "Documents whose token ids came from the chunk store or were tokenized per request",
+    labelnames=("source",),
+)
+RERANK_PADDING_RATIO = histogram(
+    "rag_rerank_padding_ratio",
+    "Fraction of padding tokens in one cross-encoder forward",
+    PADDING_BUCKETS,
+)
+
 
 def rerank(
     query: str,
@@ -36,3 +66,265 @@ def rerank(
     sorted_idx = scores.argsort()[::-1][:top_k]
     reranked_docs = [docs[i] for i in sorted_idx]
     return reranked_docs
+
+
+class BatchingReranker:
+    """
+    cross-encoder 를 device 에 상주시키고, 동시에 들어온 여러 요청의 (query, doc) 쌍을
+    하나의 패딩된 forward 로 점수화한 뒤 각 요청에 자기 점수만 돌려준다.
+
+    토크나이즈는 호출 스레드에서 미리 해 두고, 배치 워커는 패딩과 forward 만 수행한다.
+    한 배치의 토큰 합은 max_batch_tokens 를 넘지 않는다 (단일 요청이 더 크면 단독 처리).
+    model 은 HF 모델 또는 int8 TorchScript 아티팩트(models/quantized_reranker.py) 모두 된다.
+
+    doc_token_ids 로 인덱싱 때 만들어 둔 문서 토큰 id(chunk store 의 tokens/<tokenizer_id>)를 주면
+    요청마다 질의만 토크나이즈하고 [CLS] q [SEP] d [SEP] 를 id 이어 붙이기로 만든다.
+    length_buckets 를 주면 배치 안의 쌍을 길이 구간별로 나눠 forward 해 짧은 쌍이
+    가장 긴 쌍 길이까지 패딩되지 않게 한다.
+
+    score_cache 와 chunk_ids 가 주어지면 (리랭커 식별자, index_version, 정규화 쿼리, chunk id) 로
+    먼저 조회하고 캐시에 없는 쌍만 배치에 넣는다.
+    """
+
+    def __init__(
+        self,
+        model: PreTrainedModel,
+        tokenizer: PreTrainedTokenizer,
+        device: str = "cuda",
+        max_length: int = 512,
+        max_batch_tokens: int = 16384,
+        max_batch_size: int = 32,
+        window_ms: float = 5.0,
+        length_buckets: Sequence[int] = (),
+        score_cache: Optional[RerankScoreCache] = None,
+        index_version: Optional[str] = None,
+    ) -> None:
+        self.model = model.to(device)
+        self.model.eval()
+        self.tokenizer = tokenizer
+        self.device = device
+        self.max_length = max_length
+        self.length_buckets = sorted(b for b in length_buckets if 0 < b < max_length)
+        self.score_cache = score_cache
+        self.index_version = index_version
+        self.model_id = model_identity(model)
+        self._template = self._pair_template()
+        self._num_special = sum(len(part[0]) for part in self._template.values())
+
+        self._stats_lock = threading.Lock()
+        self._real_tokens = 0
+        self._padded_tokens = 0
+        self._forwards = 0
+
+        self._batcher = MicroBatcher(
+            "reranker",
+            self._score_batch,
+            max_batch_size=max_batch_size,
+            window_ms=window_ms,
+            cost_fn=lambda features: sum(len(f["input_ids"]) for f in features),
+            max_batch_cost=max_batch_tokens,
+        )
+
+    def _encode_pairs(
+        self,
+        query: str,
+        docs: List[str],
+        doc_token_ids: Optional[List[Optional[np.ndarray]]] = None,
+    ) -> List[dict]:
+        started = time.perf_counter()
+        if doc_token_ids is None:
+            encoded = self.tokenizer(
+                [query] * len(docs),
+                docs,
+                truncation=True,
+                max_length=self.max_length,
+            )
+            features = [
+                {key: encoded[key][i] for key in encoded.keys()}
+                for i in range(len(docs))
+            ]
+            mode = "text"
+            RERANK_DOC_TOKENS.labels(source="runtime").inc(len(docs))
+        else:
+            features = self._pairs_from_ids(query, docs, doc_token_ids)
+            mode = "pretokenized"
+        RERANK_TOKENIZE_SECONDS.labels(mode=mode).observe(time.perf_counter() - started)
+        return features
+
+    def _pair_template(self) -> Dict[str, tuple]:
+        """
+        토크나이저가 (query, doc) 쌍에 붙이는 special token 배치를 실제 인코딩에서 읽어 둔다.
+        반환값: {"prefix"|"middle"|"suffix": (ids, token_type_ids)} (query / doc 구간의 token_type_id 는 속성에 둔다)
+        ([CLS] q [SEP] d [SEP], <s> q </s></s> d </s> 등 토크나이저마다 다르다)
+        """
+        encoded = self.tokenizer(
+            "query", "document", return_special_tokens_mask=True, return_token_type_ids=True
+        )
+        ids = encoded["input_ids"]
+        types = encoded.get("token_type_ids") or [0] * len(ids)
+        special = encoded["special_tokens_mask"]
+
+        # special token 이 아닌 구간 두 개가 각각 query / doc 이다
+        runs, start = [], None
+        for i, flag in enumerate(special + [1]):
+            if not flag and start is None:
+                start = i
+            elif flag and start is not None:
+                runs.append((start, i))
+                start = None
+        (q_start, q_end), (d_start, d_end) = runs
+
+        self._use_token_type_ids = "token_type_ids" in encoded and (
+            "token_type_ids" in self.tokenizer.model_input_names
+        )
+        self._query_type, self._doc_type = types[q_start], types[d_start]
+        return {
+            "prefix": (ids[:q_start], types[:q_start]),
+            "middle": (ids[q_end:d_start], types[q_end:d_start]),
+            "suffix": (ids[d_end:], types[d_end:]),
+        }
+
+    def _pairs_from_ids(
+        self, query: str, docs: List[str], doc_token_ids: List[Optional[np.ndarray]]
+    ) -> List[dict]:
+        # 긴 질의가 문서 자리를 다 차지하지 않도록 질의는 절반까지만 쓴다
+        query_ids = self.tokenizer(
+            query, add_special_tokens=False, truncation=True, max_length=self.max_length // 2
+        )["input_ids"]
+        doc_budget = max(0, self.max_length - len(query_ids) - self._num_special)
+
+        # 미리 만든 id 가 없는 문서(DB 폴백 등)만 여기서 토크나이즈한다
+        missing = [i for i, ids in enumerate(doc_token_ids) if ids is None]
+        runtime_ids: Dict[int, List[int]] = {}
+        if missing:
+            encoded = self.tokenizer(
+                [docs[i] for i in missing],
+                add_special_tokens=False,
+                truncation=True,
+                max_length=doc_budget,
+            )["input_ids"]
+            runtime_ids = dict(zip(missing, encoded))
+            RERANK_DOC_TOKENS.labels(source="runtime").inc(len(missing))
+        RERANK_DOC_TOKENS.labels(source="chunk_store").inc(len(docs) - len(missing))
+
+        prefix, middle, suffix = (
+            self._template["prefix"], self._template["middle"], self._template["suffix"]
+        )
+        head = prefix[0] + query_ids + middle[0]
+        head_types = prefix[1] + [self._query_type] * len(query_ids) + middle[1]
+
+        features = []
+        for i, ids in enumerate(doc_token_ids):
+            doc_ids = runtime_ids[i] if ids is None else ids[:doc_budget].tolist()
+            input_ids = head + doc_ids + suffix[0]
+            feature = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+            if self._use_token_type_ids:
+                feature["token_type_ids"] = (
+                    head_types + [self._doc_type] * len(doc_ids) + suffix[1]
+                )
+            features.append(feature)
+        return features
+
+    def _forward(self, features: List[dict]) -> np.ndarray:
+        batch = self.tokenizer.pad(features, padding=True, return_tensors="pt")
+        batch = {k: v.to(self.device) for k, v in batch.items()}
+
+        real = sum(len(f["input_ids"]) for f in features)
+        padded = batch["input_ids"].numel()
+        RERANK_PADDING_RATIO.observe((padded - real) / padded if padded else 0.0)
+        with self._stats_lock:
+            self._real_tokens += real
+            self._padded_tokens += padded
+            self._forwards += 1
+
+        with torch.no_grad():
+            logits = self.model(**batch).logits.squeeze(-1)
+        return logits.reshape(-1).float().cpu().numpy()
+
+    def _score_batch(self, requests: List[List[dict]]) -> List[np.ndarray]:
+        features = [f for request in requests for f in request]
+
+        if self.length_buckets:
+            # 같은 길이 구간끼리 모아 forward 하고 원래 순서로 되돌린다
+            groups: Dict[int, List[int]] = {}
+            for i, f in enumerate(features):
+                bucket = bisect.bisect_left(self.length_buckets, len(f["input_ids"]))
+                groups.setdefault(bucket, []).append(i)
+            scores = np.empty(len(features), dtype=np.float32)
+            for indices in groups.values():
+                scores[indices] = self._forward([features[i] for i in indices])
+        else:
+            scores = self._forward(features)
+
+        results: List[np.ndarray] = []
+        offset = 0
+        for request in requests:
+            results.append(scores[offset : offset + len(request)])
+            offset += len(request)
+        return results
+
+    def score(
+        self,
+        query: str,
+        docs: List[str],
+        doc_token_ids: Optional[List[Optional[np.ndarray]]] = None,
+        chunk_ids: Optional[List[Optional[str]]] = None,
+    ) -> np.ndarray:
+        if not docs:
+            return np.zeros(0, dtype=np.float32)
+        if self.score_cache is None or chunk_ids is None:
+            return self._batcher(self._encode_pairs(query, docs, doc_token_ids))
+
+        cached = self.score_cache.get_many(self.model_id, self.index_version, query, chunk_ids)
+        scores = np.array([0.0 if s is None else s for s in cached], dtype=np.float32)
+        missing = [i for i, s in enumerate(cached) if s is None]
+        if missing:
+            fresh = self._batcher(
+                self._encode_pairs(
+                    query,
+                    [docs[i] for i in missing],
+                    [doc_token_ids[i] for i in missing] if doc_token_ids is not None else None,
+                )
+            )
+            scores[missing] = fresh
+            self.score_cache.put_many(
+                self.model_id,
+                self.index_version,
+                query,
+                [chunk_ids[i] for i in missing],
+                fresh,
+            )
+        return scores
+
+    def rank(
+        self,
+        query: str,
+        docs: List[str],
+        top_k: int = 3,
+        doc_token_ids: Optional[List[Optional[np.ndarray]]] = None,
+        chunk_ids: Optional[List[Optional[str]]] = None,
+    ) -> List[int]:
+        """점수 내림차순 상위 top_k 문서의 docs 내 인덱스"""
+        if not docs:
+            return []
+
+        scores = self.score(query, docs, doc_token_ids, chunk_ids)
+        return [int(i) for i in scores.argsort()[::-1][:top_k]]
+
+    def rerank(self, query: str, docs: List[str], top_k: int = 3) -> List[str]:
+        return [docs[i] for i in self.rank(query, docs, top_k)]
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "forwards": self._forwards,
+                "length_buckets": self.length_buckets,
+                "padding_ratio": (
+                    round(1 - self._real_tokens / self._padded_tokens, 4)
+                    if self._padded_tokens
+                    else 0.0
+                ),
+            }
+
+    def close(self) -> None:
+        self._batcher.close()
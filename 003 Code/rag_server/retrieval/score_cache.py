@@ -0,0 +1,77 @@
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from metrics import counter
+from query_utils import query_hash
+from ttl_cache import TTLCache
+
+logger = logging.getLogger("rag")
+
+RERANK_CACHE_REQUESTS = counter(
+    "rag_rerank_score_cache_requests_total",
+    "Rerank requests by how many of their pairs were cached (hit / partial / miss)",
+    labelnames=("result",),
+)
+
+
+class RerankScoreCache:
+    """
+    (리랭커 식별자, 인덱스 버전, 정규화 쿼리 해시, chunk id) -> cross-encoder 점수 캐시.
+    재시도 / 후속 질문 / 인기 질문처럼 같은 쿼리가 같은 청크를 다시 리랭크할 때
+    캐시에 없는 쌍만 점수화하게 한다. 번들이 바뀌면 retain() 으로 다른 리랭커/인덱스 항목을 비운다.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl_seconds: Optional[float] = 3600.0) -> None:
+        self._cache = TTLCache("rerank_score", max_entries, ttl_seconds)
+
+    def get_many(
+        self,
+        model_id: str,
+        index_version: Optional[str],
+        query: str,
+        chunk_ids: Sequence[Optional[str]],
+    ) -> List[Optional[float]]:
+        """chunk id 가 None 인 문서(본문을 못 찾은 경우 등)는 항상 None"""
+        qhash = query_hash(query)
+        scores = [
+            self._cache.get((model_id, index_version, qhash, chunk_id))
+            if chunk_id is not None
+            else None
+            for chunk_id in chunk_ids
+        ]
+        cached = sum(score is not None for score in scores)
+        if cached == len(scores):
+            RERANK_CACHE_REQUESTS.labels(result="hit").inc()
+        elif cached:
+            RERANK_CACHE_REQUESTS.labels(result="partial").inc()
+        else:
+            RERANK_CACHE_REQUESTS.labels(result="miss").inc()
+        return scores
+
+    def put_many(
+        self,
+        model_id: str,
+        index_version: Optional[str],
+        query: str,
+        chunk_ids: Sequence[Optional[str]],
+        scores: Sequence[float],
+    ) -> None:
+        qhash = query_hash(query)
+        for chunk_id, score in zip(chunk_ids, scores):
+            if chunk_id is not None:
+                self._cache.put((model_id, index_version, qhash, chunk_id), float(score))
+
+    def retain(self, model_id: str, index_version: Optional[str]) -> int:
+        """서빙 중인 (리랭커, 인덱스 버전) 이 아닌 항목을 지운다"""
+        removed = self._cache.invalidate(
+            lambda key: key[0] != model_id or key[1] != index_version
+        )
+        if removed:
+            logger.info(
+                f"[RERANK-CACHE] 리랭커/인덱스 변경(model={model_id}, index={index_version}) "
+                f"- 항목 {removed}개 무효화"
+            )
+        return removed
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
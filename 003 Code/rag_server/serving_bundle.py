@@ -0,0 +1,216 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import counter, gauge
+
+logger = logging.getLogger("rag")
+
+BUNDLE_IN_FLIGHT = gauge(
+    "rag_bundle_in_flight",
+    "Requests currently using a serving bundle",
+    labelnames=("version",),
+)
+BUNDLE_RELOADS = counter(
+    "rag_bundle_reloads_total",
+    "Serving bundle reload attempts",
+    labelnames=("result",),
+)
+
+
+class ReloadInProgressError(RuntimeError):
+    pass
+
+
+class ServingBundle:
+    """
+    한 버전의 서빙 구성(질문 인코더, 리랭커, Chroma 컬렉션, Lucene 인덱스, chunk store).
+    요청은 enter()/exit() 로 사용 중임을 표시하고, 교체된 번들은 drain() 으로
+    진행 중인 요청이 끝나기를 기다린 뒤 close() 된다.
+    """
+
+    def __init__(self, version: str, spec: Dict[str, Any]) -> None:
+        self.version = version
+        self.spec = spec
+        self.created_at = time.time()
+        self.resources: Dict[str, Any] = {}
+        self._close_fns: List[Callable[[], None]] = []
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._in_flight_gauge = BUNDLE_IN_FLIGHT.labels(version=version)
+        self.closed = False
+
+    def __getitem__(self, name: str) -> Any:
+        return self.resources[name]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.resources.get(name, default)
+
+    def set(self, name: str, value: Any, close_fn: Optional[Callable[[], None]] = None) -> None:
+        self.resources[name] = value
+        if close_fn is not None:
+            self.on_close(close_fn)
+
+    def on_close(self, fn: Callable[[], None]) -> None:
+        with self._cond:
+            self._close_fns.append(fn)
+
+    def enter(self) -> None:
+        with self._cond:
+            self._in_flight += 1
+        self._in_flight_gauge.inc()
+
+    def exit(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._cond.notify_all()
+        self._in_flight_gauge.dec()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """진행 중인 요청이 모두 끝나면 True, timeout 이 먼저 오면 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        # 나중에 등록된 자원부터 역순으로 정리한다
+        for fn in reversed(self._close_fns):
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"[BUNDLE] {self.version} 자원 정리 실패: {e}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "spec": self.spec,
+            "in_flight": self._in_flight,
+            "created_at": self.created_at,
+        }
+
+
+class BundleManager:
+    """
+    현재 서빙 번들을 가리키고 원자적으로 교체한다.
+
+    reload(spec):
+      1) build_fn(spec) 으로 현재 번들 옆에 새 번들을 만든다
+      2) warmup_fn(bundle) 로 합성 쿼리를 돌려 본다 (실패하면 새 번들을 버리고 기존 번들 유지)
+      3) 잠금 안에서 포인터를 바꾼다 - 이후 요청은 모두 새 번들을 사용
+      4) 이전 번들은 백그라운드에서 drain 후 close
+    """
+
+    def __init__(
+        self,
+        build_fn: Callable[[Dict[str, Any]], ServingBundle],
+        warmup_fn: Callable[[ServingBundle], Dict[str, float]],
+        drain_timeout: float = 60.0,
+    ) -> None:
+        self.build_fn = build_fn
+        self.warmup_fn = warmup_fn
+        self.drain_timeout = drain_timeout
+        self._current: Optional[ServingBundle] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._activate_listeners: List[Callable[[ServingBundle], None]] = []
+        self.last_reload: Optional[Dict[str, Any]] = None
+
+    @property
+    def current(self) -> Optional[ServingBundle]:
+        return self._current
+
+    def on_activate(self, fn: Callable[[ServingBundle], None]) -> None:
+        """번들이 교체된 직후 새 번들로 호출된다 (번들 단위 캐시 정리 등)"""
+        self._activate_listeners.append(fn)
+
+    def activate(self, bundle: ServingBundle) -> Optional[ServingBundle]:
+        with self._lock:
+            previous, self._current = self._current, bundle
+        logger.info(f"[BUNDLE] 활성 번들: {bundle.version}")
+        for fn in self._activate_listeners:
+            try:
+                fn(bundle)
+            except Exception as e:
+                logger.error(f"[BUNDLE] 활성화 후처리 실패: {e}")
+        if previous is not None and previous is not bundle:
+            threading.Thread(
+                target=self._retire,
+                args=(previous,),
+                name=f"rag-drain-{previous.version}",
+                daemon=True,
+            ).start()
+        return previous
+
+    def _retire(self, bundle: ServingBundle) -> None:
+        started = time.perf_counter()
+        if not bundle.drain(self.drain_timeout):
+            logger.warning(
+                f"[BUNDLE] {bundle.version} drain 시간 초과 "
+                f"({bundle.in_flight}개 요청 진행 중) - 강제로 정리합니다."
+            )
+        bundle.close()
+        logger.info(
+            f"[BUNDLE] 이전 번들 {bundle.version} 정리 완료 "
+            f"({(time.perf_counter() - started) * 1000:.1f}ms)"
+        )
+
+    @contextmanager
+    def use(self):
+        """with bundles.use() as bundle: 블록 동안 번들이 정리되지 않도록 잡아 둔다."""
+        with self._lock:
+            bundle = self._current
+            if bundle is None:
+                raise RuntimeError("활성 서빙 번들이 없습니다")
+            bundle.enter()
+        try:
+            yield bundle
+        finally:
+            bundle.exit()
+
+    def reload(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("이미 번들 교체가 진행 중입니다")
+        try:
+            started = time.perf_counter()
+            bundle = None
+            try:
+                bundle = self.build_fn(spec)
+                build_ms = (time.perf_counter() - started) * 1000
+                warmup_ms = self.warmup_fn(bundle)
+            except Exception as e:
+                BUNDLE_RELOADS.labels(result="failed").inc()
+                logger.error(f"[BUNDLE] 새 번들 준비 실패 - 기존 번들 유지: {e}")
+                if bundle is not None:
+                    bundle.close()
+                self.last_reload = {"status": "failed", "error": str(e), "spec": spec}
+                raise
+
+            previous = self.activate(bundle)
+            BUNDLE_RELOADS.labels(result="ok").inc()
+            self.last_reload = {
+                "status": "ok",
+                "version": bundle.version,
+                "previous_version": previous.version if previous is not None else None,
+                "build_ms": round(build_ms, 1),
+                "warmup_ms": {k: round(v, 1) for k, v in warmup_ms.items()},
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            return self.last_reload
+        finally:
+            self._reload_lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        current = self._current
+        return {
+            "current": current.describe() if current is not None else None,
+            "last_reload": self.last_reload,
+        }
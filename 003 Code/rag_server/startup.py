@@ -0,0 +1,187 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from metrics import gauge
+
+logger = logging.getLogger("rag")
+
+STARTUP_DURATION = gauge(
+    "rag_startup_duration_seconds",
+    "Wall time of each startup task (model loads, connections)",
+    labelnames=("task",),
+)
+
+
+class StartupOrchestrator:
+    """
+    서로 독립적인 로딩 작업(리랭커, 질문 인코더, BM25 인덱스 등)을 스레드 풀에서 동시에 실행한다.
+    import 시점에는 아무것도 로드하지 않고, start() 이후 백그라운드에서 진행된다.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self._tasks: Dict[str, Callable[[], None]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._task_ms: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="rag-startup"
+        )
+        self._lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], None]) -> None:
+        self._tasks[name] = fn
+
+    def record(self, name: str, seconds: float) -> None:
+        """오케스트레이터 밖에서 측정한 구간(예: import)을 리포트에 함께 남긴다."""
+        with self._lock:
+            self._task_ms[name] = seconds * 1000
+        STARTUP_DURATION.labels(task=name).set(seconds)
+
+    def _run(self, name: str) -> None:
+        started = time.perf_counter()
+        try:
+            self._tasks[name]()
+        except Exception as e:
+            with self._lock:
+                self._errors[name] = str(e)
+            logger.error(f"[STARTUP] {name} 실패: {e}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._task_ms[name] = elapsed * 1000
+            STARTUP_DURATION.labels(task=name).set(elapsed)
+
+        logger.info(f"[STARTUP] {name} 완료: {elapsed * 1000:.1f}ms")
+
+    def _submit(self, name: str) -> None:
+        with self._lock:
+            self._errors.pop(name, None)
+            self._futures[name] = self._executor.submit(self._run, name)
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        for name in self._tasks:
+            self._submit(name)
+
+    def wait(self, timeout: Optional[float] = None, retry_failed: bool = True) -> None:
+        """
+        모든 작업이 끝날 때까지 기다린다.
+        실패한 작업이 있으면 RuntimeError 를 던진다. retry_failed 면 실패한 작업을
+        다시 제출해 두므로 다음 호출에서 재확인할 수 있다.
+        작업 전체가 다시 실행되므로, 작업은 실패할 때 중간에 잡은 자원을 스스로 돌려놓아야 한다.
+        """
+        with self._lock:
+            futures = dict(self._futures)
+        done, pending = wait(futures.values(), timeout=timeout)
+        if pending:
+            raise TimeoutError(f"startup 작업 대기 시간 초과: {sorted(self.pending())}")
+
+        failed = [name for name, f in futures.items() if f.exception() is not None]
+        if failed:
+            errors = {name: self._errors.get(name) for name in failed}
+            if retry_failed:
+                for name in failed:
+                    self._submit(name)
+                raise RuntimeError(f"startup 작업 실패 (재시도 중): {errors}")
+            raise RuntimeError(f"startup 작업 실패: {errors}")
+
+        if self._finished_at is None:
+            self._finished_at = time.perf_counter()
+            logger.info(f"[STARTUP] 전체 로딩 완료: {self.report()}")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def pending(self):
+        with self._lock:
+            return [name for name, f in self._futures.items() if not f.done()]
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            tasks = {name: round(ms, 1) for name, ms in self._task_ms.items()}
+            errors = dict(self._errors)
+        total_ms = None
+        if self._started_at is not None and self._finished_at is not None:
+            total_ms = round((self._finished_at - self._started_at) * 1000, 1)
+        return {"tasks_ms": tasks, "total_ms": total_ms, "errors": errors}
+
+
+class BackgroundConnection:
+    """
+    connect_fn 이 성공할 때까지 백그라운드에서 지수 백오프로 재시도한다.
+    연결 전에 get() 을 부르면 ConnectionError 를 던진다 (프로세스를 종료하지 않음).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect_fn: Callable[[], Any],
+        retry_interval: float = 1.0,
+        max_retry_interval: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.connect_fn = connect_fn
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.connect_ms: Optional[float] = None
+        self._value = None
+        self._connected = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def _connect_loop(self) -> None:
+        started = time.perf_counter()
+        interval = self.retry_interval
+        while True:
+            self.attempts += 1
+            try:
+                self._value = self.connect_fn()
+                break
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(
+                    f"[STARTUP] {self.name} 연결 실패 (시도 {self.attempts}), "
+                    f"{interval:.1f}s 후 재시도: {e}"
+                )
+                time.sleep(interval)
+                interval = min(interval * 2, self.max_retry_interval)
+
+        elapsed = time.perf_counter() - started
+        self.connect_ms = elapsed * 1000
+        self.last_error = None
+        STARTUP_DURATION.labels(task=f"{self.name}_connect").set(elapsed)
+        self._connected.set()
+        logger.info(f"[STARTUP] {self.name} 연결 완료: {self.connect_ms:.1f}ms")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._connect_loop, name=f"rag-connect-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def get(self):
+        if not self._connected.is_set():
+            raise ConnectionError(f"{self.name} 에 아직 연결되지 않았습니다: {self.last_error}")
+        return self._value
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "attempts": self.attempts,
+            "connect_ms": round(self.connect_ms, 1) if self.connect_ms is not None else None,
+            "error": self.last_error,
+        }
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# main.py 와 같은 방식(rag_server 디렉터리 기준 절대 import)으로 모듈을 불러온다.
+# backend 와 모듈 이름(admission, config 등)이 겹치므로 테스트는 서비스별로 따로 실행한다
+RAG_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAG_SERVER_DIR not in sys.path:
+    sys.path.insert(0, RAG_SERVER_DIR)
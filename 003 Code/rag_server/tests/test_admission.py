@@ -0,0 +1,152 @@
+import asyncio
+import itertools
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+_stages = itertools.count()
+
+
+def new_controller(max_concurrency=1, max_queue=10, max_queue_wait=5.0, max_per_client=10):
+    return AdmissionController(
+        f"test_{next(_stages)}", max_concurrency, max_queue, max_queue_wait, max_per_client
+    )
+
+
+async def settle():
+    # 대기 중인 태스크가 future 결과를 받아 진행할 기회를 준다
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_acquires_immediately_below_concurrency():
+    async def scenario():
+        controller = new_controller(max_concurrency=2)
+        await controller.acquire("a")
+        await controller.acquire("b")
+        assert controller.stats()["active"] == 2
+        assert controller.stats()["queued"] == 0
+        controller.release("a")
+        controller.release("b")
+        assert controller.stats() == {
+            "active": 0, "queued": 0, "clients": 0, "max_concurrency": 2, "max_queue": 10,
+        }
+
+    asyncio.run(scenario())
+
+
+def test_released_slots_go_round_robin_across_clients():
+    async def scenario():
+        controller = new_controller(max_concurrency=1)
+        order = []
+
+        async def request(client, name):
+            await controller.acquire(client)
+            order.append(name)
+
+        await controller.acquire("holder")
+        tasks = []
+        for client, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("c", "c1")]:
+            tasks.append(asyncio.create_task(request(client, name)))
+            await settle()
+        assert controller.stats()["queued"] == 5
+
+        controller.release("holder")
+        for client in ["a", "b", "c", "a", "a"]:
+            await settle()
+            controller.release(client)
+        await asyncio.gather(*tasks)
+
+        # FIFO 였다면 a1, a2, a3, b1, c1 이다
+        assert order == ["a1", "b1", "c1", "a2", "a3"]
+        assert controller.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_client_limit_is_429():
+    async def scenario():
+        controller = new_controller(max_concurrency=4, max_per_client=2)
+        await controller.acquire("a")
+        await controller.acquire("a")
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("a")
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.reason == "client_limit"
+        assert excinfo.value.retry_after >= 1
+        # 다른 클라이언트는 영향을 받지 않는다
+        await controller.acquire("b")
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_503():
+    async def scenario():
+        controller = new_controller(max_concurrency=1, max_queue=1)
+        await controller.acquire("a")
+        queued = asyncio.create_task(controller.acquire("b"))
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("c")
+        assert excinfo.value.status_code == 503
+        assert excinfo.value.reason == "queue_full"
+        with pytest.raises(AdmissionRejected):
+            controller.check("c")
+
+        controller.release("a")
+        await queued
+
+    asyncio.run(scenario())
+
+
+def test_queue_wait_timeout_is_503_and_frees_the_queue_slot():
+    async def scenario():
+        controller = new_controller(max_concurrency=1, max_queue_wait=0.05)
+        await controller.acquire("a")
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("b")
+        assert excinfo.value.status_code == 503
+        assert excinfo.value.reason == "queue_timeout"
+        assert controller.stats()["queued"] == 0
+        assert controller.stats()["clients"] == 1
+
+        # 타임아웃된 대기자는 슬롯을 받지 않는다
+        controller.release("a")
+        assert controller.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        controller = new_controller(max_concurrency=1)
+        await controller.acquire("a")
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await settle()
+        assert controller.stats()["queued"] == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.stats()["queued"] == 0
+
+        controller.release("a")
+        assert controller.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_releases_on_error():
+    async def scenario():
+        controller = new_controller(max_concurrency=1)
+        with pytest.raises(ValueError):
+            async with controller.slot("a"):
+                assert controller.stats()["active"] == 1
+                raise ValueError("boom")
+        assert controller.stats()["active"] == 0
+        assert controller.stats()["clients"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+from answer_cache import AnswerCache, context_id
+
+
+def test_context_id_depends_on_chunk_order_and_index():
+    assert context_id("v1", ["a", "b"]) == context_id("v1", ["a", "b"])
+    assert context_id("v1", ["a", "b"]) != context_id("v1", ["b", "a"])
+    assert context_id("v1", ["a", "b"]) != context_id("v2", ["a", "b"])
+
+
+def test_hit_requires_same_mode_context_and_prompt_version():
+    cache = AnswerCache(max_entries=16)
+    context = context_id("v1", ["a", "b"])
+    cache.put("hybrid", "What is RAG?", context, "p1", "answer", [{"id": "img"}])
+
+    assert cache.get("hybrid", "  what is   rag? ", context, "p1") == ("answer", [{"id": "img"}])
+    assert cache.get("dense", "What is RAG?", context, "p1") is None
+    assert cache.get("hybrid", "What is RAG?", context_id("v1", ["a"]), "p1") is None
+    assert cache.get("hybrid", "What is RAG?", context, "p2") is None
+
+
+def test_failed_generations_are_not_cached():
+    cache = AnswerCache(max_entries=16)
+    context = context_id("v1", ["a"])
+    cache.put("hybrid", "q", context, "p1", "", [])
+    cache.put("hybrid", "q", context, "p1", "Error during generation: timeout", [])
+    assert cache.get("hybrid", "q", context, "p1") is None
+
+
+def test_retain_index_drops_other_versions():
+    cache = AnswerCache(max_entries=16)
+    cache.put("hybrid", "q", context_id("v1", ["a"]), "p1", "old", [])
+    cache.put("hybrid", "q", context_id("v2", ["a"]), "p1", "new", [])
+
+    assert cache.retain_index("v2") == 1
+    assert cache.get("hybrid", "q", context_id("v1", ["a"]), "p1") is None
+    assert cache.get("hybrid", "q", context_id("v2", ["a"]), "p1") == ("new", [])
@@ -0,0 +1,163 @@
+import threading
+
+import pytest
+
+from retrieval.batching import MicroBatcher
+
+
+class RecordingProcessor:
+    """받은 배치를 기록하고 payload * 2 를 돌려준다. gate 가 있으면 열릴 때까지 막힌다."""
+
+    def __init__(self, gate: threading.Event = None) -> None:
+        self.batches = []
+        self.gate = gate
+        self.started = threading.Event()
+
+    def __call__(self, payloads):
+        self.batches.append(list(payloads))
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [p * 2 for p in payloads]
+
+
+def make_batcher(process_fn, **kwargs):
+    kwargs.setdefault("window_ms", 100)
+    return MicroBatcher("test", process_fn, **kwargs)
+
+
+def test_merges_submissions_within_window():
+    processor = RecordingProcessor()
+    batcher = make_batcher(processor, max_batch_size=8)
+    try:
+        futures = [batcher.submit(i) for i in range(4)]
+        assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6]
+        assert processor.batches == [[0, 1, 2, 3]]
+    finally:
+        batcher.close()
+
+
+def test_max_batch_size_splits_batches():
+    processor = RecordingProcessor()
+    batcher = make_batcher(processor, max_batch_size=2)
+    try:
+        futures = [batcher.submit(i) for i in range(5)]
+        assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6, 8]
+        assert processor.batches == [[0, 1], [2, 3], [4]]
+    finally:
+        batcher.close()
+
+
+def test_cost_budget_carries_item_to_next_batch():
+    processor = RecordingProcessor()
+    batcher = make_batcher(
+        processor, max_batch_size=8, cost_fn=lambda payload: payload, max_batch_cost=5
+    )
+    try:
+        futures = [batcher.submit(cost) for cost in (3, 3, 3, 1)]
+        assert [f.result(timeout=2) for f in futures] == [6, 6, 6, 2]
+        # 예산을 넘긴 항목은 버려지지 않고 순서대로 다음 배치의 첫 항목이 된다
+        assert processor.batches == [[3], [3], [3, 1]]
+        assert all(sum(batch) <= 5 for batch in processor.batches)
+    finally:
+        batcher.close()
+
+
+def test_oversized_item_is_processed_alone():
+    processor = RecordingProcessor()
+    batcher = make_batcher(
+        processor, max_batch_size=8, cost_fn=lambda payload: payload, max_batch_cost=5
+    )
+    try:
+        futures = [batcher.submit(cost) for cost in (9, 1)]
+        assert [f.result(timeout=2) for f in futures] == [18, 2]
+        assert processor.batches == [[9], [1]]
+    finally:
+        batcher.close()
+
+
+def test_batch_error_fails_every_item():
+    def fail(payloads):
+        raise ValueError("boom")
+
+    batcher = make_batcher(fail)
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with pytest.raises(ValueError, match="boom"):
+                future.result(timeout=2)
+    finally:
+        batcher.close()
+
+
+def test_result_length_mismatch_is_an_error():
+    batcher = make_batcher(lambda payloads: payloads[:-1])
+    try:
+        futures = [batcher.submit(i) for i in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="returned 1 results for 2 inputs"):
+                future.result(timeout=2)
+    finally:
+        batcher.close()
+
+
+def test_close_fails_queued_items_and_finishes_running_batch():
+    gate = threading.Event()
+    processor = RecordingProcessor(gate)
+    batcher = make_batcher(processor, max_batch_size=1, window_ms=0)
+
+    running = batcher.submit(1)
+    assert processor.started.wait(2)
+    queued = batcher.submit(2)
+
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    with pytest.raises(RuntimeError, match="batcher closed"):
+        queued.result(timeout=2)
+
+    gate.set()
+    closer.join(timeout=5)
+    assert not closer.is_alive()
+    assert running.result(timeout=2) == 2
+    assert processor.batches == [[1]]
+
+
+def test_close_fails_carried_item():
+    gate = threading.Event()
+    processor = RecordingProcessor(gate)
+    batcher = make_batcher(
+        processor, max_batch_size=8, cost_fn=lambda payload: payload, max_batch_cost=5
+    )
+
+    running = batcher.submit(3)
+    carried = batcher.submit(3)
+    assert processor.started.wait(2)
+
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    with pytest.raises(RuntimeError, match="batcher closed"):
+        carried.result(timeout=2)
+
+    gate.set()
+    closer.join(timeout=5)
+    assert running.result(timeout=2) == 6
+    assert processor.batches == [[3]]
+
+
+def test_submit_after_close_is_rejected():
+    batcher = make_batcher(RecordingProcessor())
+    batcher.close()
+    batcher.close()
+    with pytest.raises(RuntimeError, match="batcher closed"):
+        batcher.submit(1)
+
+
+def test_call_times_out_instead_of_waiting_forever():
+    gate = threading.Event()
+    batcher = make_batcher(RecordingProcessor(gate), window_ms=0)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher(1, timeout=0.05)
+    finally:
+        gate.set()
+        batcher.close()
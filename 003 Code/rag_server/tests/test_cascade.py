@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+import pytest
+
+from retrieval.cascade import RerankCascade, fusion_signals, top_overlap
+
+
+class Scorer:
+    """RRF 순서 인덱스 -> 고정 점수. 호출마다 받은 인덱스를 기록한다."""
+
+    def __init__(self, scores) -> None:
+        self.scores = scores
+        self.calls = []
+
+    def __call__(self, indices):
+        self.calls.append(list(indices))
+        return np.array([self.scores[i] for i in indices], dtype=np.float32)
+
+
+def new_cascade(**kwargs):
+    kwargs.setdefault("first_stage", 5)
+    kwargs.setdefault("step", 3)
+    kwargs.setdefault("top_k", 3)
+    kwargs.setdefault("shadow_rate", 0.0)
+    return RerankCascade(**kwargs)
+
+
+def test_fusion_signals_margin_and_agreement():
+    final_scores = [("a", 1.0), ("b", 0.9), ("c", 0.8), ("d", 0.6)]
+    signals = fusion_signals(
+        dpr_results=[("a", 0.0), ("b", 0.0), ("c", 0.0)],
+        bm25_results=[("a", 0.0), ("b", 0.0), ("x", 0.0)],
+        final_scores=final_scores,
+    )
+    assert signals["margin"] == pytest.approx((0.8 - 0.6) / 0.8)
+    assert signals["agreement"] == pytest.approx(2 / 3)
+
+
+def test_fusion_signals_with_few_candidates_or_one_retriever():
+    signals = fusion_signals([("a", 0.0)], [], [("a", 1.0)])
+    assert signals == {"margin": 1.0, "agreement": 0.0}
+
+
+def test_rrf_fusion_weights_and_orders_by_rank():
+    pytest.importorskip("chromadb")
+    from retrieval.dpr_retrieval import rrf_fusion
+
+    fused = rrf_fusion(
+        dpr_results=[("a", 0.9), ("b", 0.8)],
+        bm25_results=[("b", 12.0), ("c", 10.0)],
+        alpha=0.3,
+        rrf_k=60,
+    )
+    scores = dict(fused)
+    assert [doc_id for doc_id, _ in fused] == ["b", "c", "a"]
+    assert scores["b"] == pytest.approx(0.3 / 62 + 0.7 / 61)
+    assert scores["a"] == pytest.approx(0.3 / 61)
+
+
+def test_should_skip_needs_margin_and_agreement():
+    cascade = new_cascade(skip_margin=0.1, min_agreement=0.67)
+    assert cascade.should_skip({"margin": 0.2, "agreement": 1.0})
+    assert not cascade.should_skip({"margin": 0.05, "agreement": 1.0})
+    assert not cascade.should_skip({"margin": 0.2, "agreement": 0.34})
+    assert not cascade.should_skip(None)
+
+
+def test_skip_returns_rrf_top_k():
+    cascade = new_cascade()
+    assert cascade.skip(10) == [0, 1, 2]
+    assert cascade.skip(2) == [0, 1]
+    assert cascade.stats()["decisions"]["skip"] == 2
+
+
+def test_rank_exits_early_when_new_candidates_do_not_enter_top_k():
+    # RRF 순서와 cross-encoder 순서가 같으면 두 번째 단계 후 순위가 바뀌지 않는다
+    scorer = Scorer([10 - i for i in range(10)])
+    cascade = new_cascade()
+
+    top, decision = cascade.rank(scorer, 10)
+
+    assert decision == "early_exit"
+    assert top == [0, 1, 2]
+    assert scorer.calls == [[0, 1, 2, 3, 4], [5, 6, 7]]
+    stats = cascade.stats()
+    assert stats["early_exit_rate"] == 1.0
+    assert stats["scored_ratio"] == pytest.approx(8 / 10)
+
+
+def test_rank_scores_everything_when_late_candidates_keep_winning():
+    scorer = Scorer([float(i) for i in range(10)])
+    cascade = new_cascade()
+
+    top, decision = cascade.rank(scorer, 10)
+
+    assert decision == "full"
+    assert top == [9, 8, 7]
+    assert sorted(i for call in scorer.calls for i in call) == list(range(10))
+    assert cascade.stats()["scored_ratio"] == 1.0
+
+
+def test_rank_with_few_candidates_is_full():
+    scorer = Scorer([0.1, 0.5, 0.3, 0.2])
+    cascade = new_cascade()
+
+    top, decision = cascade.rank(scorer, 4)
+
+    assert decision == "full"
+    assert top == [1, 2, 3]
+    assert scorer.calls == [[0, 1, 2, 3]]
+
+
+def test_rank_reaching_the_last_candidate_is_not_an_early_exit():
+    # 마지막 단계에서 멈춘 것은 전부 점수화한 것과 같다
+    scorer = Scorer([10 - i for i in range(8)])
+    cascade = new_cascade()
+
+    _, decision = cascade.rank(scorer, 8)
+
+    assert decision == "full"
+    assert scorer.calls == [[0, 1, 2, 3, 4], [5, 6, 7]]
+
+
+def test_top_overlap():
+    assert top_overlap(["a", "b", "c"], ["c", "b", "a"]) == 1.0
+    assert top_overlap(["a", "b", "c"], ["a", "x", "y"]) == pytest.approx(1 / 3)
+    assert top_overlap([], ["a"]) == 0.0
+
+
+def test_shadow_runs_one_at_a_time_and_records_overlap():
+    cascade = new_cascade(shadow_rate=1.0)
+    release = threading.Event()
+    done = threading.Event()
+
+    def full_rank():
+        release.wait(5)
+        return ["a", "b", "x"]
+
+    try:
+        assert not cascade.maybe_shadow("full", ["a", "b", "c"], full_rank)
+        assert cascade.maybe_shadow("early_exit", ["a", "b", "c"], full_rank)
+        # 앞의 shadow 가 끝나기 전의 표본은 건너뛴다
+        assert not cascade.maybe_shadow("skip", ["a", "b", "c"], full_rank)
+
+        release.set()
+        cascade._shadow_executor.submit(done.set)
+        assert done.wait(5)
+        assert cascade.stats()["shadow_overlap"]["early_exit"] == pytest.approx(2 / 3, abs=1e-4)
+        assert cascade.maybe_shadow("skip", ["a", "b", "c"], full_rank)
+    finally:
+        release.set()
+        cascade.close()
+
+    assert not cascade.maybe_shadow("skip", ["a", "b", "c"], full_rank)
@@ -0,0 +1,34 @@
+import pytest
+
+from images import parse_byte_range
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=10-", (10, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=900-5000", (900, 999)),
+        ("BYTES = 0-0", (0, 0)),
+    ],
+)
+def test_satisfiable_ranges(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "bytes=1000-",
+        "bytes=50-10",
+        "bytes=-0",
+        "bytes=0-10,20-30",
+        "items=0-10",
+        "bytes=a-b",
+        "bytes=",
+    ],
+)
+def test_unsatisfiable_or_unsupported_ranges(header):
+    assert parse_byte_range(header, 1000) is None
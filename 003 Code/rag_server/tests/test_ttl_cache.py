@@ -0,0 +1,127 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import ttl_cache
+from retrieval.embedding_cache import QueryEmbeddingCache
+from ttl_cache import TTLCache
+
+_names = itertools.count()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ttl_cache, "time", fake)
+    return fake
+
+
+def new_cache(max_entries=1024, ttl_seconds=None) -> TTLCache:
+    # 메트릭은 이름별로 프로세스 전역이므로 테스트마다 다른 이름을 쓴다
+    return TTLCache(f"test_{next(_names)}", max_entries, ttl_seconds)
+
+
+def test_get_put_and_stats():
+    cache = new_cache()
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_evicts_least_recently_used():
+    cache = new_cache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a 가 최근 사용이 된다
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = new_cache(ttl_seconds=10)
+    cache.put("a", 1)
+
+    clock.now += 9.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_put_refreshes_ttl(clock):
+    cache = new_cache(ttl_seconds=10)
+    cache.put("a", 1)
+    clock.now += 8
+    cache.put("a", 2)
+    clock.now += 8
+    assert cache.get("a") == 2
+
+
+@pytest.mark.parametrize("ttl_seconds", [None, 0, -1])
+def test_non_positive_ttl_never_expires(clock, ttl_seconds):
+    cache = new_cache(ttl_seconds=ttl_seconds)
+    cache.put("a", 1)
+    clock.now += 10**9
+    assert cache.get("a") == 1
+
+
+def test_invalidate_with_predicate_and_all():
+    cache = new_cache()
+    for key in ("x1", "x2", "y1"):
+        cache.put(key, key)
+
+    assert cache.invalidate(lambda key: key.startswith("x")) == 2
+    assert cache.get("y1") == "y1"
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
+
+
+def test_query_embedding_cache_normalizes_query_and_returns_float32():
+    cache = QueryEmbeddingCache(max_entries=8, dtype="float16")
+    embedding = np.array([0.5, -1.25, 3.0], dtype=np.float32)
+    cache.put("model@1", "  Hello   World ", embedding)
+
+    cached = cache.get("model@1", "hello world")
+    assert cached.dtype == np.float32
+    np.testing.assert_array_equal(cached, embedding)
+    assert cache.get("model@2", "hello world") is None
+
+
+def test_query_embedding_cache_stores_a_copy():
+    cache = QueryEmbeddingCache(max_entries=8)
+    embedding = np.ones(3, dtype=np.float32)
+    cache.put("model@1", "q", embedding)
+    embedding[:] = 0
+
+    np.testing.assert_array_equal(cache.get("model@1", "q"), np.ones(3))
+
+
+def test_query_embedding_cache_invalidate_model():
+    cache = QueryEmbeddingCache(max_entries=8)
+    cache.put("old@1", "q", np.zeros(2))
+    cache.put("new@2", "q", np.ones(2))
+
+    assert cache.invalidate_model("old@1") == 1
+    assert cache.get("old@1", "q") is None
+    assert cache.get("new@2", "q") is not None
@@ -0,0 +1,90 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from metrics import counter, gauge
+
+
+class TTLCache:
+    """
+    크기 제한(LRU) + 만료 시간(TTL)을 갖는 thread-safe 캐시.
+    hit/miss/eviction 수는 rag_{name}_cache_* 메트릭으로 노출된다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = counter(f"rag_{name}_cache_hits_total", f"{name} cache hits")
+        self._misses = counter(f"rag_{name}_cache_misses_total", f"{name} cache misses")
+        self._evictions = counter(
+            f"rag_{name}_cache_evictions_total",
+            f"{name} cache entries evicted by size limit, TTL or invalidation",
+        )
+        self._size = gauge(f"rag_{name}_cache_entries", f"{name} cache entry count")
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= time.monotonic():
+                    del self._entries[key]
+                    self._evictions.inc()
+                    self._size.set(len(self._entries))
+                else:
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return value
+        self._misses.inc()
+        return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        expires_at = (
+            time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        )
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions.inc()
+            self._size.set(len(self._entries))
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """predicate(key) 가 참인 항목을 지운다 (predicate 가 없으면 전체)"""
+        with self._lock:
+            if predicate is None:
+                keys = list(self._entries.keys())
+            else:
+                keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self._evictions.inc(len(keys))
+            self._size.set(len(self._entries))
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        hits, misses = self._hits.value, self._misses.value
+        total = hits + misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "evictions": self._evictions.value,
+            "hit_rate": hits / total if total else 0.0,
+        }
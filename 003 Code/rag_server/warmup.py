@@ -0,0 +1,112 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import gauge
+
+logger = logging.getLogger("rag")
+
+WARMUP_DURATION = gauge(
+    "rag_warmup_duration_seconds",
+    "Duration of the most recent warm-up run of each step",
+    labelnames=("step",),
+)
+READY = gauge("rag_ready", "1 when warm-up has completed and the server accepts traffic")
+
+WarmupStep = Tuple[str, Callable[[], None]]
+
+
+class WarmupError(RuntimeError):
+    def __init__(self, step: str, error: Exception) -> None:
+        super().__init__(f"{step}: {error}")
+        self.step = step
+
+
+def run_warmup_steps(
+    steps: List[WarmupStep], step_ms: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """스텝을 순서대로 실행하고 스텝별 소요 시간(ms)을 채운다. 실패하면 WarmupError."""
+    step_ms = {} if step_ms is None else step_ms
+    for name, fn in steps:
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            raise WarmupError(name, e) from e
+        elapsed = time.perf_counter() - started
+        step_ms[name] = elapsed * 1000
+        WARMUP_DURATION.labels(step=name).set(elapsed)
+        logger.info(f"Warm-up step '{name}' 완료: {elapsed * 1000:.1f}ms")
+    return step_ms
+
+
+class WarmupState:
+    """
+    서버 준비 상태.
+    warm-up 스텝을 순서대로 실행하고, 모두 성공해야 ready 로 바뀐다.
+    실패하면 retry_interval 초 뒤에 처음부터 다시 시도한다.
+    """
+
+    def __init__(self, retry_interval: float = 10.0) -> None:
+        self.retry_interval = retry_interval
+        self.started_at = time.time()
+        self.status = "starting"
+        self.attempts = 0
+        self.step_ms: Dict[str, float] = {}
+        self.total_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def run_once(self, steps: List[WarmupStep]) -> bool:
+        self.attempts += 1
+        self.status = "warming_up"
+        self.step_ms = {}
+        started = time.perf_counter()
+
+        try:
+            run_warmup_steps(steps, self.step_ms)
+        except WarmupError as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"Warm-up 실패 (step={e.step}, attempt={self.attempts}): {e}")
+            return False
+
+        self.total_ms = (time.perf_counter() - started) * 1000
+        self.error = None
+        self.status = "ready"
+        self._ready.set()
+        READY.set(1)
+        logger.info(f"Warm-up 완료 ({self.total_ms:.1f}ms) - 트래픽 수신 준비됨")
+        return True
+
+    def _run_until_ready(self, steps: List[WarmupStep]) -> None:
+        while not self.run_once(steps):
+            time.sleep(self.retry_interval)
+
+    def start(self, steps: List[WarmupStep]) -> None:
+        """백그라운드 스레드에서 warm-up 을 돌린다 (/health 는 그동안에도 응답)."""
+        self._thread = threading.Thread(
+            target=self._run_until_ready, args=(steps,), name="rag-warmup", daemon=True
+        )
+        self._thread.start()
+
+    def mark_not_ready(self, status: str) -> None:
+        self._ready.clear()
+        self.status = status
+        READY.set(0)
+
+    def report(self) -> Dict:
+        return {
+            "status": self.status,
+            "attempts": self.attempts,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "warmup_ms": {k: round(v, 1) for k, v in self.step_ms.items()},
+            "warmup_total_ms": round(self.total_ms, 1) if self.total_ms is not None else None,
+            "error": self.error,
+        }